@@ -0,0 +1,158 @@
+import glob
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from catalog_patch import unmatched_name_entries
+from instrumentation import RunMetrics, profile_capture
+from structured_logging import configure_logging, log_run, logging_settings
+from validation_core import json_load_error_message, load_scan_export
+
+# Validator shared by every task in a worker process, set once by _init_worker.
+_worker_validator = None
+
+
+def collect_json_paths(inputs, recursive=False):
+    """Expand files, directories and glob patterns into a sorted list of JSON files."""
+    paths = []
+    for entry in inputs:
+        path = Path(entry)
+        if path.is_dir():
+            pattern = '**/*.json' if recursive else '*.json'
+            paths.extend(p for p in path.glob(pattern) if p.is_file())
+        elif path.is_file():
+            paths.append(path)
+        else:
+            matches = glob.glob(entry, recursive=recursive)
+            if not matches:
+                logging.warning("No JSON files matched: %s", entry)
+            paths.extend(Path(match) for match in matches if Path(match).is_file())
+    return sorted(dict.fromkeys(paths))
+
+
+def report_file_names(json_paths, suffix='.report.jsonl'):
+    """Map each JSON path, as a string, to a report file name no other path in the batch shares.
+
+    The name is the file's path below the directory common to all of them,
+    without its extension and with '__' between the parts, so
+    sub/scan_export.json gets sub__scan_export.report.jsonl.
+    """
+    resolved = [Path(path).resolve() for path in json_paths]
+    if not resolved:
+        return {}
+    root = Path(os.path.commonpath([path.parent for path in resolved]))
+    return {str(path): '__'.join(resolved_path.relative_to(root).with_suffix('').parts) + suffix
+            for path, resolved_path in zip(json_paths, resolved)}
+
+
+def validate_file(validator, json_path, stream=None, profile_dir=None):
+    """Validate one scan export and return its report record.
+
+    With profile_dir, the file is profiled with cProfile and tracemalloc and
+    the record lists the profile files written.
+    """
+    if profile_dir is not None:
+        with profile_capture(profile_dir, Path(json_path).stem) as written:
+            record = validate_file(validator, json_path, stream=stream)
+        record['profile'] = written
+        return record
+
+    start = time.perf_counter()
+    with log_run() as run_id:
+        # The run id ties the record to the log records of its run
+        record = {'file': str(json_path), 'run_id': run_id}
+        metrics = RunMetrics()
+        try:
+            with metrics.stage("Load JSON"):
+                _, json_data = load_scan_export(json_path, stream=stream)
+        except Exception as e:
+            record.update(ok=False, error=json_load_error_message(json_path, e))
+        else:
+            try:
+                result = validator.validate(json_data, metrics=metrics)
+                report = result.to_dict()
+                report['unmatched_names'] = unmatched_name_entries(validator, result)
+            except Exception as e:
+                # One item the checks cannot handle fails its file, not the batch
+                logging.exception("Validation failed for %s", json_path)
+                record.update(ok=False, error=f"Validation failed: {type(e).__name__}: {e}")
+            else:
+                record.update(ok=True, error=None)
+                record.update(report)
+    record['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return record
+
+
+def resolve_workers(workers):
+    """Turn the --workers value into a process count; 0 or less means one per core."""
+    if workers is None or workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _init_worker(validator, log_settings):
+    global _worker_validator
+    _worker_validator = validator
+    # A forked worker inherits the queue handler but not the listener thread draining it
+    if log_settings is not None:
+        configure_logging(**log_settings)
+
+
+def _validate_in_worker(json_path, stream, profile_dir):
+    return validate_file(_worker_validator, json_path, stream=stream, profile_dir=profile_dir)
+
+
+def _pool_context():
+    """Prefer fork so workers share the parsed CSV and index copy-on-write."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context('spawn')
+
+
+def iter_validation_records(validator, json_paths, workers=1, max_pending=None, stream=None, profile_dir=None):
+    """Yield one report record per JSON file.
+
+    With one worker files are validated in order in this process. With more,
+    a process pool validates them and records are yielded in completion order.
+    At most max_pending files (default: twice the worker count) are in flight,
+    so memory stays bounded however many files are queued. stream is passed to
+    load_scan_export for every file; profile_dir, if set, gets one profile per file.
+    """
+    workers = min(resolve_workers(workers), max(1, len(json_paths)))
+    if workers == 1:
+        for json_path in json_paths:
+            yield validate_file(validator, json_path, stream=stream, profile_dir=profile_dir)
+        return
+
+    # Build the fuzzy candidates before the workers start so none of them repeats it.
+    validator.reference_index.fuzzy_matcher
+    max_pending = max_pending or 2 * workers
+    context = _pool_context()
+    logging.info("Validating %s files with %s %s workers", len(json_paths), workers, context.get_start_method())
+
+    # Under fork the validator is inherited; under spawn it is pickled once per worker.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(validator, logging_settings())) as pool:
+        remaining = iter(json_paths)
+        pending = {}  # Future -> the JSON file it validates
+        while True:
+            for json_path in remaining:
+                pending[pool.submit(_validate_in_worker, json_path, stream, profile_dir)] = json_path
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                json_path = pending.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    # A worker that died or a record that could not be sent back fails that file only
+                    logging.error("Worker failed on %s: %s", json_path, e)
+                    record = {'file': str(json_path), 'run_id': None, 'ok': False,
+                              'error': f"Worker failed: {type(e).__name__}: {e}"}
+                yield record
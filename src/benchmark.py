@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from json_stream import apply_item_patches, build_item_patches, index_items_by_name, write_json_array
+from synthetic_data import synthetic_reference_csv, synthetic_scan_items
+from validation_core import UNIT_CONVERSION_MARKER, LabDataValidator
+
+BENCHMARK_FORMAT_VERSION = 1
+# Single calls timed for the per-name stages.
+DEFAULT_SAMPLE_SIZE = 200
+STAGES = ('load_csv_data', 'validate_test_name_and_loinc', 'find_closest_match', 'get_calculated_range',
+          'validate', 'save_updated_json')
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    return statistics.quantiles(ordered, n=100, method='inclusive')[round(fraction * 100) - 1]
+
+
+class StageTimer:
+    """Times repeated runs of one stage and, optionally, the peak memory of one extra run."""
+
+    def __init__(self, repeats, measure_memory):
+        self.repeats = repeats
+        self.measure_memory = measure_memory
+
+    def run(self, stage, work, setup=None, units=1):
+        """Time work(state) after setup() on each repeat; units is how many items or calls one run covers.
+
+        Returns one result record. Latencies are per run; for a stage that
+        times single calls, work returns the list of per-call seconds instead,
+        and the latencies are those calls.
+        """
+        latencies = []
+        total = 0.0
+        for _ in range(self.repeats):
+            state = setup() if setup else None
+            start = time.perf_counter()
+            calls = work(state)
+            elapsed = time.perf_counter() - start
+            total += elapsed
+            latencies.extend(calls if isinstance(calls, list) else [elapsed])
+
+        peak_memory = None
+        if self.measure_memory:
+            state = setup() if setup else None
+            tracemalloc.start()
+            try:
+                work(state)
+                peak_memory = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        record = {
+            'stage': stage,
+            'units': units,
+            'repeats': self.repeats,
+            'total_seconds': round(total, 6),
+            'throughput_per_second': round(units * self.repeats / total, 3) if total else None,
+            'p50_ms': round(_percentile(latencies, 0.5) * 1000, 4),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 4),
+            'peak_memory_bytes': peak_memory,
+        }
+        logging.info("%s: %s ms p50, %s ms p95, %s/s", stage, record['p50_ms'], record['p95_ms'],
+                     record['throughput_per_second'])
+        return record
+
+
+def _time_calls(function, arguments):
+    """Call function on each argument, returning the seconds each call took."""
+    latencies = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def benchmark_case(csv_rows, items, work_dir, repeats=3, sample_size=DEFAULT_SAMPLE_SIZE, measure_memory=True,
+                   stages=STAGES, seed=0, **item_options):
+    """Benchmark every stage for one synthetic CSV size and payload size; returns the stage records.
+
+    Every stage starts cold: the CSV is parsed from disk without the reference
+    cache, and each timed run gets a fresh match cache, so repeats measure the
+    same work.
+    """
+    csv_df = synthetic_reference_csv(csv_rows, seed=seed)
+    csv_path = Path(work_dir) / f"reference_{csv_rows}.csv"
+    csv_df.to_csv(csv_path, index=False)
+    json_data = synthetic_scan_items(csv_df, items, seed=seed, **item_options)
+    validator = LabDataValidator.from_csv(csv_path)
+    fuzzy_matcher = validator.reference_index.fuzzy_matcher
+
+    def fresh_validator():
+        validator.match_resolver.clear()
+        return validator
+
+    distinct_names = list(dict.fromkeys(item['TestName'] for item in json_data))
+    sampled_names = distinct_names[:sample_size]
+    unmatched_names = [name for name in distinct_names if validator.reference_index.find_row(name)[0] is None]
+    timer = StageTimer(repeats, measure_memory)
+    records = []
+
+    def load_csv_data(_):
+        loaded = LabDataValidator.from_csv(csv_path)
+        loaded.reference_index.fuzzy_matcher
+
+    # The edits a reviewer makes: every 'unknown' status and every unit awaiting conversion
+    status_updates = {item['TestName']: 'normal' for item in json_data if item['status'] == 'unknown'}
+    unit_updates = {item['TestName']: 'mg/dL' for item in json_data if UNIT_CONVERSION_MARKER in item['unit']}
+
+    def save_updated_json(_):
+        # Patching is idempotent, so every repeat writes the same file
+        patches = build_item_patches(index_items_by_name(json_data), status_updates, unit_updates, {})
+        write_json_array(Path(work_dir) / 'updated_payload.json', apply_item_patches(json_data, patches))
+
+    if 'load_csv_data' in stages:
+        records.append(timer.run('load_csv_data', load_csv_data, units=csv_rows))
+    if 'validate_test_name_and_loinc' in stages:
+        records.append(timer.run('validate_test_name_and_loinc',
+                                 lambda v: v.validate_test_name_and_loinc(json_data), fresh_validator, units=items))
+    if 'find_closest_match' in stages and unmatched_names:
+        sample = unmatched_names[:sample_size]
+        records.append(timer.run('find_closest_match', lambda _: _time_calls(fuzzy_matcher.best_match, sample),
+                                 units=len(sample)))
+    if 'get_calculated_range' in stages and sampled_names:
+        records.append(timer.run('get_calculated_range',
+                                 lambda v: _time_calls(v.get_calculated_range, sampled_names),
+                                 fresh_validator, units=len(sampled_names)))
+    if 'validate' in stages:
+        records.append(timer.run('validate', lambda v: v.validate(json_data), fresh_validator, units=items))
+    if 'save_updated_json' in stages:
+        records.append(timer.run('save_updated_json', save_updated_json, units=items))
+
+    for record in records:
+        record.update(csv_rows=csv_rows, items=items, distinct_names=len(distinct_names),
+                      unmatched_names=len(unmatched_names))
+    return records
+
+
+def run_benchmarks(csv_sizes, item_counts, repeats=3, sample_size=DEFAULT_SAMPLE_SIZE, measure_memory=True,
+                   stages=STAGES, seed=0, **item_options):
+    """Benchmark every combination of CSV size and payload size and return the full report."""
+    started = datetime.now(timezone.utc)
+    results = []
+    with tempfile.TemporaryDirectory(prefix='lab_validator_benchmark_') as work_dir:
+        for csv_rows in csv_sizes:
+            for items in item_counts:
+                logging.warning("Benchmarking %s CSV rows x %s items", csv_rows, items)
+                results.extend(benchmark_case(csv_rows, items, work_dir, repeats=repeats, sample_size=sample_size,
+                                              measure_memory=measure_memory, stages=stages, seed=seed,
+                                              **item_options))
+    return {
+        'format_version': BENCHMARK_FORMAT_VERSION,
+        'started': started.isoformat(timespec='seconds'),
+        'elapsed_seconds': round((datetime.now(timezone.utc) - started).total_seconds(), 3),
+        'environment': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'parameters': {
+            'csv_sizes': list(csv_sizes),
+            'item_counts': list(item_counts),
+            'repeats': repeats,
+            'sample_size': sample_size,
+            'measure_memory': measure_memory,
+            'seed': seed,
+            **item_options,
+        },
+        'results': results,
+    }
+
+
+def format_report(report):
+    """Render a benchmark report as a plain-text table."""
+    header = (f"{'csv rows':>9} {'items':>9} {'stage':<29} {'p50 ms':>11} {'p95 ms':>11} "
+              f"{'per second':>13} {'peak MiB':>9}")
+    lines = [header, '-' * len(header)]
+    for record in report['results']:
+        peak = record['peak_memory_bytes']
+        lines.append(f"{record['csv_rows']:>9} {record['items']:>9} {record['stage']:<29} "
+                     f"{record['p50_ms']:>11.3f} {record['p95_ms']:>11.3f} "
+                     f"{record['throughput_per_second'] or 0:>13,.1f} "
+                     f"{'-' if peak is None else f'{peak / 2 ** 20:.1f}':>9}")
+    return '\n'.join(lines)
+
+
+def save_report(report, output_path):
+    """Write a benchmark report as JSON, so later runs can be compared with it."""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,214 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from reference_ranges import IN_RANGE, OUT_OF_RANGE
+
+# Columns of the result rows each field's rules are evaluated against, as ValidationResult holds them.
+FIELD_COLUMNS = {
+    'status': ('TestName', 'status', 'calculated_range', 'result', 'suggested_status'),
+    'unit': ('TestName', 'unit', 'result', 'proposed_unit', 'proposed_result'),
+    'date': ('TestName', 'date', 'normalized_date', 'date_issue'),
+}
+# How a status rule can constrain an item's result against its Calculated range.
+RESULT_CHECKS = {
+    'within': "within Calculated range",
+    'outside': "outside Calculated range",
+    'not_comparable': "not comparable with Calculated range",
+}
+
+
+def edit_frame(field, rows):
+    """Return the rows of one result table as a DataFrame the field's rules can be evaluated on.
+
+    Status rows also get within_range and comparable columns, read from the
+    status the validator suggested by comparing each result with its parsed
+    Calculated range.
+    """
+    frame = pd.DataFrame.from_records(list(rows), columns=FIELD_COLUMNS[field])
+    if field == 'status':
+        suggested = frame['suggested_status'].to_numpy()
+        frame['within_range'] = suggested == IN_RANGE
+        frame['comparable'] = (suggested == IN_RANGE) | (suggested == OUT_OF_RANGE)
+    return frame
+
+
+class StatusRule:
+    """Set the status of items whose status is current_status and whose result passes result_check.
+
+    current_status None matches any status; result_check is one of
+    RESULT_CHECKS or None for any result. new_status None sets each item to
+    its suggested status, skipping items without one.
+    """
+    field = 'status'
+
+    def __init__(self, new_status, current_status='unknown', result_check=None):
+        if result_check is not None and result_check not in RESULT_CHECKS:
+            raise ValueError(f"Unknown result check {result_check!r}; expected one of {', '.join(RESULT_CHECKS)}")
+        self.new_status = new_status
+        self.current_status = current_status
+        self.result_check = result_check
+
+    def evaluate(self, frame):
+        """Return the new value for every row of frame, or None where the rule does not match."""
+        matched = np.ones(len(frame), dtype=bool)
+        if self.current_status is not None:
+            matched &= (frame['status'] == self.current_status).to_numpy()
+        if self.result_check == 'within':
+            matched &= frame['within_range'].to_numpy()
+        elif self.result_check == 'outside':
+            matched &= frame['comparable'].to_numpy() & ~frame['within_range'].to_numpy()
+        elif self.result_check == 'not_comparable':
+            matched &= ~frame['comparable'].to_numpy()
+        if self.new_status is None:
+            return np.where(matched, frame['suggested_status'].to_numpy(), None)
+        return np.where(matched, self.new_status, None)
+
+    def describe(self):
+        conditions = [f"status is {self.current_status}" if self.current_status is not None else "any status"]
+        if self.result_check is not None:
+            conditions.append(f"result {RESULT_CHECKS[self.result_check]}")
+        new_status = "the suggested status" if self.new_status is None else f"status {self.new_status}"
+        return f"{' and '.join(conditions)} → {new_status}"
+
+
+class PatternRule:
+    """Set a unit or date column wherever its current value matches pattern.
+
+    A plain pattern matches as a substring and the value becomes replacement.
+    With regex, pattern is searched for as a regular expression and the value
+    becomes replacement expanded against the match, so it may refer to the
+    pattern's groups (\\1, \\g<name>): a rule like "(.*) CONVERSION REQUIRED!!!"
+    → "\\1" keeps the part before the marker. An invalid pattern or
+    replacement raises re.error here rather than when the rule is evaluated.
+    """
+
+    def __init__(self, field, pattern, replacement, regex=False, ignore_case=False):
+        if field not in ('unit', 'date'):
+            raise ValueError(f"Pattern rules edit units or dates, not {field!r}")
+        self.compiled = None
+        if regex:
+            self.compiled = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+            # Parses the replacement's group references against the pattern
+            self.compiled.sub(replacement, '')
+        self.field = field
+        self.pattern = pattern
+        self.replacement = replacement
+        self.regex = regex
+        self.ignore_case = ignore_case
+
+    def evaluate(self, frame):
+        """Return the new value for every row of frame, or None where the rule does not match."""
+        # Only text cells are matched; a missing unit or date never matches, not even ".*"
+        values = frame[self.field].map(lambda value: value if isinstance(value, str) else None)
+        if not self.regex:
+            matched = values.str.contains(self.pattern, case=not self.ignore_case, regex=False, na=False).to_numpy()
+            return np.where(matched, self.replacement, None)
+        # Columns hold few distinct values, so each is matched once
+        replacements = {None: None}
+        for value in pd.unique(values):
+            if value is not None:
+                match = self.compiled.search(value)
+                replacements[value] = None if match is None else match.expand(self.replacement)
+        new_values = np.empty(len(frame), dtype=object)
+        new_values[:] = [replacements[value] for value in values.tolist()]
+        return new_values
+
+    def describe(self):
+        kind = "matches" if self.regex else "contains"
+        return f"{self.field} {kind} {self.pattern!r} → {self.field} {self.replacement!r}"
+
+
+class EditPlan:
+    """The edits one field's rules would make, keyed by TestName like the pending edits.
+
+    Edits apply to every item with a TestName, so a name is only planned when
+    the rules give all of its rows the same value; names whose rows were only
+    partly matched, or given different values, are listed in conflicts.
+    """
+
+    def __init__(self, field, updates, matched_rows, conflicts, unchanged, overridden, rejected=()):
+        self.field = field
+        self.updates = updates
+        self.matched_rows = matched_rows
+        self.conflicts = conflicts
+        self.unchanged = unchanged
+        self.overridden = overridden
+        self.rejected = list(rejected)  # Names whose new value the field's check refused
+
+    def __len__(self):
+        return len(self.updates)
+
+    def summary(self):
+        """Return a one-line preview of the plan for the report."""
+        line = (f"{self.field.capitalize()}: {len(self.updates)} tests ({self.matched_rows} rows) will be "
+                f"updated")
+        details = []
+        if self.unchanged:
+            details.append(f"{self.unchanged} already pending with the same value")
+        if self.overridden:
+            details.append(f"{self.overridden} replace a different pending edit")
+        if self.conflicts:
+            details.append(f"{len(self.conflicts)} skipped because their rows disagree")
+        if self.rejected:
+            details.append(f"{len(self.rejected)} skipped because their new {self.field} is not valid")
+        return f"{line}; {', '.join(details)}" if details else line
+
+
+def plan_field(field, rules, rows, pending=None, check=None):
+    """Evaluate the rules for one field over its result rows and return the EditPlan.
+
+    Rules are evaluated across all rows at once, in order, and the first rule
+    that matches a row decides its value. pending holds the edits already made
+    to this field, which the plan reports on but does not change. check, if
+    given, is applied to each new value as to a value typed by hand: it
+    returns the value to store, or None to refuse it.
+    """
+    pending = pending or {}
+    frame = edit_frame(field, rows)
+    values = np.full(len(frame), None, dtype=object)
+    for rule in rules:
+        undecided = values == None  # noqa: E711
+        if not undecided.any():
+            break
+        new_values = rule.evaluate(frame)
+        values[undecided] = new_values[undecided]
+
+    decided = pd.DataFrame({'TestName': frame['TestName'], 'value': values})
+    per_name = decided.groupby('TestName', sort=False)['value'].agg(['count', 'nunique', 'size', 'first'])
+    agreed = per_name[(per_name['count'] == per_name['size']) & (per_name['nunique'] == 1)]
+    conflicts = per_name.index[(per_name['count'] > 0) & ~per_name.index.isin(agreed.index)].tolist()
+    updates = dict(zip(agreed.index.tolist(), agreed['first'].tolist()))
+    rejected = []
+    if check is not None:
+        checked = {value: check(value) for value in set(updates.values())}
+        rejected = [name for name, value in updates.items() if checked[value] is None]
+        updates = {name: checked[value] for name, value in updates.items() if checked[value] is not None}
+    matched_rows = int(agreed['size'].drop(rejected).sum())
+    unchanged = sum(1 for name, value in updates.items() if pending.get(name) == value)
+    overridden = sum(1 for name, value in updates.items() if name in pending and pending[name] != value)
+    return EditPlan(field, updates, matched_rows, conflicts, unchanged, overridden, rejected)
+
+
+def plan_bulk_edits(rules, rows_by_field, pending_by_field=None, checks=None):
+    """Plan every field that has rules; returns {field: EditPlan} in FIELD_COLUMNS order.
+
+    checks maps a field to the check its new values must pass (see plan_field).
+    """
+    pending_by_field = pending_by_field or {}
+    checks = checks or {}
+    plans = {}
+    for field in FIELD_COLUMNS:
+        field_rules = [rule for rule in rules if rule.field == field]
+        if field_rules:
+            plans[field] = plan_field(field, field_rules, rows_by_field.get(field, ()),
+                                      pending_by_field.get(field), checks.get(field))
+    return plans
+
+
+def apply_plan(plan, updates):
+    """Merge a plan's edits into a pending edits dict in one batch; returns how many names changed."""
+    changed = sum(1 for name, value in plan.updates.items() if updates.get(name) != value)
+    updates.update(plan.updates)
+    return changed
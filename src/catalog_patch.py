@@ -0,0 +1,371 @@
+import csv
+import io
+import logging
+from collections import Counter
+
+import pandas as pd
+
+from fuzzy_index import FuzzyMatcher
+from reference_index import ReferenceIndex
+
+# Minimum fuzz.ratio two unmatched names must exceed to be treated as variants of one name.
+CLUSTER_THRESHOLD = 85
+# Columns of a Search Names patch: one row per reference row gaining names, then
+# one per name or group of names left for review (row is empty for those, and
+# review says why).
+PATCH_COLUMNS = ('row', 'Test Name', 'Search Names', 'Add', 'New Search Names', 'occurrences', 'files', 'similarity',
+                 'review')
+# How names are joined in a Search Names cell.
+SEARCH_NAMES_SEPARATOR = ', '
+# What the reference index and the fuzzy candidates split Search Names cells on;
+# a name containing it would be added as several fragments.
+SEARCH_NAMES_DELIMITER = ','
+# Review notes of the patch rows left for a person to place.
+NO_SIMILAR_TEST = "no similar test"
+HAS_DELIMITER = f"name contains {SEARCH_NAMES_DELIMITER!r}, which splits Search Names"
+
+
+def normalized_name(name):
+    """Return the form unmatched names are deduplicated on: lower-cased only, as lookups compare them."""
+    return name.lower()
+
+
+def unmatched_name_entries(validator, result):
+    """Return one entry per distinct unmatched TestName of a ValidationResult, the most frequent first.
+
+    Each entry holds the name, how many items carry it and its suggestion:
+    the suggested row and Test Name (None when no similar test has one) and
+    the similarity. The records come from validator's match cache, where
+    validating result left them, so nothing is scored again.
+    """
+    counts = result.unmatched_name_counts()
+    resolver = validator.match_resolver
+    records = [(name, resolver.resolve(name)) for name, _ in counts.most_common() if isinstance(name, str)]
+    # Only names evicted from the match cache since the run need scoring
+    resolver.resolve_fuzzy([(name, record) for name, record in records if record.match_kind is None])
+    return [{'TestName': name, 'count': counts[name], 'suggested_test_name': record.suggested_test_name,
+             'suggestion_row': record.suggestion_row, 'similarity': record.similarity}
+            for name, record in records if record.match_kind is None]
+
+
+def minimal_additions(names, existing=''):
+    """Return the names a Search Names cell needs so it contains each of them, longest first.
+
+    Search Names are matched as case-insensitive substrings, so a name already
+    inside the cell, or inside a longer name being added, needs no entry of its own.
+    """
+    kept = []
+    for name in sorted(names, key=lambda name: (-len(name), name.lower())):
+        text = '\x00'.join([existing.lower(), *(kept_name.lower() for kept_name in kept)])
+        if name.lower() not in text:
+            kept.append(name)
+    return kept
+
+
+class NameCluster:
+    """Unmatched names that are variants of one another: normalized keys, with what they add up to."""
+
+    def __init__(self, keys, spellings, occurrences, files):
+        self.keys = keys  # Normalized names, the most frequent first
+        self.spellings = spellings  # Normalized name -> its most frequent spelling
+        self.occurrences = occurrences  # Normalized name -> items carrying it
+        self.files = files  # Numbers of the payloads carrying any of the names
+
+    @property
+    def total(self):
+        return sum(self.occurrences.values())
+
+
+class UnmatchedNameAggregator:
+    """Unmatched TestNames collected over a batch of payloads, turned into one Search Names patch.
+
+    Names are deduplicated on their normalized form across every payload added,
+    near-duplicate variants are clustered with the fuzzy scorer, and each
+    cluster is assigned the reference row its names' suggestions point to,
+    weighted by how often each name occurred. Every distinct name is scored
+    against the reference at most once: the suggestions entries arrive with
+    are kept for as long as the aggregator is given the same validator, so
+    only names added without one are scored, and later batches reuse the
+    suggestions of earlier ones.
+    """
+
+    def __init__(self, cluster_threshold=CLUSTER_THRESHOLD):
+        self.cluster_threshold = cluster_threshold
+        self.spellings = Counter()  # TestName as written -> occurrences
+        self.files = {}  # Normalized name -> numbers of the payloads it appeared in
+        self.payloads = 0
+        self.names_scored = 0  # Lifetime count of names fuzzy-matched for suggestions
+        self._validator = None
+        self._suggestions = {}  # Normalized name -> (suggestion row or None, similarity), None once it matches
+
+    def _use(self, validator):
+        """Drop the suggestions made for another validator: their rows belong to another CSV."""
+        if validator is not self._validator:
+            self._validator = validator
+            self._suggestions = {}
+
+    def add(self, entries, validator=None):
+        """Add one payload's unmatched names, as unmatched_name_entries returns them.
+
+        With validator, the CSV the entries were matched against, their
+        suggestions are kept so the names need no scoring of their own.
+        """
+        if validator is not None:
+            self._use(validator)
+        payload = self.payloads
+        self.payloads += 1
+        for entry in entries:
+            name = entry['TestName']
+            if not isinstance(name, str) or not name.strip():
+                continue
+            key = normalized_name(name)
+            self.spellings[name] += entry['count']
+            self.files.setdefault(key, set()).add(payload)
+            if validator is not None and 'suggestion_row' in entry:
+                self._suggestions.setdefault(key, (entry['suggestion_row'], entry['similarity']))
+
+    def add_record(self, record, validator=None):
+        """Add the unmatched names of a batch or service report record; records of failed files are skipped."""
+        if record.get('ok', True):
+            self.add(record.get('unmatched_names') or (), validator)
+
+    def __len__(self):
+        return len(self.files)
+
+    def clusters(self):
+        """Group the distinct unmatched names into clusters of variants, the most frequent cluster first.
+
+        Names are visited from the most frequent down; each name not yet in a
+        cluster starts one and takes every unclustered name scoring above
+        cluster_threshold against it.
+        """
+        occurrences = Counter()
+        spellings = {}
+        for spelling, count in self.spellings.most_common():
+            key = normalized_name(spelling)
+            occurrences[key] += count
+            spellings.setdefault(key, spelling)
+        keys = sorted(occurrences, key=lambda key: (-occurrences[key], key))
+        if not keys:
+            return []
+
+        matcher = FuzzyMatcher(keys)
+        clustered = set()
+        clusters = []
+        for key in keys:
+            if key in clustered:
+                continue
+            members = [name for name, _ in matcher.top_k(key, k=len(keys), score_cutoff=self.cluster_threshold)
+                       if name not in clustered]
+            if key not in members:
+                members.insert(0, key)
+            members.sort(key=lambda name: (-occurrences[name], name))
+            clustered.update(members)
+            clusters.append(NameCluster(members, {name: spellings[name] for name in members},
+                                        {name: occurrences[name] for name in members},
+                                        set().union(*(self.files[name] for name in members))))
+        clusters.sort(key=lambda cluster: (-cluster.total, cluster.keys[0]))
+        logging.info("Clustered %s distinct unmatched names into %s clusters", len(keys), len(clusters))
+        return clusters
+
+    def suggestions(self, validator, keys):
+        """Return {normalized name: (suggestion row or None, similarity)} for keys, None for names that now match.
+
+        Names without a suggestion for this validator yet are resolved and
+        fuzzy-matched through its match resolver, in one batch.
+        """
+        self._use(validator)
+        pending = [key for key in dict.fromkeys(keys) if key not in self._suggestions]
+        if pending:
+            resolver = validator.match_resolver
+            records = [(key, resolver.resolve(key)) for key in pending]
+            self.names_scored += resolver.resolve_fuzzy([(key, record) for key, record in records
+                                                         if record.match_kind is None])
+            for key, record in records:
+                self._suggestions[key] = (None if record.match_kind is not None
+                                          else (record.suggestion_row, record.similarity))
+        return {key: self._suggestions[key] for key in keys}
+
+    def patch(self, validator):
+        """Return the Search Names patch for validator's reference CSV as a DataFrame of PATCH_COLUMNS.
+
+        Rows are ordered by impact: the items their added names would match,
+        then the payloads those items came from. Clusters with no similar
+        test, and each name containing SEARCH_NAMES_DELIMITER, come last in
+        the same order, with an empty row and a review note, for a person to
+        place. Names that match the reference by now are left out.
+        """
+        clusters = self.clusters()
+        suggestions = self.suggestions(validator, [key for cluster in clusters for key in cluster.keys])
+        csv_df = validator.csv_df
+        targets = {}
+        unplaced = []
+        for cluster in clusters:
+            keys = []
+            for key in cluster.keys:
+                if suggestions[key] is None:
+                    continue
+                if SEARCH_NAMES_DELIMITER not in key:
+                    keys.append(key)
+                    continue
+                row, score = suggestions[key]
+                unplaced.append({'names': [cluster.spellings[key]], 'occurrences': cluster.occurrences[key],
+                                 'files': self.files[key], 'review': HAS_DELIMITER,
+                                 'test_name': '' if row is None else csv_df['Test Name'].iat[row],
+                                 'similarity': None if row is None else score})
+            if not keys:
+                continue
+            votes = Counter()
+            similarity = {}
+            for key in keys:
+                row, score = suggestions[key]
+                if row is not None:
+                    votes[row] += cluster.occurrences[key]
+                    similarity[row] = max(similarity.get(row, 0), score)
+            entry = {'names': [cluster.spellings[key] for key in keys],
+                     'occurrences': sum(cluster.occurrences[key] for key in keys),
+                     'files': set().union(*(self.files[key] for key in keys)), 'review': NO_SIMILAR_TEST,
+                     'test_name': '', 'similarity': None}
+            if not votes:
+                unplaced.append(entry)
+                continue
+            row = min(votes, key=lambda row: (-votes[row], row))
+            target = targets.setdefault(row, {'names': [], 'occurrences': 0, 'files': set(), 'similarity': 0})
+            target['names'] += entry['names']
+            target['occurrences'] += entry['occurrences']
+            target['files'] |= entry['files']
+            target['similarity'] = max(target['similarity'], similarity[row])
+
+        rows = []
+        for row, target in targets.items():
+            current = csv_df['Search Names'].iat[row]
+            current = current if isinstance(current, str) else ''
+            additions = minimal_additions(target['names'], current)
+            if not additions:
+                continue
+            rows.append((row, csv_df['Test Name'].iat[row], current, SEARCH_NAMES_SEPARATOR.join(additions),
+                         SEARCH_NAMES_SEPARATOR.join(filter(None, [current, *additions])), target['occurrences'],
+                         len(target['files']), target['similarity'], ''))
+        rows.sort(key=lambda values: (-values[5], -values[6], values[0]))
+        rows += sorted(((None, entry['test_name'], '', SEARCH_NAMES_SEPARATOR.join(minimal_additions(entry['names'])),
+                         '', entry['occurrences'], len(entry['files']), entry['similarity'], entry['review'])
+                        for entry in unplaced),
+                       key=lambda values: (-values[5], -values[6], values[3]))
+        patch = pd.DataFrame(rows, columns=PATCH_COLUMNS)
+        patch['row'] = patch['row'].astype('Int64')
+        logging.info("Search Names patch: %s rows gain names, %s names or name groups are left for review",
+                     len(rows) - len(unplaced), len(unplaced))
+        return patch
+
+
+def read_patch(patch_path):
+    """Read a patch written with DataFrame.to_csv back into PATCH_COLUMNS."""
+    patch = pd.read_csv(patch_path, dtype={'Test Name': object, 'Search Names': object, 'Add': object,
+                                           'New Search Names': object, 'review': object}, keep_default_na=False,
+                        na_values={'row': [''], 'similarity': ['']})
+    patch['row'] = patch['row'].astype('Int64')
+    return patch
+
+
+def patch_search_names(search_names, patch):
+    """Return a copy of the Search Names cells, one per reference row, with the patch's New Search Names written in.
+
+    Also returns the rows changed. A row is only changed while its Search
+    Names still read as they did when the patch was made; rows changed
+    since, and names with no row, are skipped.
+    """
+    search_names = list(search_names)
+    changed = []
+    for row, expected, new in zip(patch['row'], patch['Search Names'], patch['New Search Names']):
+        if pd.isna(row) or not 0 <= row < len(search_names):
+            continue
+        current = search_names[row] if isinstance(search_names[row], str) else ''
+        if current != (expected if isinstance(expected, str) else ''):
+            logging.warning("Skipping row %s: its Search Names changed since the patch was made", row)
+            continue
+        search_names[row] = new
+        changed.append(int(row))
+    return search_names, changed
+
+
+def _field_span(record, column):
+    """Return the (start, end) offsets of field number column in the raw text of one CSV record.
+
+    A record with fewer fields gets the span just past its last field.
+    """
+    start = 0
+    field = 0
+    quoted = False
+    for position, char in enumerate(record):
+        if char == '"':
+            # A doubled quote inside a quoted field closes and reopens it
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == ',':
+            if field == column:
+                return start, position
+            field += 1
+            start = position + 1
+        elif char in '\r\n':
+            return (start, position) if field == column else (position, position)
+    return (start, len(record)) if field == column else (len(record), len(record))
+
+
+def apply_patch(csv_path, patch, output_path):
+    """Write the reference CSV at csv_path to output_path with the patch applied; returns the rows changed.
+
+    Only the Search Names cells of changed rows are written again; every
+    other byte is copied as it was. Rows are counted as read_reference_csv
+    counts them, skipping blank lines. Raises ValueError if the CSV has no
+    Search Names column.
+    """
+    with open(csv_path, encoding='utf-8', newline='') as f:
+        lines = f.readlines()
+    reader = csv.reader(lines)
+    header = next(reader, [])
+    if 'Search Names' not in header:
+        raise ValueError(f"{csv_path} has no Search Names column")
+    column = header.index('Search Names')
+    # (first line, end line, fields) of every data record; reader.line_num counts the lines a record spans
+    records = []
+    start = reader.line_num
+    for fields in reader:
+        if fields:
+            records.append((start, reader.line_num, fields))
+        start = reader.line_num
+
+    search_names, changed = patch_search_names(
+        [fields[column] if column < len(fields) else '' for _, _, fields in records], patch)
+    for row in changed:
+        first, end, fields = records[row]
+        record = ''.join(lines[first:end])
+        start, stop = _field_span(record, column)
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='').writerow([search_names[row]])
+        # A record short of the Search Names column is padded with empty fields up to it
+        padding = ',' * (column - len(fields) + 1) if len(fields) <= column else ''
+        lines[first:end] = [record[:start] + padding + buffer.getvalue() + record[stop:]] + [''] * (end - first - 1)
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        f.writelines(lines)
+    return changed
+
+
+def unresolved_additions(csv_df, patch, rows):
+    """Return (row, name) for each name the patch added to rows that csv_df does not resolve to that row.
+
+    csv_df is the patched catalog. Each added name must come back from its
+    row's Search Names as one token, and a lookup of the name must find the row.
+    """
+    index = ReferenceIndex(csv_df)
+    rows = set(rows)
+    unresolved = []
+    for row, added in zip(patch['row'], patch['Add']):
+        if pd.isna(row) or int(row) not in rows or not isinstance(added, str):
+            continue
+        row = int(row)
+        for name in added.split(SEARCH_NAMES_SEPARATOR):
+            if (index.search_token_rows.get(name.strip().lower()) != row
+                    or index.find_row(name) not in (('exact', row), ('search', row))):
+                unresolved.append((int(row), name))
+    return unresolved
@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+from batch import collect_json_paths, iter_validation_records, report_file_names
+from benchmark import DEFAULT_SAMPLE_SIZE, STAGES, format_report, run_benchmarks, save_report
+from catalog_patch import UnmatchedNameAggregator, apply_patch, read_patch, unresolved_additions
+from reference_cache import DEFAULT_CACHE_DIR, ReferenceCache
+from synthetic_data import synthetic_reference_csv, synthetic_scan_export
+from service import BATCH_WINDOW_MS, DEFAULT_HOST, DEFAULT_PORT, MAX_BATCH_ITEMS, ValidationService
+from structured_logging import configure_logging, log_run
+from validation_core import missing_csv_columns, read_reference_csv
+
+
+def write_record(stream, record):
+    stream.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+
+def run_validate(args):
+    """Validate every selected JSON file against one reference CSV."""
+    try:
+        validator = ReferenceCache(args.cache_dir, enabled=not args.no_cache).load_validator(args.csv)
+    except Exception as e:
+        logging.error("Could not load CSV %s: %s", args.csv, e)
+        return 2
+
+    missing = missing_csv_columns(validator.csv_df)
+    if missing:
+        logging.error("Required columns missing in CSV %s: %s", args.csv, missing)
+        return 2
+
+    json_paths = collect_json_paths(args.inputs, recursive=args.recursive)
+    if not json_paths:
+        logging.error("No JSON files to validate.")
+        return 2
+
+    report_names = {}
+    if args.per_file_dir:
+        Path(args.per_file_dir).mkdir(parents=True, exist_ok=True)
+        report_names = report_file_names(json_paths)
+    written_reports = set()
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+
+    failures = 0
+    unmatched_names = UnmatchedNameAggregator() if args.catalog_patch else None
+    try:
+        for record in iter_validation_records(validator, json_paths, workers=args.workers, stream=args.stream,
+                                              profile_dir=args.profile_dir):
+            failures += not record['ok']
+            if unmatched_names is not None:
+                unmatched_names.add_record(record, validator)
+            if args.per_file_dir:
+                report_path = Path(args.per_file_dir) / report_names[record['file']]
+                if report_path in written_reports:
+                    # Another input of this run already wrote this report; keep it
+                    logging.error("Not writing the report of %s: %s was already written by this run",
+                                  record['file'], report_path)
+                    if record['ok']:
+                        failures += 1
+                    continue
+                written_reports.add(report_path)
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    write_record(f, record)
+            else:
+                write_record(output, record)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    logging.info("Validated %s files (%s failed)", len(json_paths), failures)
+    if unmatched_names is not None:
+        patch = unmatched_names.patch(validator)
+        patch.to_csv(args.catalog_patch, index=False)
+        logging.warning("Wrote a Search Names patch for %s distinct unmatched names to %s (%s rows)",
+                        len(unmatched_names), args.catalog_patch, len(patch))
+    return 1 if failures else 0
+
+
+def run_apply_patch(args):
+    """Write the reference CSV with a Search Names patch applied, leaving every other cell as it was."""
+    try:
+        patch = read_patch(args.patch)
+        changed = apply_patch(args.csv, patch, args.output)
+    except Exception as e:
+        logging.error("Could not apply %s to %s: %s", args.patch, args.csv, e)
+        return 2
+    logging.warning("Updated the Search Names of %s rows; wrote %s", len(changed), args.output)
+    # The written catalog must resolve every added name to its row, as one Search Names token
+    unresolved = unresolved_additions(read_reference_csv(args.output), patch, changed)
+    for row, name in unresolved:
+        logging.warning("Row %s: added name %r does not resolve to it as one Search Names token", row, name)
+    return 1 if unresolved else 0
+
+
+def run_serve(args):
+    """Serve validation requests over HTTP until interrupted."""
+    service = ValidationService(ReferenceCache(args.cache_dir, enabled=not args.no_cache), args.csv,
+                                batch_window_ms=args.batch_window_ms, max_batch_items=args.max_batch_items)
+    try:
+        service.load()
+    except Exception as e:
+        logging.error("Could not load CSV %s: %s", args.csv, e)
+        return 2
+
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        logging.warning("Validation service stopped")
+    return 0
+
+
+def _item_options(args):
+    return {'exact_ratio': args.exact_ratio, 'search_ratio': args.search_ratio,
+            'fuzzy_miss_ratio': args.fuzzy_miss_ratio, 'distinct_misses': args.distinct_misses}
+
+
+def run_benchmark(args):
+    """Time each validation stage on synthetic data and save the results."""
+    report = run_benchmarks(args.csv_rows, args.items, repeats=args.repeats, sample_size=args.sample_size,
+                            measure_memory=not args.no_memory, stages=args.stages, seed=args.seed,
+                            **_item_options(args))
+    print(format_report(report))
+    if args.output:
+        save_report(report, args.output)
+        logging.warning("Benchmark results saved to %s", args.output)
+    return 0
+
+
+def run_generate(args):
+    """Write a synthetic reference CSV and scan export."""
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    csv_df = synthetic_reference_csv(args.csv_rows, seed=args.seed)
+    csv_df.to_csv(output_dir / 'reference.csv', index=False)
+    with open(output_dir / 'scan_export.json', 'w', encoding='utf-8') as f:
+        json.dump(synthetic_scan_export(csv_df, args.items, seed=args.seed, **_item_options(args)), f, indent=4)
+    logging.warning("Wrote %s reference rows and %s scan items to %s", args.csv_rows, args.items, output_dir)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='validate_lab_data', description="Headless lab data validation.")
+    parser.add_argument('--log-level', default='WARNING', help="Logging level (default: WARNING)")
+    parser.add_argument('--log-format', choices=('text', 'json'), default='text',
+                        help="Log lines as text or as JSON objects with run ids (default: text)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    # Also accept --log-level after the subcommand; SUPPRESS keeps the top-level value otherwise
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--log-level', default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+    common.add_argument('--log-format', choices=('text', 'json'), default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+
+    validate = subparsers.add_parser('validate', parents=[common],
+                                     help="Validate JSON scan exports against a reference CSV")
+    validate.add_argument('--csv', required=True, help="Reference CSV file")
+    validate.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                          help=f"Where compiled reference catalogs are kept (default: {DEFAULT_CACHE_DIR})")
+    validate.add_argument('--no-cache', action='store_true', help="Always parse the CSV; do not read or write the cache")
+    validate.add_argument('inputs', nargs='+', help="JSON files, directories or glob patterns")
+    validate.add_argument('-r', '--recursive', action='store_true', help="Search directories and ** globs recursively")
+    validate.add_argument('-w', '--workers', type=int, default=1,
+                          help="Worker processes; 0 uses every core (default: 1). Records arrive in completion order")
+    validate.add_argument('--stream', action='store_true', default=None,
+                          help="Stream every JSON file item by item (default: only files of 32 MB or more)")
+    output = validate.add_mutually_exclusive_group()
+    output.add_argument('-o', '--output', help="Write one aggregated JSON Lines report here (default: stdout)")
+    output.add_argument('--per-file-dir',
+                        help="Write one report per input file into this directory, named after its path below the "
+                             "inputs' common directory (sub/a.json -> sub__a.report.jsonl)")
+    validate.add_argument('--profile-dir',
+                          help="Profile each file with cProfile and tracemalloc and write the profiles here")
+    validate.add_argument('--catalog-patch',
+                          help="Write a Search Names patch for the unmatched names of every file to this CSV")
+    validate.set_defaults(handler=run_validate)
+
+    patch = subparsers.add_parser('apply-patch', parents=[common],
+                                  help="Apply a Search Names patch written by validate --catalog-patch")
+    patch.add_argument('--csv', required=True, help="Reference CSV the patch was made for")
+    patch.add_argument('--patch', required=True, help="Patch CSV")
+    patch.add_argument('-o', '--output', required=True, help="Where to write the patched reference CSV")
+    patch.set_defaults(handler=run_apply_patch)
+
+    serve = subparsers.add_parser('serve', parents=[common],
+                                  help="Serve validation requests over HTTP with the reference CSV kept in memory")
+    serve.add_argument('--csv', required=True, help="Reference CSV file")
+    serve.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f"Where compiled reference catalogs are kept (default: {DEFAULT_CACHE_DIR})")
+    serve.add_argument('--no-cache', action='store_true', help="Always parse the CSV; do not read or write the cache")
+    serve.add_argument('--host', default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST})")
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    serve.add_argument('--batch-window-ms', type=float, default=BATCH_WINDOW_MS,
+                       help=f"How long a request waits for others to batch with (default: {BATCH_WINDOW_MS})")
+    serve.add_argument('--max-batch-items', type=int, default=MAX_BATCH_ITEMS,
+                       help=f"Stop adding requests to a batch at this many items (default: {MAX_BATCH_ITEMS})")
+    serve.set_defaults(handler=run_serve)
+
+    # Shape of the synthetic payloads, shared by benchmark and generate
+    synthetic = argparse.ArgumentParser(add_help=False)
+    synthetic.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    synthetic.add_argument('--exact-ratio', type=float, default=0.6,
+                           help="Share of TestNames equal to a Test Name (default: 0.6)")
+    synthetic.add_argument('--search-ratio', type=float, default=0.25,
+                           help="Share of TestNames found only in Search Names (default: 0.25)")
+    synthetic.add_argument('--fuzzy-miss-ratio', type=float, default=0.1,
+                           help="Share of misspelled TestNames; the rest resemble nothing in the CSV (default: 0.1)")
+    synthetic.add_argument('--distinct-misses', type=int, default=50,
+                           help="Distinct misspelled and unknown names to draw from (default: 50)")
+
+    benchmark = subparsers.add_parser('benchmark', parents=[common, synthetic],
+                                      help="Time each validation stage on synthetic data")
+    benchmark.add_argument('--csv-rows', type=int, nargs='+', default=[100, 1000],
+                           help="Reference CSV sizes to benchmark (default: 100 1000)")
+    benchmark.add_argument('--items', type=int, nargs='+', default=[100, 10000],
+                           help="Payload sizes to benchmark (default: 100 10000)")
+    benchmark.add_argument('--repeats', type=int, default=3, help="Timed runs of each stage (default: 3)")
+    benchmark.add_argument('--sample-size', type=int, default=DEFAULT_SAMPLE_SIZE,
+                           help=f"Names timed one call at a time in the per-name stages "
+                                f"(default: {DEFAULT_SAMPLE_SIZE})")
+    benchmark.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES),
+                           help="Stages to run (default: all)")
+    benchmark.add_argument('--no-memory', action='store_true',
+                           help="Skip the extra tracemalloc run that measures each stage's peak memory")
+    benchmark.add_argument('-o', '--output', help="Save the results as JSON here")
+    benchmark.set_defaults(handler=run_benchmark)
+
+    generate = subparsers.add_parser('generate', parents=[common, synthetic],
+                                     help="Write a synthetic reference CSV and scan export")
+    generate.add_argument('output_dir', help="Directory for reference.csv and scan_export.json")
+    generate.add_argument('--csv-rows', type=int, default=1000, help="Reference CSV rows (default: 1000)")
+    generate.add_argument('--items', type=int, default=10000, help="Scan items (default: 10000)")
+    generate.set_defaults(handler=run_generate)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(level=args.log_level.upper(), json_format=args.log_format == 'json', stream=sys.stderr)
+    with log_run():
+        return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
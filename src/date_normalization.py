@@ -0,0 +1,166 @@
+import logging
+import string
+
+import numpy as np
+import pandas as pd
+
+# Formats tried when inferring how a group of dates is written, in order of
+# preference: when two formats parse as many dates, the earlier one wins, so
+# 01/02/2024 reads as January 2nd unless another date of its shape has a day
+# above 12. "ISO8601" accepts any ISO 8601 date or time, with or without an offset.
+DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%Y/%m/%d',
+    '%m/%d/%Y',
+    '%d/%m/%Y',
+    '%m-%d-%Y',
+    '%d-%m-%Y',
+    '%d.%m.%Y',
+    '%m/%d/%y',
+    '%d/%m/%y',
+    '%Y%m%d',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d %H:%M:%S',
+    '%d %b %Y',
+    '%d-%b-%Y',
+    '%b %d, %Y',
+    '%b %d %Y',
+    '%d %B %Y',
+    '%B %d, %Y',
+    '%B %d %Y',
+    'ISO8601',
+)
+# How normalized dates are written; dates parsed with a time keep it.
+ISO_DATE = '%Y-%m-%d'
+ISO_DATETIME = '%Y-%m-%dT%H:%M:%S'
+# Distinct dates of one shape that a format is inferred from.
+INFERENCE_SAMPLE = 200
+# Dates before this, or after today, are flagged as outliers.
+EARLIEST_DATE = pd.Timestamp('1900-01-01')
+# Placeholder values that mean the item has no date, compared lower-cased.
+MISSING_DATES = frozenset(('', 'n/a', 'na', 'none', 'null', 'unknown'))
+
+# Issues a date can be flagged with; dates already in ISO form within range have none.
+MISSING = 'missing'
+INVALID = 'invalid'
+OUTLIER = 'outlier'
+NOT_ISO = 'not ISO'
+
+# Digits become 9 and letters a, so "03/14/2024" and "12/01/2023" share the shape "99/99/9999"
+_SHAPE_TABLE = str.maketrans(string.digits + string.ascii_letters,
+                             '9' * len(string.digits) + 'a' * len(string.ascii_letters))
+
+
+def date_shape(text):
+    """Return the shape of a date string: its digits written 9 and its letters a."""
+    return text.translate(_SHAPE_TABLE)
+
+
+def parse_dates(values, date_format):
+    """Parse date strings with one format, returning a Series of naive Timestamps with NaT for failures.
+
+    Dates with a UTC offset are converted to UTC.
+    """
+    values = pd.Series(values, dtype=object)
+    if date_format == 'ISO8601':
+        return pd.to_datetime(values, format=date_format, errors='coerce', utc=True).dt.tz_localize(None)
+    return pd.to_datetime(values, format=date_format, errors='coerce')
+
+
+def infer_format(values):
+    """Return the DATE_FORMATS entry that parses the most of values, or None if none parses any.
+
+    Only an evenly spaced sample of INFERENCE_SAMPLE values is tried.
+    """
+    sample = values[::max(1, len(values) // INFERENCE_SAMPLE)]
+    best_format, best_count = None, 0
+    for date_format in DATE_FORMATS:
+        count = int(parse_dates(sample, date_format).notna().sum())
+        if count > best_count:
+            best_format, best_count = date_format, count
+            if count == len(sample):
+                break
+    return best_format
+
+
+class DateNormalizer:
+    """Parses item dates in bulk, inferring each date shape's format once and caching it.
+
+    Dates are grouped by shape and each group is parsed in one vectorized call
+    with its format. A cached format is re-inferred only when it fails on some
+    date of a later payload, for example a day above 12 in a shape that was
+    read month first.
+    """
+
+    def __init__(self):
+        self.formats = {}  # date shape -> format, or None when no format fits
+        self.hits = 0
+        self.misses = 0
+
+    def _parse_shape(self, shape, values):
+        """Return (format, parsed dates) for values, which all have shape."""
+        date_format = self.formats.get(shape)
+        if date_format is not None:
+            parsed = parse_dates(values, date_format)
+            if parsed.notna().all():
+                self.hits += 1
+                return date_format, parsed
+        self.misses += 1
+        date_format = infer_format(values)
+        self.formats[shape] = date_format
+        if date_format is None:
+            return None, None
+        return date_format, parse_dates(values, date_format)
+
+    def normalize(self, dates, today=None):
+        """Return (normalized, issues) arrays, one entry per date.
+
+        normalized holds the ISO form of every date that parsed, else None.
+        issues holds MISSING, INVALID, OUTLIER or NOT_ISO, or None for a date
+        already written in ISO form within EARLIEST_DATE and today. Each
+        distinct date is parsed once.
+        """
+        codes, distinct = pd.factorize(pd.Series(dates, dtype=object))
+        # The extra last entry is for missing values, which factorize to -1
+        normalized = np.full(len(distinct) + 1, None, dtype=object)
+        issues = np.full(len(distinct) + 1, MISSING, dtype=object)
+        groups = {}
+        for position, value in enumerate(distinct):
+            if not isinstance(value, str):
+                issues[position] = INVALID
+            elif value.strip().lower() not in MISSING_DATES:
+                groups.setdefault(date_shape(value.strip()), []).append(position)
+
+        latest = (today if today is not None else pd.Timestamp.today()).normalize() + pd.Timedelta(days=1)
+        for shape, positions in groups.items():
+            positions = np.asarray(positions)
+            originals = distinct[positions]
+            values = [value.strip() for value in originals]
+            date_format, parsed = self._parse_shape(shape, values)
+            if date_format is None:
+                issues[positions] = INVALID
+                continue
+            parsed_ok = parsed.notna().to_numpy()
+            if date_format == 'ISO8601':
+                # Already ISO; kept as written so time zones and fractions survive
+                iso = np.asarray(values, dtype=object)
+            else:
+                iso = parsed.dt.strftime(ISO_DATETIME if '%H' in date_format else ISO_DATE).to_numpy(dtype=object)
+            outlier = ((parsed < EARLIEST_DATE) | (parsed >= latest)).to_numpy()
+            group_issues = np.full(len(positions), None, dtype=object)
+            group_issues[iso != np.asarray(originals, dtype=object)] = NOT_ISO
+            group_issues[outlier] = OUTLIER
+            group_issues[~parsed_ok] = INVALID
+            normalized[positions] = np.where(parsed_ok, iso, None)
+            issues[positions] = group_issues
+        logging.debug("Normalized %s distinct dates in %s shapes", len(distinct), len(groups))
+        return normalized[codes], issues[codes]
+
+    def normalize_one(self, value):
+        """Return (normalized, issue) for a single date, such as one typed into the Date tab."""
+        normalized, issues = self.normalize([value])
+        return normalized[0], issues[0]
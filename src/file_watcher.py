@@ -0,0 +1,89 @@
+import logging
+import os
+import time
+
+# How often the watched files are checked.
+WATCH_POLL_MS = 1000
+# How long a changed file must stay unchanged before it is reported, so a burst
+# of writes produces a single notification.
+WATCH_DEBOUNCE_MS = 1500
+
+
+def file_signature(path):
+    """Return (mtime_ns, size) for path, or None if it cannot be read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FileWatcher:
+    """Polls a set of files from the Tk main loop and reports changes once they settle.
+
+    Every poll compares each file's modification time and size with the previous
+    poll. A change starts, or restarts, the debounce period; on_change(paths) is
+    called only after a full period with no further change and with every
+    changed file present, so an export written in several steps triggers once.
+    The watched paths are re-read from get_paths on every poll; choosing other
+    files takes a fresh baseline instead of reporting a change.
+    """
+
+    def __init__(self, root, get_paths, on_change, poll_ms=WATCH_POLL_MS, debounce_ms=WATCH_DEBOUNCE_MS):
+        self.root = root
+        self.get_paths = get_paths
+        self.on_change = on_change
+        self.poll_ms = poll_ms
+        self.debounce_ms = debounce_ms
+        self._signatures = {}
+        self._changed = set()
+        self._last_change = None
+        self._after_id = None
+
+    @property
+    def running(self):
+        return self._after_id is not None
+
+    def _paths(self):
+        return tuple(dict.fromkeys(path for path in self.get_paths() if path))
+
+    def _take_baseline(self, paths):
+        self._signatures = {path: file_signature(path) for path in paths}
+        self._changed.clear()
+        self._last_change = None
+
+    def start(self):
+        """Start polling, treating the files' current state as unchanged."""
+        if self.running:
+            return
+        self._take_baseline(self._paths())
+        self._after_id = self.root.after(self.poll_ms, self._poll)
+        logging.info("Watching %s for changes", ', '.join(self._signatures) or 'no files yet')
+
+    def stop(self):
+        """Stop polling and drop any change that has not been reported yet."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._changed.clear()
+
+    def _poll(self):
+        # Schedule the next poll first so an error in on_change cannot stop the watcher
+        self._after_id = self.root.after(self.poll_ms, self._poll)
+        paths = self._paths()
+        if set(paths) != set(self._signatures):
+            self._take_baseline(paths)
+        else:
+            now = time.monotonic()
+            for path in paths:
+                signature = file_signature(path)
+                if signature != self._signatures[path]:
+                    self._signatures[path] = signature
+                    self._changed.add(path)
+                    self._last_change = now
+            settled = self._changed and (now - self._last_change) * 1000 >= self.debounce_ms
+            if settled and all(self._signatures[path] is not None for path in self._changed):
+                changed = sorted(self._changed)
+                self._changed.clear()
+                logging.info("Watched files changed: %s", ', '.join(changed))
+                self.on_change(changed)
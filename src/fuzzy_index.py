@@ -0,0 +1,140 @@
+import logging
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from fuzzywuzzy import fuzz
+
+# Minimum fuzz.ratio a candidate must exceed to count as a match.
+MATCH_THRESHOLD = 50
+
+# Number of most frequent characters tracked individually in the histogram
+# matrix; every other character is counted in one shared bucket.
+_ALPHABET_SIZE = 63
+
+# Upper limit on the elements of the temporary array used to bound a block of
+# names against every candidate at once.
+_BOUNDS_BLOCK_ELEMENTS = 1 << 22
+
+
+def reference_candidate_names(csv_df):
+    """Return the fuzzy candidates in the order the original scan visited them."""
+    return pd.concat([
+        csv_df['Test Name'].dropna(),
+        csv_df['Search Names'].str.split(',', expand=True).stack().str.strip().reset_index(drop=True)
+    ]).unique()
+
+
+class FuzzyMatcher:
+    """Candidate store for fuzzy Test Name lookups, built once per CSV load.
+
+    fuzz.ratio is 2 * M / (len(a) + len(b)) where M never exceeds the number of
+    characters the two strings share, so a per-candidate character histogram
+    gives an upper bound on every score. Candidates are scored in descending
+    bound order and the scan stops once no remaining bound can beat the best
+    score, which keeps results identical to scoring every candidate in order.
+    """
+
+    def __init__(self, candidate_names):
+        start = time.perf_counter()
+        self.names = list(candidate_names)
+        self._lowered = [name.lower() for name in self.names]
+        self._lengths = np.array([len(name) for name in self._lowered], dtype=np.int64)
+
+        char_counts = Counter(char for name in self._lowered for char in name)
+        alphabet = [char for char, _ in char_counts.most_common(_ALPHABET_SIZE)]
+        self._char_columns = {char: column for column, char in enumerate(alphabet)}
+        self._other_column = len(alphabet)
+        self._histograms = np.zeros((len(self.names), len(alphabet) + 1), dtype=np.uint16)
+        for row, name in enumerate(self._lowered):
+            self._histograms[row] = self._histogram(name)
+
+        self.ratio_calls = 0
+        self.build_seconds = time.perf_counter() - start
+        logging.info("Built fuzzy candidate store with %s names in %.1f ms", len(self.names), self.build_seconds * 1000)
+
+    @classmethod
+    def from_csv(cls, csv_df):
+        """Build the candidate store from the Test Name and Search Names columns."""
+        return cls(reference_candidate_names(csv_df))
+
+    def _histogram(self, lowered):
+        """Count the characters of an already lower-cased name over the store's alphabet."""
+        histogram = np.zeros(self._other_column + 1, dtype=np.int64)
+        for char in lowered:
+            histogram[self._char_columns.get(char, self._other_column)] += 1
+        return np.minimum(histogram, np.iinfo(np.uint16).max).astype(np.uint16)
+
+    def _score_bounds(self, lowered_names):
+        """Yield an upper bound on fuzz.ratio against every candidate, one row per name.
+
+        Bounds are computed for a block of names at a time as one broadcast over
+        the histogram matrix, sized to keep the intermediate array small.
+        """
+        width = self._histograms.shape[1]
+        block = max(1, _BOUNDS_BLOCK_ELEMENTS // max(1, len(self.names) * width))
+        for block_start in range(0, len(lowered_names), block):
+            names = lowered_names[block_start:block_start + block]
+            queries = np.stack([self._histogram(name) for name in names])
+            overlap = np.minimum(queries[:, None, :], self._histograms[None, :, :]).sum(axis=2, dtype=np.int64)
+            total = self._lengths[None, :] + np.array([len(name) for name in names], dtype=np.int64)[:, None]
+            bounds = np.full(overlap.shape, 100, dtype=np.int64)
+            nonempty = total > 0
+            bounds[nonempty] = np.ceil(200 * overlap[nonempty] / total[nonempty]).astype(np.int64)
+            yield from bounds
+
+    @staticmethod
+    def _ordered_candidates(bounds, score_cutoff):
+        """Yield (bound, position) for candidates that could beat score_cutoff, best bound first."""
+        positions = np.flatnonzero(bounds > score_cutoff)
+        order = np.lexsort((positions, -bounds[positions]))
+        for position in positions[order]:
+            yield int(bounds[position]), int(position)
+
+    def _ratio(self, lowered, position):
+        self.ratio_calls += 1
+        return fuzz.ratio(lowered, self._lowered[position])
+
+    def _best_from_bounds(self, lowered, bounds):
+        best_position = None
+        best_score = 0
+        for bound, position in self._ordered_candidates(bounds, MATCH_THRESHOLD):
+            if bound < best_score:
+                break
+            if bound == best_score and position > best_position:
+                continue
+            score = self._ratio(lowered, position)
+            if score > MATCH_THRESHOLD and (score > best_score or
+                                            (score == best_score and position < best_position)):
+                best_score = score
+                best_position = position
+
+        if best_position is None:
+            return None, 0
+        return self.names[best_position], best_score
+
+    def best_match(self, test_name):
+        """Return (best_match, score) exactly as the linear scan with the score > 50 rule would."""
+        lowered = test_name.lower()
+        return self._best_from_bounds(lowered, next(self._score_bounds([lowered])))
+
+    def match_many(self, test_names):
+        """Return {test_name: (best_match, score)} for a batch, scoring each distinct name once."""
+        distinct = list(dict.fromkeys(test_name.lower() for test_name in test_names))
+        best = {lowered: self._best_from_bounds(lowered, bounds)
+                for lowered, bounds in zip(distinct, self._score_bounds(distinct))}
+        return {test_name: best[test_name.lower()] for test_name in test_names}
+
+    def top_k(self, test_name, k=5, score_cutoff=MATCH_THRESHOLD):
+        """Return up to k (name, score) pairs scoring above score_cutoff, best first."""
+        lowered = test_name.lower()
+        found = []
+        for bound, position in self._ordered_candidates(next(self._score_bounds([lowered])), score_cutoff):
+            if len(found) >= k and bound < found[k - 1][0]:
+                break
+            score = self._ratio(lowered, position)
+            if score > score_cutoff:
+                found.append((score, position))
+                found.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [(self.names[position], score) for score, position in found[:k]]
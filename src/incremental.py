@@ -0,0 +1,127 @@
+import json
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import RunMetrics
+from validation_core import ITEM_COLUMN_DEFAULTS, OUTCOME_COLUMNS, LabDataValidator, items_frame
+
+
+def _hashable(value):
+    """Return value, or a canonical JSON string for the list and dict values JSON can hold."""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True, default=repr)
+    return value
+
+
+def item_fingerprints(frame):
+    """Return one hashable fingerprint per item of an items_frame.
+
+    A fingerprint pairs every checked field with its type, so items that only
+    compare equal across types (1, 1.0 and True; None and "None" never do)
+    still get different fingerprints and are never mistaken for each other.
+    """
+    columns = []
+    for field, _ in ITEM_COLUMN_DEFAULTS:
+        values = frame[field].tolist()
+        columns.append(list(zip(map(type, values), map(_hashable, values))))
+    return list(zip(*columns))
+
+
+class IncrementalValidator:
+    """Re-validates a scan export, redoing only the work whose inputs changed since the last run.
+
+    The CSV is fingerprinted by its validator: the reference cache hands back the
+    same validator while the file is unchanged and a new one once it changes.
+    Items are fingerprinted by their checked fields. With the same CSV, only
+    items not seen in the last run are checked; the outcomes of the rest are
+    reused. After a CSV edit, resolved names are carried over to the new
+    validator (see MatchResolver.adopt) and only items whose name could match
+    differently, or that are new, are checked again. Outcomes are only reused
+    for re-runs of the same scan export; a run of another file starts over.
+    """
+
+    def __init__(self):
+        # (source, validator, {fingerprint: position}, outcomes) of the last completed run
+        self._last = None
+
+    def reset(self):
+        """Forget the last run, so the next one checks every item."""
+        self._last = None
+
+    def validate(self, validator, json_data, progress=None, cancel_event=None, full=False, metrics=None,
+                 source=None, strict_names=False):
+        """Validate json_data against validator, reusing what the last run already checked.
+
+        Returns a ValidationResult identical to validator.validate(json_data),
+        with its incremental attribute describing what was recomputed and
+        reused. full=True checks every item but still records the run. source
+        identifies the scan export, such as its resolved path; the last run is
+        only reused when it had the same source. Stage times are added to
+        metrics, or to a new RunMetrics. strict_names is passed on to
+        check_frame.
+        """
+        metrics = metrics if metrics is not None else RunMetrics()
+        with metrics.stage("Item frame"):
+            frame = items_frame(json_data)
+        fingerprint_start = time.perf_counter()
+        fingerprints = item_fingerprints(frame)
+        recheck = np.ones(len(frame), dtype=bool)
+        previous_positions = np.full(len(frame), -1, dtype=np.int64)
+        csv_changed = None
+        names_carried = None
+
+        last = None if full else self._last
+        if last is not None and last[0] != source:
+            logging.info("Incremental validation: a different scan export, checking every item")
+            last = None
+        if last is not None:
+            _, last_validator, last_positions, _ = last
+            csv_changed = last_validator is not validator
+            carried = validator.match_resolver.adopt(last_validator.match_resolver) if csv_changed else None
+            if not csv_changed or carried is not None:
+                previous_positions = np.fromiter((last_positions.get(fingerprint, -1) for fingerprint in fingerprints),
+                                                 dtype=np.int64, count=len(fingerprints))
+                recheck = previous_positions < 0
+                if csv_changed:
+                    names_carried = len(carried)
+                    lowered = frame['TestName'].map(lambda name: name.lower() if isinstance(name, str) else None)
+                    recheck |= ~lowered.isin(list(carried)).to_numpy()
+
+        metrics.add_time("Change detection", time.perf_counter() - fingerprint_start)
+
+        hits, misses = validator.match_resolver.hits, validator.match_resolver.misses
+        positions = np.flatnonzero(recheck)
+        checked = validator.check_frame(frame.iloc[positions], progress, cancel_event, metrics,
+                                        strict_names=strict_names)
+        with metrics.stage("Result assembly"):
+            if len(positions) == len(frame):
+                outcomes = checked
+            else:
+                outcomes = {}
+                reused = last[3]
+                for column in OUTCOME_COLUMNS:
+                    values = reused[column].to_numpy()[np.where(recheck, 0, previous_positions)].copy()
+                    values[positions] = checked[column].to_numpy()
+                    outcomes[column] = values
+                outcomes = pd.DataFrame(outcomes, index=frame.index)
+
+            match_cache = {'hits': validator.match_resolver.hits - hits,
+                           'misses': validator.match_resolver.misses - misses}
+            result = LabDataValidator.result_from_outcomes(frame, outcomes, match_cache)
+        result.metrics = metrics
+        result.incremental = {
+            'csv_changed': csv_changed,  # None when there was no earlier run to compare with
+            'items_rechecked': len(positions),
+            'items_reused': len(frame) - len(positions),
+            'names_carried': names_carried,
+            'names_resolved': match_cache['misses'],
+        }
+        logging.info("Incremental validation: %s items re-checked, %s reused", len(positions),
+                     len(frame) - len(positions))
+
+        # Duplicate items share a fingerprint; any one of them stands for the rest
+        self._last = (source, validator, dict(zip(fingerprints, range(len(fingerprints)))), outcomes)
+        return result
@@ -0,0 +1,125 @@
+import cProfile
+import logging
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Allocation sites and functions listed in a profile summary.
+PROFILE_SUMMARY_LINES = 30
+# Frames kept per allocation traceback while tracemalloc runs.
+TRACEMALLOC_FRAMES = 5
+
+# Report labels for the counters a run collects, in report order.
+COUNTER_LABELS = (
+    ('names_exact', "Names matched by Test Name"),
+    ('names_search', "Names matched by Search Names"),
+    ('names_fuzzy', "Names with a fuzzy suggestion"),
+    ('names_unmatched', "Names with no suggestion"),
+    ('exact_lookups', "Test Name lookups"),
+    ('search_lookups', "Search Names scans"),
+    ('contains_scans', "str.contains scans"),
+    ('fuzz_ratio_calls', "fuzz.ratio calls"),
+    ('log_records', "Log records"),
+    ('log_enqueue_us', "Logging time (µs)"),
+)
+
+
+class RunMetrics:
+    """Wall-clock time per stage and event counts for one validation run.
+
+    Stages are named blocks timed with stage(); timing a name again adds to
+    it, and stages are reported in the order they first ran. Stages must not
+    nest, so their times add up to the run's total. Counters are plain
+    integers added with count().
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as part of stage name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_since(self, before, after):
+        """Add the growth of each counter between two snapshots of lifetime counts."""
+        for name, value in after.items():
+            self.count(name, value - before.get(name, 0))
+
+    def total_seconds(self):
+        return sum(self.stages.values())
+
+    def to_dict(self):
+        """Return the stage times in milliseconds and the counters as JSON-serializable data."""
+        return {
+            'total_ms': round(self.total_seconds() * 1000, 3),
+            'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+    def report_lines(self):
+        """Return the lines of the report's Performance section."""
+        total = self.total_seconds()
+        lines = []
+        for name, seconds in self.stages.items():
+            share = f" ({seconds / total:.0%})" if total else ''
+            lines.append(f"{name}: {seconds * 1000:.1f} ms{share}")
+        lines.append(f"Total: {total * 1000:.1f} ms")
+        for name, label in COUNTER_LABELS:
+            if name in self.counters:
+                lines.append(f"{label}: {self.counters[name]}")
+        return lines
+
+
+@contextmanager
+def profile_capture(profile_dir, name='validation'):
+    """Profile the enclosed block with cProfile and tracemalloc and write both to profile_dir.
+
+    Writes <name>-<timestamp>.prof, which pstats and snakeviz read, and
+    <name>-<timestamp>.txt with the top allocation sites and the functions
+    with the most cumulative time. cProfile only sees the thread the block
+    runs on; tracemalloc sees every thread. Yields {'profile': path,
+    'summary': path}, the files written once the block exits.
+    """
+    profile_dir = Path(profile_dir)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+    profile_path = profile_dir / f"{stem}.prof"
+    summary_path = profile_dir / f"{stem}.txt"
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield {'profile': str(profile_path), 'summary': str(summary_path)}
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+
+        profiler.dump_stats(profile_path)
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(f"Traced memory: {current / 2 ** 20:.1f} MiB current, {peak / 2 ** 20:.1f} MiB peak\n\n")
+            for statistic in snapshot.statistics('lineno')[:PROFILE_SUMMARY_LINES]:
+                f.write(f"{statistic}\n")
+            f.write("\nSlowest functions by cumulative time:\n")
+            stats = pstats.Stats(profiler, stream=f)
+            stats.sort_stats('cumulative').print_stats(PROFILE_SUMMARY_LINES)
+        logging.info("Wrote profile to %s and its summary to %s", profile_path, summary_path)
@@ -0,0 +1,340 @@
+import codecs
+import json
+import math
+import mmap
+import numbers
+import os
+import secrets
+import stat
+
+from structured_logging import ItemTrace
+
+try:
+    import orjson
+except ImportError:  # optional faster encoder for compact output
+    orjson = None
+
+SCAN_ARRAY_KEY = 'enhancedSerScanObject'
+# The item fields the validators and editors read; everything else is dropped while streaming.
+SCAN_ITEM_FIELDS = ('TestName', 'loincCode', 'status', 'unit', 'date', 'result')
+# Patch key holding a function that converts an item's result and unit; never an item field.
+CONVERTER_KEY = '__convert__'
+# Scan exports at least this large are streamed instead of loaded whole.
+STREAMING_THRESHOLD_BYTES = 32 * 1024 * 1024
+# Bytes decoded from the mapped file per buffer refill; doubled while a single value does not fit.
+_READ_SIZE = 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+
+class _MappedText:
+    """Incrementally decoded UTF-8 text over a memory-mapped file.
+
+    Only the unconsumed tail of the text is kept, so memory is bounded by the
+    largest single JSON value rather than by the size of the file.
+    """
+
+    def __init__(self, mapped):
+        self._mapped = mapped
+        self._offset = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.consumed = 0
+
+    @property
+    def exhausted(self):
+        return self._offset >= len(self._mapped)
+
+    def fill(self, size=None):
+        """Decode more of the file into the buffer; returns False at end of file."""
+        if self.exhausted:
+            return False
+        size = size or _READ_SIZE
+        chunk = self._mapped[self._offset:self._offset + size]
+        self._offset += len(chunk)
+        if self.pos:
+            self.consumed += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += self._decoder.decode(chunk, final=self.exhausted)
+        return True
+
+    def skip_whitespace(self):
+        """Advance past whitespace and return the next character, or '' at end of file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        if self.skip_whitespace() != char:
+            self.error(f"Expecting '{char}' delimiter")
+        self.pos += 1
+
+    def decode_value(self):
+        """Decode the JSON value at the current position, reading more of the file as needed."""
+        self.skip_whitespace()
+        size = _READ_SIZE
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill(size):
+                    raise
+                size *= 2
+                continue
+            # A value at the very end of the buffer, or a number followed only by
+            # characters a number can contain, may continue in the next chunk
+            if (end == len(self.buffer) or (isinstance(value, (int, float)) and
+                                            all(char in _NUMBER_CHARS for char in self.buffer[end:]))):
+                if self.fill(size):
+                    continue
+            self.pos = end
+            return value
+
+    def error(self, message):
+        raise json.JSONDecodeError(message, self.buffer, self.pos)
+
+
+def iter_scan_items(json_file_path, fields=SCAN_ITEM_FIELDS):
+    """Yield the enhancedSerScanObject items of a scan export one at a time.
+
+    The file is memory-mapped and decoded incrementally, and only the given
+    fields of each item are kept (pass fields=None to keep whole items), so
+    memory is bounded by the size of one item rather than the whole file.
+    Malformed input raises json.JSONDecodeError, like json.load.
+    """
+    with open(json_file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise json.JSONDecodeError("Expecting value", "", 0)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            text = _MappedText(mapped)
+            if text.skip_whitespace() != '{':
+                raise ValueError("Expected a JSON object at the top level of the scan export")
+            text.pos += 1
+            yield from _iter_top_level(text, fields)
+
+
+def _iter_top_level(text, fields):
+    if text.skip_whitespace() == '}':
+        return
+    while True:
+        key = text.decode_value()
+        if not isinstance(key, str):
+            text.error("Expecting property name enclosed in double quotes")
+        text.expect(':')
+        if key == SCAN_ARRAY_KEY and text.skip_whitespace() == '[':
+            text.pos += 1
+            yield from _iter_array_items(text, fields)
+        else:
+            value = text.decode_value()
+            if key == SCAN_ARRAY_KEY:
+                yield from (_slim(item, fields) for item in value or [])
+
+        following = text.skip_whitespace()
+        if following == '}':
+            return
+        if following != ',':
+            text.error("Expecting ',' delimiter")
+        text.pos += 1
+
+
+def _iter_array_items(text, fields):
+    if text.skip_whitespace() == ']':
+        text.pos += 1
+        return
+    while True:
+        yield _slim(text.decode_value(), fields)
+        following = text.skip_whitespace()
+        text.pos += 1
+        if following == ']':
+            return
+        if following != ',':
+            text.pos -= 1
+            text.error("Expecting ',' delimiter")
+
+
+def _slim(item, fields):
+    if fields is None or not isinstance(item, dict):
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def should_stream(json_file_path, threshold=STREAMING_THRESHOLD_BYTES):
+    """Return True if a scan export is large enough to be streamed."""
+    return os.path.getsize(json_file_path) >= threshold
+
+
+def index_items_by_name(items):
+    """Map each TestName to the positions of the items that carry it."""
+    return index_names(item.get('TestName') for item in items)
+
+
+def index_names(names):
+    """Map each name to the positions it appears at, for items whose TestNames are already listed."""
+    indices = {}
+    for position, name in enumerate(names):
+        indices.setdefault(name, []).append(position)
+    return indices
+
+
+def build_item_patches(indices_by_name, status_updates, unit_updates, date_updates, conversions=None):
+    """Turn per-TestName edits into {item position: {field: new value}}.
+
+    conversions maps TestNames to a function that converts one item's result
+    and unit in place; it is stored in the patch under CONVERTER_KEY.
+    """
+    patches = {}
+    for field, updates in ((CONVERTER_KEY, conversions or {}), ('status', status_updates), ('unit', unit_updates),
+                           ('date', date_updates)):
+        for test_name, value in updates.items():
+            for position in indices_by_name.get(test_name, ()):
+                patches.setdefault(position, {})[field] = value
+    return patches
+
+
+def fill_item_patches(patches, field, positions, values):
+    """Patch field of the items at positions to values, except where an edit already sets it.
+
+    Returns how many patches were added; used for per-item values such as
+    normalized dates, which give way to edits made by TestName.
+    """
+    added = 0
+    for position, value in zip(positions, values):
+        patch = patches.setdefault(position, {})
+        if field not in patch:
+            patch[field] = value
+            added += 1
+    return added
+
+
+def apply_item_patches(items, patches):
+    """Yield items with their patch applied to a copy; unpatched items pass through untouched.
+
+    A patch's converter runs first, on the item as exported, then its fields
+    are set. The items given are never changed, so saving again starts from
+    the loaded document and applies each edit and conversion exactly once.
+    """
+    trace = ItemTrace()
+    for position, item in enumerate(items):
+        patch = patches.get(position)
+        if patch:
+            item = dict(item)
+            fields = patch
+            if CONVERTER_KEY in patch:
+                fields = {field: value for field, value in patch.items() if field != CONVERTER_KEY}
+                patch[CONVERTER_KEY](item)
+            item.update(fields)
+            if trace.enabled:
+                trace(position, "Patched item %s (%s): %s", position, item.get('TestName'), fields)
+        yield item
+
+
+def _orjson_exact(value):
+    """Tell whether orjson writes value with the values json.dumps writes.
+
+    orjson writes NaN and infinite floats as null, rejects integers beyond 64
+    bits and keys that are not strings, so items holding any of those are
+    encoded with json instead.
+    """
+    kind = type(value)
+    # Exact type checks first: items are almost entirely plain JSON values
+    if kind is str or kind is bool or value is None:
+        return True
+    if kind is dict:
+        for key, field in value.items():
+            if type(key) is not str or not _orjson_exact(field):
+                return False
+        return True
+    if kind is int:
+        return -2 ** 63 <= value < 2 ** 64
+    if kind is float:
+        return value - value == 0  # False for NaN and infinities
+    if isinstance(value, dict):
+        return all(isinstance(key, str) and _orjson_exact(field) for key, field in value.items())
+    if isinstance(value, (list, tuple)):
+        return all(_orjson_exact(element) for element in value)
+    if isinstance(value, numbers.Integral):
+        return -2 ** 63 <= value < 2 ** 64
+    if isinstance(value, numbers.Real):
+        return math.isfinite(value)
+    return True
+
+
+def _item_encoder(compact, use_orjson):
+    if use_orjson:
+        if orjson is None:
+            raise RuntimeError("orjson is not installed")
+
+        def encode(item):
+            if _orjson_exact(item):
+                return orjson.dumps(item, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+            return json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+
+        return encode
+    if compact:
+        return lambda item: json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+    # Match json.dump(items, f, indent=4): every item sits one level deep. Strings
+    # never contain raw newlines, so each newline in the dump is indentation.
+    return lambda item: '    ' + json.dumps(item, indent=4, ensure_ascii=False).replace('\n', '\n    ')
+
+
+def _create_temp_file(output_path):
+    """Create and open a new temporary file next to output_path; returns (fd, path).
+
+    The file is created with mode 0o666 so the kernel applies the umask, as
+    open() would for a new file, without the process umask ever being changed.
+    """
+    directory = os.path.dirname(os.path.abspath(output_path))
+    while True:
+        temp_path = os.path.join(directory, f'.{os.path.basename(output_path)}.{secrets.token_hex(4)}.tmp')
+        try:
+            return os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+def write_json_array(output_path, items, compact=False, use_orjson=False):
+    """Write items as a JSON array one item at a time, replacing output_path atomically.
+
+    The default output is byte-for-byte what json.dump(list(items), f, indent=4,
+    ensure_ascii=False) writes. compact drops the indentation; use_orjson
+    encodes compactly with orjson when it is installed, except for items
+    orjson would write differently (see _orjson_exact), which json encodes,
+    so the data saved never depends on orjson. Items are written to a
+    temporary file next to output_path that is renamed over it only once the
+    array is complete, so a failed save never leaves a truncated file. A
+    replaced file keeps its permissions; a new one gets the umask's. Returns the number of items written.
+    """
+    encode = _item_encoder(compact, use_orjson)
+    separator, opening, closing = (',', '[', ']') if compact or use_orjson else (',\n', '[\n', '\n]')
+    trace = ItemTrace()
+    fd, temp_path = _create_temp_file(output_path)
+    count = 0
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for item in items:
+                encoded = encode(item)
+                if trace.enabled:
+                    trace(count, "Saving item %s: %s", count, encoded)
+                f.write((separator if count else opening) + encoded)
+                count += 1
+            f.write(closing if count else '[]')
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(temp_path, stat.S_IMODE(os.stat(output_path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return count
@@ -0,0 +1,190 @@
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+# Distinct normalized TestNames remembered between validation runs.
+DEFAULT_MATCH_CACHE_SIZE = 50000
+
+# Marks a record field that has not been looked up yet.
+_UNSET = object()
+
+
+class MatchRecord:
+    """What the checks derive from one normalized TestName.
+
+    match_kind and row come from the reference index straight away; the other
+    fields are filled in the first time a check asks for them, so a status-only
+    lookup never needs the Loinc column or the fuzzy matcher.
+    """
+
+    __slots__ = ('match_kind', 'row', 'expected_loinc', 'closest_match', 'similarity', 'suggestion_row', 'suggested_test_name')
+
+    def __init__(self, match_kind, row):
+        self.match_kind = match_kind
+        self.row = row
+        self.expected_loinc = _UNSET
+        self.closest_match = _UNSET
+        self.similarity = None
+        self.suggestion_row = None
+        self.suggested_test_name = None
+
+    @property
+    def fuzzy_resolved(self):
+        return self.closest_match is not _UNSET
+
+    def copy(self, keep_fuzzy=True):
+        """Return a copy of the record, optionally dropping its fuzzy match and suggestion."""
+        record = MatchRecord(self.match_kind, self.row)
+        record.expected_loinc = self.expected_loinc
+        if keep_fuzzy:
+            record.closest_match = self.closest_match
+            record.similarity = self.similarity
+            record.suggestion_row = self.suggestion_row
+            record.suggested_test_name = self.suggested_test_name
+        return record
+
+
+class MatchResolver:
+    """Memoized TestName resolution over one reference index.
+
+    Names are normalized the way every lookup compares them (lower-cased), so
+    duplicate TestNames within a payload and repeated names across runs resolve
+    once. Records live in a bounded LRU owned by the validator, which the
+    reference cache keeps for as long as the CSV is unchanged, so the cache is
+    dropped together with the index it was built from.
+    """
+
+    def __init__(self, reference_index, max_size=DEFAULT_MATCH_CACHE_SIZE):
+        self.reference_index = reference_index
+        self.max_size = max_size
+        self._records = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # Records hold the in-process _UNSET marker, so they are never pickled;
+        # an unpickled resolver starts empty.
+        state = self.__dict__.copy()
+        state['_records'] = OrderedDict()
+        state['hits'] = 0
+        state['misses'] = 0
+        return state
+
+    def __len__(self):
+        return len(self._records)
+
+    def resolve(self, test_name):
+        """Return the MatchRecord for test_name, resolving it against the index on a miss."""
+        key = test_name.lower()
+        record = self._records.get(key)
+        if record is not None:
+            self._records.move_to_end(key)
+            self.hits += 1
+            return record
+
+        self.misses += 1
+        record = MatchRecord(*self.reference_index.find_row(test_name))
+        self._records[key] = record
+        if len(self._records) > self.max_size:
+            self._records.popitem(last=False)
+        return record
+
+    @staticmethod
+    def range_row(record):
+        """Return the row whose Calculated range applies to the record, or -1 for an unmatched name."""
+        return record.row if record.match_kind is not None else -1
+
+    def calculated_range(self, record):
+        """Return the record's Calculated range, or "Not found" for an unmatched name."""
+        return self.reference_index.ranges.text[self.range_row(record)]
+
+    def expected_loinc(self, record):
+        """Return the Loinc of the record's matched row."""
+        if record.expected_loinc is _UNSET:
+            record.expected_loinc = self.reference_index.value(record.row, 'Loinc')
+        return record.expected_loinc
+
+    def resolve_fuzzy(self, unmatched):
+        """Fill in the closest match and suggestion of (test_name, record) pairs not scored yet.
+
+        Returns the number of names that had to be fuzzy-matched.
+        """
+        pending = {}
+        for test_name, record in unmatched:
+            if not record.fuzzy_resolved:
+                pending.setdefault(id(record), (test_name, record))
+        if not pending:
+            return 0
+
+        reference_index = self.reference_index
+        names = [test_name for test_name, _ in pending.values()]
+        closest_matches = reference_index.fuzzy_matcher.match_many(names)
+        for test_name, record in pending.values():
+            closest_match, similarity = closest_matches[test_name]
+            if closest_match:
+                record.suggestion_row = reference_index.suggestion_row(closest_match)
+                if record.suggestion_row is not None:
+                    record.suggested_test_name = reference_index.value(record.suggestion_row, 'Test Name')
+            record.similarity = similarity
+            record.closest_match = closest_match
+        logging.debug("Fuzzy-matched %s unmatched names", len(pending))
+        return len(pending)
+
+    def adopt(self, previous):
+        """Carry over the records of a resolver built on an earlier version of this CSV.
+
+        The two CSVs are compared row by row. A record is carried over unless
+        its matched row changed, or a changed row's Test Name equals the name or
+        its Search Names contain it (before or after the edit), since either
+        could change which row matches first. Unmatched records lose their fuzzy
+        suggestion when any Test Name or Search Names cell changed.
+
+        Returns the set of normalized names carried over intact, or None when
+        rows were added, removed or reordered and nothing could be carried.
+        """
+        old_df = previous.reference_index.csv_df
+        new_df = self.reference_index.csv_df
+        if (old_df.shape != new_df.shape or not old_df.columns.equals(new_df.columns)
+                or not old_df.index.equals(new_df.index)):
+            return None
+
+        differs = (old_df != new_df) & ~(old_df.isna() & new_df.isna())
+        changed_rows = set(np.flatnonzero(differs.to_numpy().any(axis=1)).tolist())
+        name_columns = [column for column in ('Test Name', 'Search Names') if column in new_df.columns]
+        touched_test_names = set()
+        touched_search_names = []
+        names_changed = np.flatnonzero(differs[name_columns].to_numpy().any(axis=1)) if name_columns else []
+        for row in names_changed:
+            for df in (old_df, new_df):
+                test_name = df['Test Name'].iat[row] if 'Test Name' in df.columns else None
+                if isinstance(test_name, str):
+                    touched_test_names.add(test_name.lower())
+                search_names = df['Search Names'].iat[row] if 'Search Names' in df.columns else None
+                if isinstance(search_names, str):
+                    touched_search_names.append(search_names.lower())
+        touched_search_text = '\x00'.join(touched_search_names)
+
+        carried = set()
+        for key, record in previous._records.items():
+            if record.row in changed_rows or key in touched_test_names or key in touched_search_text:
+                continue
+            keep_fuzzy = record.match_kind is not None or not len(names_changed)
+            self._records[key] = record.copy(keep_fuzzy)
+            if keep_fuzzy:
+                carried.add(key)
+        while len(self._records) > self.max_size:
+            self._records.popitem(last=False)
+        logging.info("Carried %s of %s resolved names over to the edited CSV (%s rows changed)", len(carried),
+                     len(previous._records), len(changed_rows))
+        return carried
+
+    def stats(self):
+        """Return the cache size and its lifetime hit and miss counts."""
+        return {'size': len(self._records), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        """Forget every resolved name and reset the counters."""
+        self._records.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,195 @@
+import hashlib
+import hmac
+import logging
+import os
+import pickle
+import secrets
+import stat
+import tempfile
+import time
+from pathlib import Path
+
+from validation_core import LabDataValidator, missing_csv_columns, read_reference_csv
+
+# Bump whenever the pickled validator, index or fuzzy store classes change shape.
+CACHE_FORMAT_VERSION = 7
+DEFAULT_CACHE_DIR = Path(os.environ.get('LAB_VALIDATOR_CACHE_DIR', Path.home() / '.cache' / 'lab_data_validator'))
+# Secret the entries are signed with, created in the cache directory on first write.
+CACHE_KEY_NAME = 'catalog.key'
+_HASH_BLOCK_SIZE = 1024 * 1024
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def _owned_privately(st):
+    """Tell whether a stat result belongs to this user and no one else can write it."""
+    if not hasattr(os, 'getuid'):
+        # Windows keeps the cache under the user's profile, which others cannot write
+        return True
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def csv_content_hash(csv_file_path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(csv_file_path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ReferenceCache:
+    """Compiled reference catalogs: the parsed CSV with its lookup and fuzzy indexes prebuilt.
+
+    Each CSV gets one pickle in cache_dir holding its validator together with the
+    path, mtime, size and SHA-256 it was built from. A CSV whose mtime and size
+    are unchanged loads straight from the pickle; otherwise its content hash
+    decides whether the entry is still good, and a changed CSV is re-parsed and
+    the entry replaced. The validator last loaded for each path is also kept in
+    memory, so repeated runs in one process skip even the unpickling.
+
+    Unpickling runs code, so an entry is only loaded if it carries a valid
+    HMAC-SHA256 of its pickle under a key only this user can read, and both
+    the entry and the key file belong to this user and no one else can write
+    them. The cache directory is created private (0700). Any other entry is
+    ignored and rebuilt.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, enabled=True):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+        self._loaded = {}
+        self._key = None
+
+    def _signing_key(self, create=False):
+        """Return the key entries are signed with, or None if there is no trustworthy one.
+
+        With create, a missing key (and the private cache directory) is created.
+        """
+        if self._key is not None:
+            return self._key
+        key_path = self.cache_dir / CACHE_KEY_NAME
+        if create:
+            self.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            try:
+                fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                pass
+            else:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(secrets.token_bytes(32))
+        try:
+            with open(key_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                key = f.read()
+        except FileNotFoundError:
+            return None
+        if not _owned_privately(st) or st.st_mode & (stat.S_IRGRP | stat.S_IROTH) or len(key) < 32:
+            logging.warning("Ignoring reference cache key %s: it is not private to this user", key_path)
+            return None
+        self._key = key
+        return key
+
+    def _entry_path(self, resolved_path):
+        name = hashlib.sha1(str(resolved_path).encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{name}.v{CACHE_FORMAT_VERSION}.pickle"
+
+    def load_validator(self, csv_file_path):
+        """Return a LabDataValidator for the CSV, from the cache when it is still current."""
+        start = time.perf_counter()
+        resolved_path = Path(csv_file_path).resolve()
+        file_stat = os.stat(resolved_path)
+        key = (file_stat.st_mtime_ns, file_stat.st_size)
+
+        loaded = self._loaded.get(resolved_path)
+        if loaded is not None and loaded[0] == key:
+            logging.info("Reusing the reference catalog already loaded for %s", csv_file_path)
+            return loaded[1]
+
+        validator = None
+        entry = self._read_entry(resolved_path) if self.enabled else None
+        content_hash = None
+        if entry is not None:
+            if (entry['mtime_ns'], entry['size']) == key:
+                validator = entry['validator']
+            else:
+                content_hash = csv_content_hash(resolved_path)
+                if content_hash == entry['sha256']:
+                    validator = entry['validator']
+                    self._write_entry(resolved_path, key, content_hash, validator)
+
+        if validator is not None:
+            logging.info("Loaded compiled reference catalog for %s in %.1f ms", csv_file_path,
+                         (time.perf_counter() - start) * 1000)
+        else:
+            validator = LabDataValidator(read_reference_csv(resolved_path))
+            if self.enabled and not missing_csv_columns(validator.csv_df):
+                # Build the fuzzy candidates now so the cached catalog includes them
+                validator.reference_index.fuzzy_matcher
+                self._write_entry(resolved_path, key, content_hash or csv_content_hash(resolved_path), validator)
+
+        self._loaded[resolved_path] = (key, validator)
+        return validator
+
+    def _read_entry(self, resolved_path):
+        entry_path = self._entry_path(resolved_path)
+        try:
+            with open(entry_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logging.warning("Ignoring unreadable reference cache %s: %s", entry_path, e)
+            return None
+        signing_key = self._signing_key()
+        if signing_key is None or not _owned_privately(st):
+            logging.warning("Ignoring reference cache %s: it or its key is missing or not private to this user",
+                            entry_path)
+            return None
+        digest, payload = data[:_DIGEST_SIZE], data[_DIGEST_SIZE:]
+        if not hmac.compare_digest(digest, hmac.new(signing_key, payload, hashlib.sha256).digest()):
+            logging.warning("Ignoring reference cache %s: its signature does not match", entry_path)
+            return None
+        try:
+            entry = pickle.loads(payload)
+        except Exception as e:
+            logging.warning("Ignoring unreadable reference cache %s: %s", entry_path, e)
+            return None
+        if entry.get('version') != CACHE_FORMAT_VERSION or entry.get('path') != str(resolved_path):
+            return None
+        return entry
+
+    def _write_entry(self, resolved_path, key, content_hash, validator):
+        entry = {
+            'version': CACHE_FORMAT_VERSION,
+            'path': str(resolved_path),
+            'mtime_ns': key[0],
+            'size': key[1],
+            'sha256': content_hash,
+            'validator': validator,
+        }
+        entry_path = self._entry_path(resolved_path)
+        try:
+            signing_key = self._signing_key(create=True)
+            if signing_key is None:
+                return
+            payload = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+            # mkstemp creates the file readable and writable by this user only
+            fd, temp_path = tempfile.mkstemp(prefix=entry_path.name + '.', suffix='.tmp', dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(hmac.new(signing_key, payload, hashlib.sha256).digest())
+                    f.write(payload)
+                os.replace(temp_path, entry_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            logging.info("Saved compiled reference catalog to %s", entry_path)
+        except Exception as e:
+            logging.warning("Could not write reference cache %s: %s", entry_path, e)
+
+    def clear(self):
+        """Forget the in-memory catalogs and delete every cache entry."""
+        self._loaded.clear()
+        for entry_path in self.cache_dir.glob(f"*.v{CACHE_FORMAT_VERSION}.pickle"):
+            entry_path.unlink(missing_ok=True)
@@ -0,0 +1,161 @@
+import logging
+import re
+import time
+from bisect import bisect_right
+
+from fuzzy_index import FuzzyMatcher
+from reference_ranges import ReferenceRanges
+from unit_conversion import ReferenceUnits
+
+# Separator used when joining Search Names into one searchable string. It never
+# appears in a CSV cell, so a substring hit can never span two rows.
+_ROW_SEPARATOR = '\x00'
+
+
+class ReferenceIndex:
+    """Lookup structures over the reference CSV, built once per CSV load.
+
+    Matching follows the original DataFrame scans exactly: the exact lookup is a
+    lower-cased comparison on 'Test Name' and the fallback is a case-insensitive
+    substring search over the raw 'Search Names' cell, returning the first row.
+    """
+
+    def __init__(self, csv_df):
+        start = time.perf_counter()
+        self.csv_df = csv_df
+        self.test_name_rows = {}
+        self.search_token_rows = {}
+        self._search_text = ''
+        self._token_segments = {}
+        self._segment_starts = []
+        self._segment_ends = []
+        self._segment_rows = []
+        self._fuzzy_matcher = None
+        self._suggestion_rows = {}
+        # Lifetime lookup counts and times, read by run instrumentation as differences
+        self.exact_lookups = 0
+        self.search_lookups = 0
+        self.contains_scans = 0
+        self.exact_seconds = 0.0
+        self.search_seconds = 0.0
+
+        if 'Test Name' in csv_df.columns:
+            self._build_test_name_map(csv_df['Test Name'])
+        if 'Search Names' in csv_df.columns:
+            self._build_search_names_index(csv_df['Search Names'])
+        # Every row's Calculated range, parsed once for the status suggestions
+        self.ranges = ReferenceRanges(csv_df['Calculated range'] if 'Calculated range' in csv_df.columns
+                                      else [None] * len(csv_df))
+        # Every row's Unit and the analyte its Test Name names, the targets of unit conversions
+        self.units = ReferenceUnits(*(csv_df[column] if column in csv_df.columns else [None] * len(csv_df)
+                                      for column in ('Test Name', 'Unit')))
+
+        self.build_seconds = time.perf_counter() - start
+        logging.info("Built reference index over %s rows in %.1f ms (%s test names, %s search tokens)", len(csv_df),
+                     self.build_seconds * 1000, len(self.test_name_rows), len(self.search_token_rows))
+
+    def _build_test_name_map(self, test_names):
+        """Map each lower-cased Test Name to the first row that carries it."""
+        for row, name in enumerate(test_names):
+            if isinstance(name, str):
+                self.test_name_rows.setdefault(name.lower(), row)
+
+    def _build_search_names_index(self, search_names):
+        """Build the comma-split token map and the substring index over Search Names."""
+        segments = []
+        offset = 0
+        for row, names in enumerate(search_names):
+            if not isinstance(names, str):
+                continue
+            lowered = names.lower()
+            segment = len(segments)
+            segments.append(lowered)
+            self._segment_starts.append(offset)
+            self._segment_rows.append(row)
+            offset += len(lowered)
+            self._segment_ends.append(offset)
+            offset += len(_ROW_SEPARATOR)
+            for token in lowered.split(','):
+                self._token_segments.setdefault(token.strip(), segment)
+        self._search_text = _ROW_SEPARATOR.join(segments)
+        self.search_token_rows = {token: self._segment_rows[segment]
+                                  for token, segment in self._token_segments.items()}
+
+    def exact_row(self, test_name):
+        """Return the first row whose Test Name equals test_name (case-insensitive), or None."""
+        return self.test_name_rows.get(test_name.lower())
+
+    def search_names_row(self, test_name):
+        """Return the first row whose Search Names contains test_name (case-insensitive), or None."""
+        if not self._segment_rows:
+            return None
+
+        needle = test_name.lower()
+        if _ROW_SEPARATOR in needle:
+            self.contains_scans += 1
+            escaped = re.escape(test_name)
+            matches = self.csv_df['Search Names'].str.contains(escaped, case=False, na=False).to_numpy()
+            rows = matches.nonzero()[0]
+            return int(rows[0]) if len(rows) else None
+
+        # A token hit proves some row contains the needle, so only the text up to
+        # the end of that row has to be scanned for an earlier occurrence.
+        end = len(self._search_text)
+        segment = self._token_segments.get(needle)
+        if segment is not None:
+            end = self._segment_ends[segment]
+
+        position = self._search_text.find(needle, 0, end)
+        if position == -1:
+            return None
+        return self._segment_rows[bisect_right(self._segment_starts, position) - 1]
+
+    def find_row(self, test_name):
+        """Resolve test_name to (match_kind, row), where match_kind is 'exact', 'search' or None."""
+        start = time.perf_counter()
+        row = self.exact_row(test_name)
+        searched = time.perf_counter()
+        self.exact_lookups += 1
+        self.exact_seconds += searched - start
+        if row is not None:
+            return 'exact', row
+        row = self.search_names_row(test_name)
+        self.search_lookups += 1
+        self.search_seconds += time.perf_counter() - searched
+        if row is not None:
+            return 'search', row
+        return None, None
+
+    def value(self, row, column):
+        """Return the value of column in the given row of the reference CSV."""
+        return self.csv_df[column].iloc[row]
+
+    @property
+    def fuzzy_matcher(self):
+        """The fuzzy candidate store, built on first use and kept for the life of the index."""
+        if self._fuzzy_matcher is None:
+            self._fuzzy_matcher = FuzzyMatcher.from_csv(self.csv_df)
+        return self._fuzzy_matcher
+
+    def counters(self):
+        """Return the lifetime lookup counts of the index and its fuzzy matcher."""
+        return {
+            'exact_lookups': self.exact_lookups,
+            'search_lookups': self.search_lookups,
+            'contains_scans': self.contains_scans,
+            'fuzz_ratio_calls': self._fuzzy_matcher.ratio_calls if self._fuzzy_matcher is not None else 0,
+        }
+
+    def suggestion_row(self, closest_match):
+        """Return the first row whose Test Name or Search Names contains closest_match, or None.
+
+        closest_match is used as a pattern, as the original suggestion lookup did;
+        results are cached because the same candidate is suggested repeatedly.
+        """
+        if closest_match not in self._suggestion_rows:
+            self.contains_scans += 1
+            matches = (self.csv_df['Test Name'].str.contains(closest_match, case=False, na=False) |
+                       self.csv_df['Search Names'].str.contains(closest_match, case=False, na=False))
+            rows = matches.to_numpy().nonzero()[0]
+            self._suggestion_rows[closest_match] = int(rows[0]) if len(rows) else None
+        return self._suggestion_rows[closest_match]
@@ -0,0 +1,134 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+# A number as ranges write it: optional sign, digits with an optional decimal part, or a bare decimal part.
+_NUMBER = r'[-+]?(?:\d+(?:\.\d*)?|\.\d+)'
+# "3.5-5.0" (also with an en dash or "to"), or one bound: "<200", ">=40", "≤ 5".
+RANGE_PATTERN = (rf'^\s*(?:(?P<low>{_NUMBER})\s*(?:-|–|to)\s*(?P<high>{_NUMBER})'
+                 rf'|(?P<op><=|>=|=<|=>|<|>|≤|≥)\s*(?P<bound>{_NUMBER}))\s*$')
+# Statuses suggested for results inside and outside their range, in the status vocabulary.
+IN_RANGE = 'inRange'
+OUT_OF_RANGE = 'outOfRange'
+_UPPER_OPERATORS = {'<': False, '<=': True, '=<': True, '≤': True}
+_LOWER_OPERATORS = {'>': False, '>=': True, '=>': True, '≥': True}
+
+
+def parse_ranges(ranges):
+    """Parse reference range strings into numeric bounds, one row per input.
+
+    Returns a DataFrame with float columns low and high (NaN where a side is
+    unbounded), boolean columns low_inclusive and high_inclusive, and parsed,
+    which is False for values that are not a range in a supported form. Each
+    distinct string is parsed once.
+    """
+    ranges = pd.Series(ranges, dtype=object).reset_index(drop=True)
+    codes, distinct = pd.factorize(ranges)
+    text = pd.Series(distinct, dtype=object)
+    # Non-text values become NaN and fail to match
+    text = text.where(text.map(lambda value: isinstance(value, str)))
+    parts = text.str.extract(RANGE_PATTERN)
+
+    low = pd.to_numeric(parts['low'], errors='coerce').to_numpy(dtype=float)
+    high = pd.to_numeric(parts['high'], errors='coerce').to_numpy(dtype=float)
+    low_inclusive = parts['low'].notna().to_numpy()
+    high_inclusive = low_inclusive.copy()
+    bound = pd.to_numeric(parts['bound'], errors='coerce').to_numpy(dtype=float)
+    operators = parts['op']
+    upper = operators.isin(list(_UPPER_OPERATORS)).to_numpy()
+    lower = operators.isin(list(_LOWER_OPERATORS)).to_numpy()
+    high[upper] = bound[upper]
+    high_inclusive[upper] = operators[upper].map(_UPPER_OPERATORS).to_numpy(dtype=bool)
+    low[lower] = bound[lower]
+    low_inclusive[lower] = operators[lower].map(_LOWER_OPERATORS).to_numpy(dtype=bool)
+    parsed = low_inclusive | upper | lower
+    # A range written high-to-low is still a range
+    swapped = parsed & (low > high)
+    low[swapped], high[swapped] = high[swapped], low[swapped]
+
+    distinct_bounds = pd.DataFrame({'low': low, 'high': high, 'low_inclusive': low_inclusive,
+                                    'high_inclusive': high_inclusive, 'parsed': parsed})
+    # Rows that factorized to -1 (missing values) take the unparsed row appended last
+    unparsed = pd.DataFrame({'low': [np.nan], 'high': [np.nan], 'low_inclusive': [False],
+                             'high_inclusive': [False], 'parsed': [False]})
+    table = pd.concat([distinct_bounds, unparsed], ignore_index=True)
+    return table.iloc[np.where(codes < 0, len(distinct), codes)].reset_index(drop=True)
+
+
+def numeric_results(results):
+    """Convert result values to floats, NaN where a result is not a plain number."""
+    return pd.to_numeric(pd.Series(results, dtype=object).reset_index(drop=True), errors='coerce').to_numpy(
+        dtype=float)
+
+
+def within_range(results, bounds):
+    """Compare numeric results with parsed bounds, one pair per row.
+
+    bounds maps low, high, low_inclusive, high_inclusive and parsed to arrays,
+    as parse_ranges and ReferenceRanges.bounds return them. Returns (within,
+    comparable): comparable is False where the result is not a number or the
+    range did not parse, and within is only meaningful where comparable is True.
+    """
+    low = np.asarray(bounds['low'])
+    high = np.asarray(bounds['high'])
+    low_inclusive = np.asarray(bounds['low_inclusive'])
+    high_inclusive = np.asarray(bounds['high_inclusive'])
+    comparable = np.asarray(bounds['parsed']) & ~np.isnan(results)
+    with np.errstate(invalid='ignore'):
+        above_low = np.isnan(low) | np.where(low_inclusive, results >= low, results > low)
+        below_high = np.isnan(high) | np.where(high_inclusive, results <= high, results < high)
+    return comparable & above_low & below_high, comparable
+
+
+def suggested_statuses(within, comparable):
+    """Return IN_RANGE or OUT_OF_RANGE per comparable row, and None where there is nothing to suggest."""
+    return np.where(comparable, np.where(within, IN_RANGE, OUT_OF_RANGE), None)
+
+
+class ReferenceRanges:
+    """The Calculated range of every reference CSV row, parsed once into numeric bounds.
+
+    Bounds are kept as arrays indexed by CSV row, so the ranges of any set of
+    matched rows are gathered and compared with their results in one pass.
+    Each array ends with one extra entry for "no matched row", so row -1
+    gathers an unparsed range shown as "Not found". Rows whose range did not
+    parse are remembered in failures with their raw value; their items are
+    never given a suggestion.
+    """
+
+    def __init__(self, calculated_ranges):
+        ranges = pd.Series(calculated_ranges, dtype=object).reset_index(drop=True)
+        bounds = parse_ranges(ranges)
+        self.text = np.append(ranges.to_numpy(dtype=object), np.array(["Not found"], dtype=object))
+        self.low = np.append(bounds['low'].to_numpy(), np.nan)
+        self.high = np.append(bounds['high'].to_numpy(), np.nan)
+        self.low_inclusive = np.append(bounds['low_inclusive'].to_numpy(dtype=bool), False)
+        self.high_inclusive = np.append(bounds['high_inclusive'].to_numpy(dtype=bool), False)
+        self.parsed = np.append(bounds['parsed'].to_numpy(dtype=bool), False)
+        self.failures = {int(row): self.text[row] for row in np.flatnonzero(~self.parsed[:-1])}
+        if self.failures:
+            logging.info("%s of %s Calculated range values could not be parsed", len(self.failures), len(self))
+
+    def __len__(self):
+        return len(self.text) - 1
+
+    def texts(self, rows):
+        """Return the raw Calculated range of each row, or "Not found" where the row is -1."""
+        return self.text[np.asarray(rows, dtype=np.int64)]
+
+    def bounds(self, rows):
+        """Return the parsed bounds of each row as arrays."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return {
+            'low': self.low[rows],
+            'high': self.high[rows],
+            'low_inclusive': self.low_inclusive[rows],
+            'high_inclusive': self.high_inclusive[rows],
+            'parsed': self.parsed[rows],
+        }
+
+    def classify(self, rows, results):
+        """Return the suggested status of each result against the range of its row, or None."""
+        within, comparable = within_range(numeric_results(results), self.bounds(rows))
+        return suggested_statuses(within, comparable)
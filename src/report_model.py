@@ -0,0 +1,123 @@
+import csv
+import json
+
+import numpy as np
+import pandas as pd
+
+# The report's issue sections, in report order: (key, title, ValidationResult
+# attribute and item outcome column holding the messages, line shown when empty).
+ISSUE_SECTIONS = (
+    ('status_issues', "Status Issues", 'status_issue', "No issues found"),
+    ('unmatched_tests', "Unmatched Test Names", 'unmatched_test', "No unmatched Test Names found"),
+    ('loinc_issues', "Loinc Validation Issues", 'loinc_issue', "No Loinc issues found"),
+    ('csv_update_suggestions', "CSV Update Suggestions", 'csv_update_suggestion', "No CSV update suggestions"),
+)
+# Columns of an exported report, one row per issue line.
+EXPORT_COLUMNS = ('section', 'TestName', 'message')
+
+
+def issue_test_names(result, column, count):
+    """Return the TestName behind each message of one issue list, or None if the result cannot tell.
+
+    Messages are listed in item order, so they line up with the names of the
+    items whose outcome column holds a message.
+    """
+    if result is None or result.item_outcomes is None or result.item_names is None:
+        return None
+    values = result.item_outcomes[column].to_numpy()
+    names = result.item_names[values != None]  # noqa: E711
+    return names.tolist() if len(names) == count else None
+
+
+class ReportSection:
+    """One titled list of report lines, with the TestName each line is about when it is known."""
+
+    def __init__(self, key, title, lines, test_names=None, empty_message="No issues found"):
+        self.key = key
+        self.title = title
+        self.lines = lines
+        self.test_names = test_names
+        self.empty_message = empty_message
+
+    def __len__(self):
+        return len(self.lines)
+
+    def matching(self, name_filter=''):
+        """Return the positions of the lines whose TestName contains name_filter, ignoring case.
+
+        Lines without a known TestName are matched on their own text.
+        """
+        if not name_filter:
+            return np.arange(len(self.lines))
+        keys = pd.Series(self.test_names if self.test_names is not None else self.lines, dtype=object)
+        matched = keys.astype(str).str.contains(name_filter, case=False, regex=False).to_numpy()
+        return np.flatnonzero(matched)
+
+
+class ReportModel:
+    """A validation report kept as data: summary lines, issue sections and trailing sections.
+
+    The GUI renders it a page at a time and filters it without reading the
+    text widget back; exports stream from it row by row.
+    """
+
+    def __init__(self, title, summary, sections, footer_sections=()):
+        self.title = title
+        self.summary = summary
+        self.sections = list(sections)
+        self.footer_sections = list(footer_sections)
+
+    @classmethod
+    def from_issues(cls, title, summary, issues, result=None, footer_sections=()):
+        """Build the report from {section key: messages} for the ISSUE_SECTIONS.
+
+        result, the ValidationResult the messages came from, supplies the
+        TestName behind each message for filtering and export.
+        """
+        sections = [ReportSection(key, section_title, issues[key],
+                                  issue_test_names(result, column, len(issues[key])), empty_message)
+                    for key, section_title, column, empty_message in ISSUE_SECTIONS]
+        return cls(title, summary, sections, footer_sections)
+
+    def section(self, key):
+        for section in self.sections + self.footer_sections:
+            if section.key == key:
+                return section
+        raise KeyError(key)
+
+    def issue_count(self):
+        return sum(len(section) for section in self.sections)
+
+    def rows(self, keys=None, name_filter=''):
+        """Yield (section title, TestName, line) for every issue line passing the filter.
+
+        keys selects the issue sections by key (None for all of them);
+        name_filter is matched as in ReportSection.matching.
+        """
+        for section in self.sections:
+            if keys is not None and section.key not in keys:
+                continue
+            for position in section.matching(name_filter).tolist():
+                test_name = section.test_names[position] if section.test_names is not None else None
+                yield section.title, test_name, section.lines[position]
+
+    def export_csv(self, path, keys=None, name_filter=''):
+        """Write the filtered issue lines to a CSV file with EXPORT_COLUMNS; returns the row count."""
+        count = 0
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in self.rows(keys, name_filter):
+                writer.writerow(row)
+                count += 1
+        return count
+
+    def export_jsonl(self, path, keys=None, name_filter=''):
+        """Write the filtered issue lines as JSON Lines, one object per line; returns the row count."""
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for row in self.rows(keys, name_filter):
+                f.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False, default=str))
+                f.write('\n')
+                count += 1
+        return count
@@ -0,0 +1,320 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from catalog_patch import UnmatchedNameAggregator, unmatched_name_entries
+from structured_logging import log_run
+from validation_core import missing_csv_columns, scan_items
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# How long the first request of a batch waits for others to join it.
+BATCH_WINDOW_MS = 5
+# A batch stops collecting requests once it holds this many items.
+MAX_BATCH_ITEMS = 200000
+# Largest request body accepted.
+MAX_BODY_BYTES = 512 * 1024 * 1024
+_MAX_HEADER_LINES = 100
+
+
+class RequestError(Exception):
+    """A request that cannot be served; carries the HTTP status to answer with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def payload_items(payload):
+    """Return the scan items of a request body: a scan export object or a bare list of items."""
+    items = scan_items(payload) if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise RequestError(HTTPStatus.BAD_REQUEST,
+                           "Expected a scan export object with an enhancedSerScanObject list, or a list of items")
+    return items
+
+
+def report(validator, result):
+    """Return the JSON report of one request: the result's report and its unmatched names with their suggestions."""
+    response = result.to_dict()
+    response['unmatched_names'] = unmatched_name_entries(validator, result)
+    return response
+
+
+def validate_batch(validator, payloads):
+    """Validate a batch of item lists, returning ('ok', report) or ('error', message) for each.
+
+    The batch is checked in one pass; if that fails, each payload is validated
+    on its own so one malformed request does not fail the others.
+    """
+    with log_run():
+        return _validate_batch(validator, payloads)
+
+
+def _validate_batch(validator, payloads):
+    try:
+        results = validator.validate_many(payloads)
+    except Exception:
+        logging.info("Batched validation failed; validating its requests one by one")
+    else:
+        return [('ok', report(validator, result)) for result in results]
+
+    outcomes = []
+    for json_data in payloads:
+        try:
+            outcomes.append(('ok', report(validator, validator.validate(json_data))))
+        except Exception as e:
+            logging.exception("Validation request failed")
+            outcomes.append(('error', f"Unexpected error during validation: {e}"))
+    return outcomes
+
+
+class ValidationService:
+    """Long-running HTTP/JSON front end over one warm LabDataValidator.
+
+    Endpoints:
+      POST /validate  body: a scan export or a list of items; answers with the
+                      report (summary and issue lists) as JSON
+      POST /reload    body (optional): {"csv": path}; loads the CSV, or reloads
+                      the current one, and swaps it in once it is ready
+      GET  /health    the loaded CSV and request counters
+      GET  /catalog-patch  a Search Names patch for the unmatched names of
+                      every request so far, ordered by impact
+
+    Requests that arrive within BATCH_WINDOW_MS of each other are validated
+    together in one columnar pass on a single worker thread, which also keeps
+    the match cache single-threaded. Each batch holds on to the validator it
+    started with, so a reload never interrupts requests in flight.
+    """
+
+    def __init__(self, reference_cache, csv_path, batch_window_ms=BATCH_WINDOW_MS, max_batch_items=MAX_BATCH_ITEMS):
+        self.reference_cache = reference_cache
+        self.csv_path = csv_path
+        self.batch_window_ms = batch_window_ms
+        self.max_batch_items = max_batch_items
+        self.validator = None
+        self.requests_served = 0
+        self.batches_run = 0
+        self._queue = None
+        self._reload_lock = None
+        self._validation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='validation')
+        # Unmatched names of every validated request, only touched on the validation thread
+        self.unmatched_names = UnmatchedNameAggregator()
+
+    def load(self):
+        """Load the reference CSV before serving; raises ValueError if it lacks required columns."""
+        self.validator = self._load_validator(self.csv_path)
+        # Build the fuzzy candidates up front so the first unmatched name does not pay for them
+        self.validator.reference_index.fuzzy_matcher
+
+    def _load_validator(self, csv_path):
+        validator = self.reference_cache.load_validator(csv_path)
+        missing = missing_csv_columns(validator.csv_df)
+        if missing:
+            raise ValueError(f"Required columns missing in CSV {csv_path}: {missing}")
+        return validator
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Serve until cancelled."""
+        self._queue = asyncio.Queue()
+        self._reload_lock = asyncio.Lock()
+        batcher = asyncio.create_task(self._run_batches())
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+        logging.warning("Validation service listening on %s with reference CSV %s", addresses, self.csv_path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._validation_executor.shutdown(wait=False)
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            items = len(batch[0][0])
+            deadline = loop.time() + self.batch_window_ms / 1000
+            while items < self.max_batch_items:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(request)
+                items += len(request[0])
+
+            start = time.perf_counter()
+            try:
+                outcomes = await loop.run_in_executor(self._validation_executor, self._validate,
+                                                      self.validator, [payload for payload, _ in batch])
+            except Exception as e:
+                outcomes = [('error', f"Unexpected error during validation: {e}")] * len(batch)
+            self.batches_run += 1
+            logging.info("Validated a batch of %s requests (%s items) in %.1f ms", len(batch), items,
+                         (time.perf_counter() - start) * 1000)
+            for (_, future), (kind, outcome) in zip(batch, outcomes):
+                if future.cancelled():
+                    continue
+                if kind == 'ok':
+                    outcome['batch'] = {'requests': len(batch), 'items': items}
+                    future.set_result(outcome)
+                else:
+                    future.set_exception(RequestError(HTTPStatus.INTERNAL_SERVER_ERROR, outcome))
+
+    def _validate(self, validator, payloads):
+        outcomes = validate_batch(validator, payloads)
+        for kind, outcome in outcomes:
+            if kind == 'ok':
+                self.unmatched_names.add_record(outcome, validator)
+        return outcomes
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader, writer)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, response = await self._dispatch(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._write_response(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except RequestError as e:
+            await self._write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader, writer):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        for _ in range(_MAX_HEADER_LINES):
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many header lines")
+        if version == 'HTTP/1.0' and 'connection' not in headers:
+            headers['connection'] = 'close'
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+        if length and headers.get('expect', '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target.split('?', 1)[0], headers, body
+
+    async def _dispatch(self, method, path, body):
+        routes = {
+            ('POST', '/validate'): self._handle_validate,
+            ('POST', '/reload'): self._handle_reload,
+            ('GET', '/health'): self._handle_health,
+            ('GET', '/catalog-patch'): self._handle_catalog_patch,
+        }
+        handler = routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in routes):
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"{method} is not supported for {path}"}
+            return HTTPStatus.NOT_FOUND, {'error': f"No such endpoint: {path}"}
+        try:
+            return HTTPStatus.OK, await handler(body)
+        except RequestError as e:
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            logging.exception("Request to %s failed", path)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"Unexpected error: {e}"}
+
+    async def _parse_body(self, body):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, json.loads, body or b'null')
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {e}")
+
+    async def _handle_validate(self, body):
+        items = payload_items(await self._parse_body(body))
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((items, future))
+        report = await future
+        self.requests_served += 1
+        return report
+
+    async def _handle_reload(self, body):
+        payload = await self._parse_body(body) if body else None
+        csv_path = payload.get('csv', self.csv_path) if isinstance(payload, dict) else self.csv_path
+        loop = asyncio.get_running_loop()
+        async with self._reload_lock:
+            start = time.perf_counter()
+            try:
+                validator = await loop.run_in_executor(None, self._load_validator, csv_path)
+            except Exception as e:
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Could not load CSV {csv_path}: {e}")
+            previous = self.validator
+            if validator is not previous:
+                # Warm the new catalog on the validation thread, which owns both match caches
+                await loop.run_in_executor(self._validation_executor, self._warm, validator, previous)
+            self.validator = validator
+            self.csv_path = csv_path
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+        logging.warning("Reloaded reference CSV %s in %s ms", csv_path, elapsed_ms)
+        return {'csv': str(csv_path), 'rows': len(validator.csv_df), 'changed': validator is not previous,
+                'elapsed_ms': elapsed_ms}
+
+    @staticmethod
+    def _warm(validator, previous):
+        validator.reference_index.fuzzy_matcher
+        if previous is not None:
+            validator.match_resolver.adopt(previous.match_resolver)
+
+    async def _handle_health(self, body):
+        return {
+            'status': 'ok',
+            'csv': str(self.csv_path),
+            'rows': len(self.validator.csv_df),
+            'requests_served': self.requests_served,
+            'batches_run': self.batches_run,
+            'match_cache': self.validator.match_resolver.stats(),
+        }
+
+    async def _handle_catalog_patch(self, body):
+        # Suggestions come from the validator's match cache, which only the validation thread touches
+        validator = self.validator
+        patch = await asyncio.get_running_loop().run_in_executor(self._validation_executor,
+                                                                 self.unmatched_names.patch, validator)
+        return {
+            'csv': str(self.csv_path),
+            'payloads': self.unmatched_names.payloads,
+            'distinct_names': len(self.unmatched_names),
+            'names_scored': self.unmatched_names.names_scored,
+            'patch': json.loads(patch.to_json(orient='records')),
+        }
+
+    async def _write_response(self, writer, status, payload, keep_alive):
+        body = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'))
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
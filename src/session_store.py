@@ -0,0 +1,291 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from itertools import repeat
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from reference_cache import DEFAULT_CACHE_DIR, csv_content_hash
+from validation_core import OUTCOME_COLUMNS, LabDataValidator, items_frame
+
+# Bump whenever the tables or the meaning of a stored outcome change; older stores are rebuilt.
+STORE_FORMAT_VERSION = 2
+DEFAULT_SESSION_DB = Path(os.environ.get('LAB_VALIDATOR_SESSION_DB', DEFAULT_CACHE_DIR / 'sessions.sqlite3'))
+# Completed runs kept per session; older runs and their outcomes are deleted.
+RUNS_KEPT = 2
+# Pending edit dicts of a review session, in journal order; conversion values are (analyte, unit).
+EDIT_FIELDS = ('status', 'unit', 'date', 'conversion')
+# Outcome columns SQLite hands back as 0/1.
+_BOOL_COLUMNS = ('status_unknown', 'needs_conversion', 'matched')
+# Item fields result_from_outcomes reads, stored with each run so a session can be restored without its JSON.
+ITEM_FIELDS = ('TestName', 'unit', 'date', 'result')
+_ITEM_COLUMNS = tuple(f'item_{field}' for field in ITEM_FIELDS)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id INTEGER PRIMARY KEY,
+    json_sha256 TEXT NOT NULL,
+    csv_sha256 TEXT NOT NULL,
+    json_path TEXT NOT NULL,
+    csv_path TEXT NOT NULL,
+    created REAL NOT NULL,
+    UNIQUE (json_sha256, csv_sha256)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (session_id),
+    created REAL NOT NULL,
+    items INTEGER NOT NULL,
+    match_cache TEXT NOT NULL,
+    log_run_id TEXT,
+    items_stored INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_session ON runs (session_id, run_id);
+CREATE TABLE IF NOT EXISTS item_outcomes (
+    run_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    {', '.join(OUTCOME_COLUMNS)},
+    {', '.join(_ITEM_COLUMNS)},
+    PRIMARY KEY (run_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS edits (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL REFERENCES sessions (session_id),
+    field TEXT NOT NULL,
+    test_name,
+    value TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS edits_by_session ON edits (session_id, seq);
+"""
+
+
+def _storable(value):
+    """Tell whether SQLite hands value back unchanged: None, a str, a 64-bit int or a float other than NaN."""
+    if value is None or type(value) is str:
+        return True
+    if type(value) is int:
+        return -2 ** 63 <= value < 2 ** 63
+    return type(value) is float and value == value
+
+
+def edit_changes(before, after):
+    """Yield (test_name, value) for every edit that differs between two edit dicts; removed edits have value None."""
+    for test_name, value in after.items():
+        if test_name not in before or before[test_name] != value:
+            yield test_name, value
+    for test_name in before.keys() - after.keys():
+        yield test_name, None
+
+
+class SessionStore:
+    """Review sessions kept in SQLite, so reopening the same files resumes where the last session left off.
+
+    A session is one JSON/CSV pair, identified by the SHA-256 of both files;
+    a file whose path, mtime and size are unchanged is not hashed again.
+    Each session keeps the item outcomes of its last RUNS_KEPT validation
+    runs, with the ITEM_FIELDS of each item when they can be stored exactly,
+    and an append-only journal of edits: every change to a pending
+    edit adds a row, a removed edit adds a row with no value, and replaying
+    the journal in order gives the current edits.
+
+    The database runs in WAL mode, so the validation thread can write a run
+    while the Tk thread appends edits. Each thread gets its own connection.
+    Failures are logged and reported as "nothing stored", never raised.
+    """
+
+    def __init__(self, db_path=DEFAULT_SESSION_DB, enabled=True):
+        self.db_path = Path(db_path)
+        self.enabled = enabled
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            if connection.execute('PRAGMA user_version').fetchone()[0] != STORE_FORMAT_VERSION:
+                with connection:
+                    for table in ('edits', 'item_outcomes', 'runs', 'sessions', 'files'):
+                        connection.execute(f'DROP TABLE IF EXISTS {table}')
+                    connection.executescript(_SCHEMA)
+                    connection.execute(f'PRAGMA user_version = {STORE_FORMAT_VERSION}')
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        """Close this thread's connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def file_fingerprint(self, path):
+        """Return the SHA-256 of a file, reusing the stored hash while its mtime and size are unchanged."""
+        resolved_path = str(Path(path).resolve())
+        stat = os.stat(resolved_path)
+        connection = self._connection()
+        row = connection.execute('SELECT mtime_ns, size, sha256 FROM files WHERE path = ?',
+                                 (resolved_path,)).fetchone()
+        if row is not None and row[:2] == (stat.st_mtime_ns, stat.st_size):
+            return row[2]
+        content_hash = csv_content_hash(resolved_path)
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                               (resolved_path, stat.st_mtime_ns, stat.st_size, content_hash))
+        return content_hash
+
+    def open_session(self, json_path, csv_path):
+        """Return the session id of a JSON/CSV pair, creating the session on first use; None if the store failed."""
+        if not self.enabled:
+            return None
+        try:
+            key = (self.file_fingerprint(json_path), self.file_fingerprint(csv_path))
+            connection = self._connection()
+            with connection:
+                connection.execute('INSERT OR IGNORE INTO sessions (json_sha256, csv_sha256, json_path, csv_path, '
+                                   'created) VALUES (?, ?, ?, ?, ?)',
+                                   (*key, str(json_path), str(csv_path), time.time()))
+                return connection.execute('SELECT session_id FROM sessions WHERE json_sha256 = ? AND csv_sha256 = ?',
+                                          key).fetchone()[0]
+        except (sqlite3.Error, OSError) as e:
+            logging.warning("Session store %s is unavailable: %s", self.db_path, e)
+            return None
+
+    def record_run(self, session_id, result, log_run_id=None, json_data=None):
+        """Store the item outcomes of a columnar ValidationResult as the session's latest run; returns its run id.
+
+        The ITEM_FIELDS of json_data, the items the result was checked on, are
+        stored alongside unless one of their values would not read back as it
+        was; such a run can only be restored together with its items.
+        """
+        if session_id is None or result.item_outcomes is None:
+            return None
+        outcomes = result.item_outcomes
+        item_columns = [repeat(None)] * len(ITEM_FIELDS)
+        items_stored = False
+        if json_data is not None and len(json_data) == len(outcomes):
+            frame = items_frame(json_data)
+            stored_columns = [frame[field].tolist() for field in ITEM_FIELDS]
+            if all(all(map(_storable, column)) for column in stored_columns):
+                item_columns = stored_columns
+                items_stored = True
+        try:
+            connection = self._connection()
+            with connection:
+                run_id = connection.execute(
+                    'INSERT INTO runs (session_id, created, items, match_cache, log_run_id, items_stored) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (session_id, time.time(), len(outcomes), json.dumps(result.match_cache), log_run_id,
+                     items_stored)).lastrowid
+                columns = [outcomes[column].tolist() for column in OUTCOME_COLUMNS]
+                connection.executemany(
+                    f"INSERT INTO item_outcomes VALUES "
+                    f"({', '.join('?' * (len(OUTCOME_COLUMNS) + len(_ITEM_COLUMNS) + 2))})",
+                    zip(repeat(run_id), range(len(outcomes)), *columns, *item_columns))
+                stale = [row[0] for row in connection.execute(
+                    'SELECT run_id FROM runs WHERE session_id = ? ORDER BY run_id DESC LIMIT -1 OFFSET ?',
+                    (session_id, RUNS_KEPT))]
+                connection.executemany('DELETE FROM item_outcomes WHERE run_id = ?', ((run,) for run in stale))
+                connection.executemany('DELETE FROM runs WHERE run_id = ?', ((run,) for run in stale))
+        except (sqlite3.Error, OSError) as e:
+            logging.warning("Could not store validation run in %s: %s", self.db_path, e)
+            return None
+        logging.info("Stored validation run %s of session %s (%s items)", run_id, session_id, len(outcomes))
+        return run_id
+
+    def restore_result(self, session_id, json_data=None):
+        """Return the ValidationResult of the session's latest run, or None if there is none.
+
+        The outcomes are read back from the store and assembled exactly as a
+        fresh run would assemble them; nothing is re-checked. Without json_data
+        the items are read back too, so the JSON file need not be loaded; a run
+        stored without its items is then not restored.
+        """
+        if session_id is None:
+            return None
+        try:
+            connection = self._connection()
+            run = connection.execute('SELECT run_id, created, items, match_cache, items_stored FROM runs '
+                                     'WHERE session_id = ? ORDER BY run_id DESC LIMIT 1', (session_id,)).fetchone()
+            if run is None:
+                return None
+            run_id, created, items, match_cache, items_stored = run
+            if json_data is None and not items_stored or json_data is not None and items != len(json_data):
+                return None
+            columns = OUTCOME_COLUMNS + (_ITEM_COLUMNS if json_data is None else ())
+            rows = connection.execute(f"SELECT {', '.join(columns)} FROM item_outcomes WHERE run_id = ? "
+                                      f"ORDER BY position", (run_id,)).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            logging.warning("Could not read the stored validation run from %s: %s", self.db_path, e)
+            return None
+        if len(rows) != items:
+            return None
+        # Filling an object array from the row tuples is several times faster than DataFrame.from_records
+        values = np.empty((len(rows), len(columns)), dtype=object)
+        values[:] = rows
+        if json_data is None:
+            frame = pd.DataFrame(values[:, len(OUTCOME_COLUMNS):], columns=ITEM_FIELDS)
+        else:
+            frame = items_frame(json_data)
+        outcomes = pd.DataFrame(values[:, :len(OUTCOME_COLUMNS)], columns=OUTCOME_COLUMNS, index=frame.index)
+        for column in _BOOL_COLUMNS:
+            outcomes[column] = outcomes[column].astype(bool)
+        result = LabDataValidator.result_from_outcomes(frame, outcomes, json.loads(match_cache))
+        result.session = {'session_id': session_id, 'run_id': run_id, 'created': created}
+        logging.info("Restored validation run %s of session %s (%s items)", run_id, session_id, len(rows))
+        return result
+
+    def append_edits(self, session_id, field, changes):
+        """Append (test_name, value) changes of one EDIT_FIELDS field to the session's journal.
+
+        Returns how many entries were appended, or None if they could not be written.
+        """
+        if session_id is None:
+            return 0
+        now = time.time()
+        rows = [(session_id, field, test_name, None if value is None else json.dumps(value), now)
+                for test_name, value in changes]
+        if not rows:
+            return 0
+        try:
+            connection = self._connection()
+            with connection:
+                connection.executemany('INSERT INTO edits (session_id, field, test_name, value, created) '
+                                       'VALUES (?, ?, ?, ?, ?)', rows)
+        except (sqlite3.Error, OSError) as e:
+            logging.warning("Could not journal %s %s edits in %s: %s", len(rows), field, self.db_path, e)
+            return None
+        return len(rows)
+
+    def replay(self, session_id):
+        """Return {field: {test_name: value}} for EDIT_FIELDS, replaying the session's journal in order."""
+        edits = {field: {} for field in EDIT_FIELDS}
+        if session_id is None:
+            return edits
+        try:
+            rows = self._connection().execute('SELECT field, test_name, value FROM edits WHERE session_id = ? '
+                                              'ORDER BY seq', (session_id,)).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            logging.warning("Could not read the edit journal from %s: %s", self.db_path, e)
+            return edits
+        for field, test_name, value in rows:
+            if value is None:
+                edits[field].pop(test_name, None)
+                continue
+            value = json.loads(value)
+            edits[field][test_name] = tuple(value) if field == 'conversion' else value
+        return edits
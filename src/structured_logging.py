@@ -0,0 +1,162 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Format of plain-text log lines.
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Items between two sampled per-item trace records at DEBUG.
+TRACE_SAMPLE_EVERY = 1000
+# Attributes every LogRecord has; anything else on a record (from extra=) becomes a JSON field.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime',
+                                                                                       'run_id'}
+
+_run_id = contextvars.ContextVar('log_run_id', default=None)
+_listener = None
+# Arguments of the last configure_logging call, so worker processes can repeat it.
+_settings = None
+# Records handed to the queue and the time spent doing so, on the logging threads' side.
+# Updated without a lock, so counts from concurrent threads are approximate.
+_counters = {'log_records': 0, 'log_enqueue_us': 0}
+
+
+def new_run_id():
+    """Return a short random id for one validation run."""
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def log_run(run_id=None):
+    """Tag every record this thread logs inside the block with run_id, or a new one; yields the id.
+
+    The id is kept in a context variable, so each thread (and each asyncio
+    task) carries its own and runs on other threads are unaffected.
+    """
+    run_id = run_id or new_run_id()
+    token = _run_id.set(run_id)
+    try:
+        yield run_id
+    finally:
+        _run_id.reset(token)
+
+
+def current_run_id():
+    return _run_id.get()
+
+
+def log_counters():
+    """Return the lifetime count of queued records and the microseconds spent queuing them."""
+    return dict(_counters)
+
+
+class RunIdFilter(logging.Filter):
+    """Stamp each record with the run id of the thread that logged it."""
+
+    def filter(self, record):
+        record.run_id = _run_id.get()
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that leaves all formatting to the listener thread.
+
+    The stock handler merges the message with its arguments before queuing
+    it, on the logging thread. This one queues the record as it is, so a
+    record's arguments must not be mutated after the call that logged them.
+    """
+
+    def prepare(self, record):
+        return record
+
+    def emit(self, record):
+        start = time.perf_counter_ns()
+        super().emit(record)
+        _counters['log_records'] += 1
+        _counters['log_enqueue_us'] += (time.perf_counter_ns() - start) // 1000
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as one JSON object: time, level, logger, thread, run id, message and extras."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'run_id': getattr(record, 'run_id', None),
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level=logging.INFO, json_format=False, stream=None):
+    """Route the root logger through a queue to a listener thread that formats and writes records.
+
+    Logging calls only stamp the run id and queue the record; formatting and
+    I/O happen on the listener thread. json_format writes one JSON object per
+    line instead of text. Calling this again replaces the previous setup; the
+    listener is flushed and stopped at exit.
+    """
+    global _listener, _settings
+    stop_logging()
+    _settings = {'level': level, 'json_format': json_format}
+    handler = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RunIdFilter())
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        root.removeHandler(old_handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    # Warnings from libraries go through the same handler instead of straight to stderr
+    logging.captureWarnings(True)
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def logging_settings():
+    """Return the arguments of the last configure_logging call, or None if it was never called."""
+    return dict(_settings) if _settings is not None else None
+
+
+def stop_logging():
+    """Write out every queued record and stop the listener thread, if one is running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+class ItemTrace:
+    """Sampled per-item DEBUG records for a hot loop: one record in every `every` items.
+
+    enabled is read once when the trace is created, so a loop can skip the
+    call entirely with `if trace.enabled:` when DEBUG is off.
+    """
+
+    def __init__(self, every=TRACE_SAMPLE_EVERY, logger=None):
+        self.logger = logger if logger is not None else logging.getLogger()
+        self.every = every
+        self.enabled = self.logger.isEnabledFor(logging.DEBUG)
+
+    def __call__(self, position, msg, *args):
+        if self.enabled and position % self.every == 0:
+            self.logger.debug(msg, *args, extra={'position': position})
@@ -0,0 +1,174 @@
+import random
+import string
+
+import pandas as pd
+
+from json_stream import SCAN_ARRAY_KEY
+from validation_core import UNIT_CONVERSION_MARKER
+
+# (name, abbreviations, unit, reference range) for the analytes names are built from.
+ANALYTES = (
+    ('Glucose', ('glu', 'blood sugar'), 'mg/dL', '70-99'),
+    ('Hemoglobin A1c', ('hba1c', 'a1c', 'glycated hemoglobin'), '%', '4.0-5.6'),
+    ('Sodium', ('na',), 'mmol/L', '135-145'),
+    ('Potassium', ('k',), 'mmol/L', '3.5-5.0'),
+    ('Chloride', ('cl',), 'mmol/L', '98-107'),
+    ('Bicarbonate', ('hco3', 'co2'), 'mmol/L', '22-29'),
+    ('Blood Urea Nitrogen', ('bun', 'urea nitrogen'), 'mg/dL', '7-20'),
+    ('Creatinine', ('creat', 'cr'), 'mg/dL', '0.6-1.3'),
+    ('Calcium', ('ca',), 'mg/dL', '8.5-10.5'),
+    ('Magnesium', ('mg',), 'mg/dL', '1.7-2.2'),
+    ('Phosphorus', ('phos', 'phosphate'), 'mg/dL', '2.5-4.5'),
+    ('Albumin', ('alb',), 'g/dL', '3.5-5.0'),
+    ('Total Protein', ('tp', 'protein'), 'g/dL', '6.0-8.3'),
+    ('Bilirubin', ('bili', 'tbil'), 'mg/dL', '0.1-1.2'),
+    ('Alanine Aminotransferase', ('alt', 'sgpt'), 'U/L', '7-56'),
+    ('Aspartate Aminotransferase', ('ast', 'sgot'), 'U/L', '10-40'),
+    ('Alkaline Phosphatase', ('alp', 'alk phos'), 'U/L', '44-147'),
+    ('Gamma Glutamyl Transferase', ('ggt',), 'U/L', '<60'),
+    ('Cholesterol', ('chol',), 'mg/dL', '<200'),
+    ('HDL Cholesterol', ('hdl', 'hdl-c'), 'mg/dL', '>=40'),
+    ('LDL Cholesterol', ('ldl', 'ldl-c'), 'mg/dL', '<100'),
+    ('Triglycerides', ('trig', 'tg'), 'mg/dL', '<150'),
+    ('Thyroid Stimulating Hormone', ('tsh', 'thyrotropin'), 'mIU/L', '0.4-4.0'),
+    ('Thyroxine', ('t4',), 'ng/dL', '0.8-1.8'),
+    ('Triiodothyronine', ('t3',), 'pg/mL', '2.3-4.2'),
+    ('Vitamin D 25-Hydroxy', ('25-oh vitamin d', 'vit d', 'calcidiol'), 'ng/mL', '30-100'),
+    ('Vitamin B12', ('b12', 'cobalamin'), 'pg/mL', '200-900'),
+    ('Folate', ('folic acid',), 'ng/mL', '>=3.0'),
+    ('Ferritin', ('ferr',), 'ng/mL', '12-300'),
+    ('Iron', ('fe', 'serum iron'), 'ug/dL', '60-170'),
+    ('Transferrin', ('trf',), 'mg/dL', '200-360'),
+    ('White Blood Cell Count', ('wbc', 'leukocytes'), '10^3/uL', '4.5-11.0'),
+    ('Red Blood Cell Count', ('rbc', 'erythrocytes'), '10^6/uL', '4.5-5.9'),
+    ('Hemoglobin', ('hgb', 'hb'), 'g/dL', '13.5-17.5'),
+    ('Hematocrit', ('hct', 'pcv'), '%', '41-53'),
+    ('Platelet Count', ('plt', 'platelets'), '10^3/uL', '150-450'),
+    ('Mean Corpuscular Volume', ('mcv',), 'fL', '80-100'),
+    ('C-Reactive Protein', ('crp',), 'mg/L', '<3.0'),
+    ('Erythrocyte Sedimentation Rate', ('esr', 'sed rate'), 'mm/hr', '0-20'),
+    ('Prothrombin Time', ('pt', 'protime'), 's', '11-13.5'),
+    ('International Normalized Ratio', ('inr',), 'ratio', '0.8-1.1'),
+    ('Uric Acid', ('urate',), 'mg/dL', '3.5-7.2'),
+    ('Lactate Dehydrogenase', ('ldh',), 'U/L', '140-280'),
+    ('Creatine Kinase', ('ck', 'cpk'), 'U/L', '22-198'),
+    ('Troponin I', ('tni', 'ctni'), 'ng/mL', '<0.04'),
+    ('B-Type Natriuretic Peptide', ('bnp',), 'pg/mL', '<100'),
+    ('Prostate Specific Antigen', ('psa',), 'ng/mL', '<4.0'),
+    ('Cortisol', ('hydrocortisone',), 'ug/dL', '6-23'),
+    ('Insulin', ('ins',), 'uIU/mL', '2.6-24.9'),
+    ('Lipase', ('lps',), 'U/L', '0-160'),
+    ('Amylase', ('amy',), 'U/L', '30-110'),
+)
+QUALIFIERS = ('', 'Total', 'Free', 'Fasting', 'Random', 'Ionized', 'Direct', 'Calculated')
+SPECIMENS = (('Serum', 'ser'), ('Plasma', 'plas'), ('Whole Blood', 'bld'), ('Urine', 'ur'), ('CSF', 'csf'))
+METHODS = ('', 'Immunoassay', 'Enzymatic', 'LC-MS/MS', 'Automated Count', 'Point of Care')
+# Names no reference row resembles closely, for items that should get no suggestion.
+NOVEL_WORDS = ('zebrafish', 'quartz', 'xylophone', 'kumquat', 'vortex', 'juniper', 'pyxis', 'wombat')
+STATUSES = ('normal', 'high', 'low', 'unknown', None)
+
+
+def synthetic_reference_csv(rows, seed=0):
+    """Return a reference DataFrame of rows tests with Search Names lists, shaped like a real catalog.
+
+    Test Names combine an analyte, qualifier, specimen and method; beyond the
+    number of combinations they are numbered by performing lab. Names avoid
+    regex metacharacters, which the suggestion lookup would interpret. Each row's
+    Search Names hold three to six comma-separated aliases built from the
+    analyte's abbreviations.
+    """
+    rng = random.Random(seed)
+    combinations = [(analyte, qualifier, specimen, method) for analyte in ANALYTES for qualifier in QUALIFIERS
+                    for specimen in SPECIMENS for method in METHODS]
+    rng.shuffle(combinations)
+
+    records = []
+    for row in range(rows):
+        (name, abbreviations, unit, reference_range), qualifier, (specimen, specimen_short), method = \
+            combinations[row % len(combinations)]
+        lab = row // len(combinations)
+        analyte = f"{qualifier} {name}".strip()
+        test_name = f"{analyte}, {specimen}" + (f" - {method}" if method else '') + (f" - Lab {lab}" if lab else '')
+        suffix = f" {specimen_short}" + (f" {method.lower()}" if method else '') + (f" l{lab}" if lab else '')
+        aliases = [f"{abbreviation}{suffix}" for abbreviation in abbreviations]
+        aliases.append(f"{analyte.lower()}{suffix}")
+        while len(aliases) < 3 or (len(aliases) < 6 and rng.random() < 0.4):
+            aliases.append(f"{rng.choice(abbreviations)} {rng.choice(('lvl', 'level', 'test', 'conc'))}{suffix}"
+                           f" {len(aliases)}")
+        records.append({
+            'Test Name': test_name,
+            'Search Names': ', '.join(aliases),
+            'Calculated range': reference_range,
+            'Unit': unit,
+            'Loinc': f"{10000 + row}-{row % 10}",
+        })
+    return pd.DataFrame(records, columns=['Test Name', 'Search Names', 'Calculated range', 'Unit', 'Loinc'])
+
+
+def _misspell(name, rng):
+    """Return name with one or two characters dropped, doubled or swapped."""
+    chars = list(name)
+    for _ in range(rng.randint(1, 2)):
+        position = rng.randrange(len(chars))
+        edit = rng.random()
+        if edit < 0.4 and len(chars) > 3:
+            del chars[position]
+        elif edit < 0.7:
+            chars.insert(position, chars[position])
+        elif position + 1 < len(chars):
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+    return ''.join(chars) + ' x'
+
+
+def synthetic_scan_items(csv_df, items, exact_ratio=0.6, search_ratio=0.25, fuzzy_miss_ratio=0.1,
+                         distinct_misses=50, unknown_status_ratio=0.1, conversion_ratio=0.05, seed=0):
+    """Return items scan items (dicts like an enhancedSerScanObject) drawn from csv_df.
+
+    exact_ratio of the TestNames are a row's Test Name with its case varied,
+    search_ratio are one of a row's Search Names aliases, fuzzy_miss_ratio are
+    misspelled Test Names that only fuzzy matching can place, and the rest are
+    names resembling nothing in the catalog. Misspelled and novel names come
+    from pools of at most distinct_misses names, since real exports repeat the
+    same few unknown names. Most loincCodes agree with the matched row.
+    """
+    if exact_ratio + search_ratio + fuzzy_miss_ratio > 1:
+        raise ValueError("exact_ratio, search_ratio and fuzzy_miss_ratio must add up to at most 1")
+    rng = random.Random(seed)
+    test_names = csv_df['Test Name'].tolist()
+    loincs = csv_df['Loinc'].tolist()
+    aliases = [names.split(', ') for names in csv_df['Search Names'].tolist()]
+    miss_pool = max(1, min(distinct_misses, items))
+    fuzzy_misses = [_misspell(rng.choice(test_names), rng) for _ in range(miss_pool)]
+    novel_names = [' '.join(rng.choice(NOVEL_WORDS) for _ in range(3)) + f" {rng.choice(string.ascii_lowercase)}{n}"
+                   for n in range(miss_pool)]
+
+    scan_items = []
+    for _ in range(items):
+        row = rng.randrange(len(test_names))
+        draw = rng.random()
+        if draw < exact_ratio:
+            test_name = rng.choice((str.title, str.upper, str.lower, str))(test_names[row])
+        elif draw < exact_ratio + search_ratio:
+            test_name = rng.choice(aliases[row])
+        elif draw < exact_ratio + search_ratio + fuzzy_miss_ratio:
+            test_name = rng.choice(fuzzy_misses)
+        else:
+            test_name = rng.choice(novel_names)
+        status = 'unknown' if rng.random() < unknown_status_ratio else rng.choice(STATUSES[:3])
+        unit = csv_df['Unit'].iat[row]
+        if rng.random() < conversion_ratio:
+            unit = f"{unit} {UNIT_CONVERSION_MARKER}"
+        scan_items.append({
+            'TestName': test_name,
+            'loincCode': loincs[row] if rng.random() < 0.9 else f"{rng.randint(1000, 99999)}-{rng.randint(0, 9)}",
+            'status': status,
+            'result': f"{rng.uniform(0, 300):.1f}",
+            'unit': unit,
+            'date': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        })
+    return scan_items
+
+
+def synthetic_scan_export(csv_df, items, **options):
+    """Return a scan export document holding synthetic_scan_items(csv_df, items, **options)."""
+    return {SCAN_ARRAY_KEY: synthetic_scan_items(csv_df, items, **options)}
@@ -0,0 +1,146 @@
+import logging
+import time
+from collections import deque
+
+# Rows inserted into a Treeview per main-loop callback.
+INSERT_CHUNK_SIZE = 500
+# Delay between chunks, leaving the main loop time to handle input and redraws.
+INSERT_CHUNK_DELAY_MS = 1
+# Tcl global that carries the value for set_column_for_all, so it is never parsed as script.
+_BULK_VALUE_VARIABLE = 'tree_model_bulk_value'
+
+
+class TreeRowModel:
+    """Python-side rows of one results Treeview, inserted into the widget in chunks.
+
+    Every row gets its item id as soon as it is added, so its values can be read
+    and edited through the model straight away, before the widget has caught up.
+    Reads never go back to Tk, which also keeps values as the original Python
+    objects instead of Tcl-converted strings and numbers. Rows are also indexed
+    by their key column (the TestName), so edits find their rows in O(1).
+    """
+
+    def __init__(self, root, tree, chunk_size=INSERT_CHUNK_SIZE):
+        self.root = root
+        self.tree = tree
+        self.chunk_size = chunk_size
+        self.rows = {}
+        self._tags = {}
+        self._ids_by_key = {}
+        self._pending = deque()
+        self._materialized = set()
+        self._after_id = None
+        self._next_id = 0
+        # Time spent inserting rows into the widget since the last clear
+        self.insert_seconds = 0.0
+        # Called with no arguments once every pending row has been inserted
+        self.on_drained = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def clear(self):
+        """Remove every row from the model and the widget, dropping pending inserts."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._materialized:
+            self.tree.delete(*self._materialized)
+        self.rows.clear()
+        self._tags.clear()
+        self._ids_by_key.clear()
+        self._pending.clear()
+        self._materialized.clear()
+        self.insert_seconds = 0.0
+
+    def extend(self, rows, tag_column=0):
+        """Add rows of values and schedule their insertion; returns the new item ids."""
+        item_ids = []
+        for values in rows:
+            self._next_id += 1
+            item_id = f"row{self._next_id}"
+            self.rows[item_id] = list(values)
+            self._tags[item_id] = (values[tag_column],)
+            self._ids_by_key.setdefault(values[tag_column], []).append(item_id)
+            self._pending.append(item_id)
+            item_ids.append(item_id)
+        if self._pending and self._after_id is None:
+            self._after_id = self.root.after(INSERT_CHUNK_DELAY_MS, self._insert_chunk)
+        return item_ids
+
+    @property
+    def pending(self):
+        """Number of rows added but not inserted into the widget yet."""
+        return len(self._pending)
+
+    def _insert_chunk(self):
+        self._after_id = None
+        start = time.perf_counter()
+        for _ in range(min(self.chunk_size, len(self._pending))):
+            item_id = self._pending.popleft()
+            if item_id not in self.rows:
+                continue
+            self.tree.insert("", "end", iid=item_id, values=self.rows[item_id], tags=self._tags[item_id])
+            self._materialized.add(item_id)
+        self.insert_seconds += time.perf_counter() - start
+        if self._pending:
+            self._after_id = self.root.after(INSERT_CHUNK_DELAY_MS, self._insert_chunk)
+        else:
+            logging.debug("Finished inserting %s rows into %s", len(self.rows), self.tree)
+            if self.on_drained is not None:
+                self.on_drained()
+
+    def item_ids(self, key):
+        """Return the ids of every row whose key column equals key."""
+        return self._ids_by_key.get(key, [])
+
+    def keys(self):
+        """Return the distinct key column values, in the order they were first added."""
+        return self._ids_by_key.keys()
+
+    def values(self, item_id):
+        """Return the current values of a row."""
+        return self.rows[item_id]
+
+    def set_values(self, item_id, values):
+        """Replace the values of a row, updating the widget if the row is already shown."""
+        self.rows[item_id] = list(values)
+        if item_id in self._materialized:
+            self.tree.item(item_id, values=self.rows[item_id])
+
+    def set_column(self, item_id, column, value):
+        """Replace one column of a row, by column position."""
+        values = self.rows[item_id]
+        values[column] = value
+        self.set_values(item_id, values)
+
+    def set_column_for_all(self, column, value):
+        """Set one column of every row to value in a single pass.
+
+        The shown rows are updated by one Tcl foreach over the widget instead of
+        a Tk round trip per row; rows still pending insertion pick up the value
+        from the model when they are inserted.
+        """
+        for values in self.rows.values():
+            values[column] = value
+        if self._materialized:
+            self.tree.setvar(_BULK_VALUE_VARIABLE, value)
+            self.tree.tk.call('foreach', 'item', tuple(self._materialized),
+                              f'{self.tree} set $item #{column + 1} $::{_BULK_VALUE_VARIABLE}')
+
+    def set_column_for_keys(self, column, values_by_key):
+        """Set one column of every row whose key is in values_by_key to that key's value.
+
+        Shown rows are updated by one Tcl foreach per distinct value, as in
+        set_column_for_all, so a bulk edit costs a handful of Tk calls.
+        """
+        shown_by_value = {}
+        for key, value in values_by_key.items():
+            for item_id in self._ids_by_key.get(key, ()):
+                self.rows[item_id][column] = value
+                if item_id in self._materialized:
+                    shown_by_value.setdefault(value, []).append(item_id)
+        for value, item_ids in shown_by_value.items():
+            self.tree.setvar(_BULK_VALUE_VARIABLE, value)
+            self.tree.tk.call('foreach', 'item', tuple(item_ids),
+                              f'{self.tree} set $item #{column + 1} $::{_BULK_VALUE_VARIABLE}')
@@ -0,0 +1,260 @@
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+from reference_ranges import numeric_results
+
+UNIT_CONVERSION_MARKER = "CONVERSION REQUIRED!!!"
+# Significant digits kept in a converted result.
+RESULT_SIGNIFICANT_DIGITS = 4
+
+# Every unit the converter knows, by normalized spelling: (dimension, size in the dimension's base
+# unit). Bases are g/L for mass concentration, mol/L for amount, eq/L for equivalents, U/L for
+# activity, cells/L for counts and 1 for fractions.
+UNIT_SCALES = {
+    'g/l': ('mass', 1.0),
+    'g/dl': ('mass', 10.0),
+    'mg/dl': ('mass', 1e-2),
+    'mg/l': ('mass', 1e-3),
+    'mg/ml': ('mass', 1.0),
+    'ug/ml': ('mass', 1e-3),
+    'ug/dl': ('mass', 1e-5),
+    'ug/l': ('mass', 1e-6),
+    'ng/ml': ('mass', 1e-6),
+    'ng/dl': ('mass', 1e-8),
+    'ng/l': ('mass', 1e-9),
+    'pg/ml': ('mass', 1e-9),
+    'mol/l': ('amount', 1.0),
+    'mmol/l': ('amount', 1e-3),
+    'umol/l': ('amount', 1e-6),
+    'nmol/l': ('amount', 1e-9),
+    'pmol/l': ('amount', 1e-12),
+    'eq/l': ('equivalents', 1.0),
+    'meq/l': ('equivalents', 1e-3),
+    'u/l': ('activity', 1.0),
+    'iu/l': ('activity', 1.0),
+    'ku/l': ('activity', 1e3),
+    'mu/ml': ('activity', 1.0),
+    'miu/ml': ('activity', 1.0),
+    'miu/l': ('activity', 1e-3),
+    'uiu/ml': ('activity', 1e-3),
+    'ukat/l': ('activity', 60.0),
+    '/ul': ('count', 1e6),
+    '10^3/ul': ('count', 1e9),
+    'k/ul': ('count', 1e9),
+    '10^9/l': ('count', 1e9),
+    '10^6/ul': ('count', 1e12),
+    'm/ul': ('count', 1e12),
+    '10^12/l': ('count', 1e12),
+    '%': ('fraction', 1e-2),
+    'fraction': ('fraction', 1.0),
+}
+# Analytes whose mass and amount units convert into each other: (key, Test Name keywords,
+# molar mass in g/mol, charge for mEq/L or None). Keywords are matched as whole words,
+# longest first, so "urea nitrogen" wins over "urea".
+ANALYTES = (
+    ('glucose', ('glucose', 'blood sugar'), 180.16, None),
+    ('cholesterol', ('cholesterol', 'hdl', 'ldl'), 386.65, None),
+    ('triglycerides', ('triglycerides', 'triglyceride'), 885.7, None),
+    ('creatinine', ('creatinine',), 113.12, None),
+    ('urea_nitrogen', ('urea nitrogen', 'bun'), 28.014, None),
+    ('urea', ('urea',), 60.06, None),
+    ('uric_acid', ('uric acid', 'urate'), 168.11, None),
+    ('calcium', ('calcium',), 40.078, 2),
+    ('magnesium', ('magnesium',), 24.305, 2),
+    ('phosphorus', ('phosphorus', 'phosphate'), 30.974, None),
+    ('sodium', ('sodium',), 22.99, 1),
+    ('potassium', ('potassium',), 39.098, 1),
+    ('chloride', ('chloride',), 35.45, 1),
+    ('bicarbonate', ('bicarbonate',), 61.017, 1),
+    ('bilirubin', ('bilirubin',), 584.66, None),
+    ('iron', ('iron',), 55.845, None),
+    ('hemoglobin_a1c', ('hemoglobin a1c', 'hba1c', 'a1c'), None, None),
+    ('hemoglobin', ('hemoglobin',), 16114.5, None),
+    ('cortisol', ('cortisol',), 362.46, None),
+    ('vitamin_d', ('vitamin d', '25-hydroxy'), 400.64, None),
+    ('vitamin_b12', ('vitamin b12', 'cobalamin'), 1355.37, None),
+    ('folate', ('folate', 'folic acid'), 441.4, None),
+    ('thyroxine', ('thyroxine',), 776.87, None),
+    ('triiodothyronine', ('triiodothyronine',), 650.97, None),
+    ('lactate', ('lactate',), 90.08, None),
+    ('testosterone', ('testosterone',), 288.42, None),
+)
+_ANALYTE_PROPERTIES = {key: (molar_mass, charge) for key, _, molar_mass, charge in ANALYTES}
+_ANALYTE_KEYWORDS = {keyword: key for key, keywords, _, _ in ANALYTES for keyword in keywords}
+ANALYTE_PATTERN = r'(?i)\b({})\b'.format(
+    '|'.join(re.escape(keyword) for keyword in sorted(_ANALYTE_KEYWORDS, key=len, reverse=True)))
+
+
+def normalize_units(units):
+    """Return the lookup spelling of each unit: marker removed, lower-cased, µ and mcg spelled u and ug.
+
+    Each distinct unit is normalized once; missing and non-text units give None.
+    """
+    codes, distinct = pd.factorize(pd.Series(units, dtype=object))
+    text = pd.Series(distinct, dtype=object)
+    text = text.where(text.map(lambda unit: isinstance(unit, str)))
+    normalized = (text.str.replace(UNIT_CONVERSION_MARKER, '', regex=False)
+                  .str.replace('[µμ]', 'u', regex=True)
+                  .str.replace('mcg', 'ug', regex=False)
+                  .str.replace(r'\s+', '', regex=True)
+                  .str.replace('x10', '10', regex=False)
+                  .str.lower())
+    normalized = np.append(normalized.where(normalized.notna(), None).to_numpy(dtype=object), None)
+    return normalized[codes]
+
+
+def analyte_keys(test_names):
+    """Return the ANALYTES key named in each Test Name, or None where no keyword appears."""
+    names = pd.Series(test_names, dtype=object).reset_index(drop=True)
+    names = names.where(names.map(lambda name: isinstance(name, str)))
+    keywords = names.str.extract(ANALYTE_PATTERN, expand=False).str.lower()
+    keys = keywords.map(_ANALYTE_KEYWORDS).to_numpy(dtype=object)
+    keys[pd.isna(keys)] = None
+    return keys
+
+
+def round_significant(values, digits=RESULT_SIGNIFICANT_DIGITS):
+    """Round each value to digits significant digits."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    decimals = np.where(np.isfinite(magnitude), digits - 1 - magnitude, 0)
+    # Dividing by an exact power of ten avoids the error of multiplying by an inexact one
+    with np.errstate(over='ignore', invalid='ignore'):
+        return np.where(decimals >= 0, np.round(values * 10.0 ** decimals) / 10.0 ** decimals,
+                        np.round(values / 10.0 ** -decimals) * 10.0 ** -decimals)
+
+
+def format_results(values, originals):
+    """Format converted values like the results they replace: text stays text, numbers stay numbers.
+
+    Values are rounded to RESULT_SIGNIFICANT_DIGITS; NaN values give None.
+    """
+    rounded = round_significant(np.asarray(values, dtype=float))
+    text = pd.Series(rounded, dtype=float).astype(str).str.removesuffix('.0').to_numpy(dtype=object)
+    is_text = np.fromiter((isinstance(original, str) for original in originals), dtype=bool, count=len(originals))
+    formatted = np.where(is_text, text, rounded.astype(object))
+    formatted[np.isnan(rounded)] = None
+    return formatted
+
+
+class ReferenceUnits:
+    """The Unit and analyte of every reference CSV row, worked out once when the CSV is loaded.
+
+    Arrays are indexed by CSV row and end with one entry for "no matched row",
+    so row -1 gathers no target unit and no analyte.
+    """
+
+    def __init__(self, test_names, units):
+        self.unit = np.append(pd.Series(units, dtype=object).to_numpy(dtype=object), None)
+        self.unit_key = normalize_units(self.unit)
+        self.analyte = np.append(analyte_keys(test_names), None)
+
+    def __len__(self):
+        return len(self.unit) - 1
+
+
+class UnitConverter:
+    """Conversion factors between units, cached by (analyte, from unit, to unit).
+
+    The cache holds one entry per distinct combination ever asked for,
+    including those that cannot be converted, so a payload with thousands of
+    rows in a few units costs a few factor computations.
+    """
+
+    def __init__(self):
+        self._factors = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._factors)
+
+    def factor(self, analyte, from_unit, to_unit):
+        """Return the factor taking a result in from_unit to to_unit, or None if they do not convert.
+
+        Units are given in their normalize_units spelling.
+        """
+        key = (analyte, from_unit, to_unit)
+        if key in self._factors:
+            self.hits += 1
+            return self._factors[key]
+        self.misses += 1
+        self._factors[key] = self._compute_factor(analyte, from_unit, to_unit)
+        return self._factors[key]
+
+    @staticmethod
+    def _compute_factor(analyte, from_unit, to_unit):
+        source = UNIT_SCALES.get(from_unit)
+        target = UNIT_SCALES.get(to_unit)
+        if source is None or target is None:
+            return None
+        (source_dimension, source_scale), (target_dimension, target_scale) = source, target
+        if source_dimension == target_dimension:
+            return source_scale / target_scale
+        # Anything else goes through mol/L, which needs the analyte's molar mass or charge
+        molar_mass, charge = _ANALYTE_PROPERTIES.get(analyte, (None, None))
+        per_mole = {'amount': 1.0, 'mass': molar_mass, 'equivalents': charge}
+        if per_mole.get(source_dimension) is None or per_mole.get(target_dimension) is None:
+            return None
+        return source_scale / per_mole[source_dimension] * per_mole[target_dimension] / target_scale
+
+    def propose(self, reference_units, rows, units, results):
+        """Propose a new unit and result for each row's unit and result, converting all of them at once.
+
+        rows are the matched reference rows (-1 for none), whose Unit is the
+        target and whose Test Name names the analyte. Returns (proposed units,
+        proposed results, factors): the unit is None where no factor is known,
+        and the result is None where the result is not a number. A factor of 1
+        proposes the result exactly as it was, without rounding it.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        analytes = reference_units.analyte[rows]
+        targets = reference_units.unit[rows]
+        keys = pd.Series(list(zip(analytes, normalize_units(units), reference_units.unit_key[rows])), dtype=object)
+        codes, distinct = pd.factorize(keys)
+        distinct_factors = np.array([np.nan if factor is None else factor
+                                     for factor in (self.factor(*key) for key in distinct)], dtype=float)
+        factors = distinct_factors[codes] if len(codes) else np.zeros(0)
+        convertible = ~np.isnan(factors)
+        proposed_units = np.where(convertible, targets, None)
+        results = np.asarray(pd.Series(results, dtype=object).to_numpy(dtype=object))
+        numeric = numeric_results(results)
+        proposed_results = format_results(numeric * factors, results)
+        unchanged = (factors == 1) & ~np.isnan(numeric)
+        proposed_results[unchanged] = results[unchanged]
+        logging.debug("Proposed conversions for %s of %s rows (%s distinct unit pairs)", int(convertible.sum()),
+                      len(rows), len(distinct))
+        return proposed_units, proposed_results, factors
+
+    def item_converter(self, analyte, to_unit):
+        """Return a function converting one scan item's result and unit to to_unit in place.
+
+        Items already in to_unit, items whose unit does not convert, and items
+        whose result is not a number are left unchanged. A factor of 1, such as
+        another spelling of to_unit or one with the conversion marker, only
+        sets the unit and keeps the result as it was. Used when saving, so
+        conversions apply to every item of a TestName whatever unit each one
+        was exported in.
+        """
+        to_key = normalize_units([to_unit])[0]
+
+        def convert(item):
+            if item.get('unit') == to_unit:
+                return
+            from_key = normalize_units([item.get('unit')])[0]
+            factor = self.factor(analyte, from_key, to_key)
+            if factor is None:
+                return
+            if factor == 1:
+                if not np.isnan(numeric_results([item.get('result')])[0]):
+                    item['unit'] = to_unit
+                return
+            converted = format_results(numeric_results([item.get('result')]) * factor, [item.get('result')])[0]
+            if converted is not None:
+                item['result'] = converted
+                item['unit'] = to_unit
+
+        return convert
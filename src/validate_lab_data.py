@@ -1,15 +1,50 @@
-import json
 import pandas as pd
+import numpy as np
 import logging
+import os
+import queue
+import sys
 import re
+import threading
+from collections import Counter
 from uuid import uuid4
-from fuzzywuzzy import fuzz
 import tkinter as tk
 from tkinter import filedialog, ttk, scrolledtext
 from pathlib import Path
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from bulk_edit import RESULT_CHECKS, PatternRule, StatusRule, apply_plan, plan_bulk_edits
+from date_normalization import EARLIEST_DATE, INVALID, MISSING, OUTLIER, DateNormalizer
+from file_watcher import FileWatcher
+from incremental import IncrementalValidator
+from instrumentation import RunMetrics, profile_capture
+from json_stream import (apply_item_patches, build_item_patches, fill_item_patches, index_items_by_name, index_names,
+                         iter_scan_items, orjson, write_json_array)
+from reference_cache import DEFAULT_CACHE_DIR, ReferenceCache
+from report_model import ISSUE_SECTIONS, ReportModel, ReportSection
+from session_store import EDIT_FIELDS, SessionStore, edit_changes
+from structured_logging import configure_logging, current_run_id, log_run
+from tree_model import TreeRowModel
+from validation_core import (LabDataValidator, ValidationCancelled, csv_load_error_message, json_load_error_message,
+                             load_json_document, load_scan_export, missing_csv_columns, scan_items)
+
+# How often the Tk main loop drains messages from the validation worker
+VALIDATION_POLL_MS = 100
+# Values the status column can be edited to
+STATUS_CHOICES = ["inRange", "warning", "outOfRange", "optimal"]
+# Offered as a bulk rule's new status: each item's own suggested status
+SUGGESTED_STATUS_CHOICE = "suggested status"
+# Result conditions offered for bulk status rules, by label
+RESULT_CHECK_CHOICES = {"any result": None, **{f"result {label}": check for check, label in RESULT_CHECKS.items()}}
+# Issue lines shown per report section before "show more"
+REPORT_PAGE_LINES = 200
+# The report filter's choice for showing every issue section
+ALL_SECTIONS_CHOICE = "All issues"
+# Text tag of the report's clickable paging links
+REPORT_LINK_TAG = 'report_link'
+# Where runs are profiled to when "Profile" is ticked
+PROFILE_DIR = DEFAULT_CACHE_DIR / 'profiles'
+# Logging of the GUI, set from the environment: a level name, and "json" for JSON lines with run ids
+LOG_LEVEL = os.environ.get('LAB_VALIDATOR_LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LAB_VALIDATOR_LOG_FORMAT', 'text')
 
 
 class LabDataValidatorApp:
@@ -22,12 +57,58 @@ class LabDataValidatorApp:
         self.json_path = tk.StringVar()
         self.csv_path = tk.StringVar()
         self.json_data = None
+        self.streamed_json_path = None  # Set instead of json_data when a large file was streamed
+        self.item_indices = {}  # TestName -> positions in enhancedSerScanObject, for patching on save
+        self.compact_json = tk.BooleanVar(value=False)
+        self.normalize_dates = tk.BooleanVar(value=False)  # Write every parsed date in ISO form on save
         self.csv_df = None
+        self.validator = None
+        self.validation_result = None
+        self.profile_paths = None  # Files written by the last profiled run
+        self.reference_cache = ReferenceCache()
+        self.session_store = SessionStore()
+        self.session_id = None  # Stored session of the loaded JSON/CSV pair, whose journal records every edit
+        self.journaled_edits = None  # EDIT_FIELDS -> edits as last written to the session's journal
+        self.resumed_edits = 0  # Pending edits the last run restored from the journal
+        self.edits_paths = None  # Resolved (JSON, CSV) pair the pending edits were made on
+        self.incremental_validator = IncrementalValidator()
+        self.incremental_validation = tk.BooleanVar(value=True)  # Keep pending edits and reuse unchanged results
+        self.watch_files = tk.BooleanVar(value=False)  # Re-validate when the selected files change
+        self.file_watcher = FileWatcher(self.root, lambda: (self.json_path.get(), self.csv_path.get()),
+                                        self.on_watched_files_changed)
+        self.reset_on_finish = False  # Set while a watch-triggered run keeps the old results on screen
+        self.profile_runs = tk.BooleanVar(value=False)  # Capture cProfile and tracemalloc profiles of each run
+        self.tree_timing_pending = False  # Set until the finished run's rows are all in the Treeviews
         self.status_updates = {}
         self.unit_updates = {}
+        self.conversion_updates = {}  # TestName -> (analyte, unit) its items' results are converted to on save
         self.date_updates = {}
         self.current_combobox = None
         self.one_to_rule_em_all_date = tk.StringVar()  # Variable for "One to Rule 'Em All" date
+        self.bulk_rules = []  # Rules of the Bulk Edit tab, in evaluation order
+        self.bulk_plans = None  # Edits the last preview found, applied by "Apply"
+        self.bulk_result_check = tk.StringVar(value="result within Calculated range")
+        self.bulk_new_status = tk.StringVar(value=SUGGESTED_STATUS_CHOICE)
+        self.bulk_unit_pattern = tk.StringVar()
+        self.bulk_unit_value = tk.StringVar()
+        self.bulk_unit_regex = tk.BooleanVar(value=False)
+        self.bulk_date_pattern = tk.StringVar()
+        self.bulk_date_value = tk.StringVar()
+        self.bulk_date_regex = tk.BooleanVar(value=False)
+        self.bulk_preview_text = tk.StringVar(value="Add rules, then preview them")
+        self.progress_text = tk.StringVar(value="Idle")
+        self.report_model = None  # ReportModel of the last run, rendered a page at a time
+        self.report_pages = {}  # Section key -> lines shown, for sections expanded past the first page
+        self.report_positions = {}  # Section key -> (positions of the lines passing the filter, name filter)
+        self.report_section_choice = tk.StringVar(value=ALL_SECTIONS_CHOICE)
+        self.report_filter_text = tk.StringVar()
+
+        # Background validation state; messages are tagged with the run id so a
+        # cancelled run that is still winding down cannot touch a newer run's results
+        self.validation_queue = queue.Queue()
+        self.validation_run_id = 0
+        self.validation_thread = None
+        self.cancel_event = None
 
         # GUI Layout
         self.create_gui()
@@ -44,11 +125,35 @@ class LabDataValidatorApp:
         tk.Entry(file_frame, textvariable=self.csv_path, width=50).grid(row=1, column=1, padx=5)
         tk.Button(file_frame, text="Browse", command=self.browse_csv).grid(row=1, column=2)
 
-        tk.Button(self.root, text="Run Validation", command=self.run_validation).pack(pady=10)
+        run_frame = tk.Frame(self.root)
+        run_frame.pack(pady=10)
+        tk.Button(run_frame, text="Run Validation", command=self.run_validation).pack(side=tk.LEFT)
+        self.cancel_button = tk.Button(run_frame, text="Cancel", command=self.cancel_validation, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        tk.Checkbutton(run_frame, text="Incremental", variable=self.incremental_validation).pack(side=tk.LEFT)
+        tk.Checkbutton(run_frame, text="Watch files", variable=self.watch_files,
+                       command=self.toggle_watch).pack(side=tk.LEFT)
+        tk.Checkbutton(run_frame, text="Profile", variable=self.profile_runs).pack(side=tk.LEFT)
+        self.progress_bar = ttk.Progressbar(run_frame, orient=tk.HORIZONTAL, length=250, mode='determinate')
+        self.progress_bar.pack(side=tk.LEFT, padx=5)
+        tk.Label(run_frame, textvariable=self.progress_text, width=45, anchor="w").pack(side=tk.LEFT)
 
         tk.Label(self.root, text="Validation Results").pack()
+        report_frame = tk.Frame(self.root)
+        report_frame.pack(fill=tk.X, padx=10)
+        tk.Label(report_frame, text="Show:").pack(side=tk.LEFT)
+        ttk.Combobox(report_frame, textvariable=self.report_section_choice, state="readonly", width=25,
+                     values=[ALL_SECTIONS_CHOICE, *(title for _, title, _, _ in ISSUE_SECTIONS)]).pack(side=tk.LEFT)
+        tk.Label(report_frame, text="Test name contains:").pack(side=tk.LEFT, padx=(10, 0))
+        filter_entry = tk.Entry(report_frame, textvariable=self.report_filter_text, width=25)
+        filter_entry.pack(side=tk.LEFT, padx=5)
+        filter_entry.bind("<Return>", self.apply_report_filter)
+        tk.Button(report_frame, text="Filter", command=self.apply_report_filter).pack(side=tk.LEFT)
+        tk.Button(report_frame, text="Export...", command=self.export_report).pack(side=tk.LEFT, padx=5)
         self.results_text = scrolledtext.ScrolledText(self.root, height=10, width=80, wrap=tk.WORD)
         self.results_text.pack(padx=10, pady=5)
+        self.results_text.tag_configure(REPORT_LINK_TAG, foreground="blue", underline=True)
+        self.results_text.tag_bind(REPORT_LINK_TAG, "<Button-1>", self.on_report_link)
 
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -61,18 +166,20 @@ class LabDataValidatorApp:
         status_inner_frame = tk.Frame(self.status_frame)
         status_inner_frame.pack(fill=tk.BOTH, expand=True)
 
-        status_columns = ("TestName", "Current Status", "New Status", "Calculated Range", "Result")
+        status_columns = ("TestName", "Current Status", "New Status", "Calculated Range", "Result", "Suggested Status")
         self.status_tree = ttk.Treeview(status_inner_frame, columns=status_columns, show="headings")
         self.status_tree.heading("TestName", text="Test Name")
         self.status_tree.heading("Current Status", text="Current Status")
         self.status_tree.heading("New Status", text="New Status")
         self.status_tree.heading("Calculated Range", text="Calculated Range")
         self.status_tree.heading("Result", text="Result")
+        self.status_tree.heading("Suggested Status", text="Suggested Status")
         self.status_tree.column("TestName", width=200)
         self.status_tree.column("Current Status", width=100)
         self.status_tree.column("New Status", width=100)
         self.status_tree.column("Calculated Range", width=150)
         self.status_tree.column("Result", width=100)
+        self.status_tree.column("Suggested Status", width=110)
         self.status_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         status_scrollbar = ttk.Scrollbar(status_inner_frame, orient=tk.VERTICAL, command=self.status_tree.yview)
@@ -80,6 +187,7 @@ class LabDataValidatorApp:
         self.status_tree.configure(yscrollcommand=status_scrollbar.set)
 
         self.status_tree.bind("<Button-1>", self.show_status_combobox)
+        self.status_model = TreeRowModel(self.root, self.status_tree)
 
         # Unit Conversions Tab
         self.unit_frame = ttk.Frame(self.notebook)
@@ -89,14 +197,22 @@ class LabDataValidatorApp:
         unit_inner_frame = tk.Frame(self.unit_frame)
         unit_inner_frame.pack(fill=tk.BOTH, expand=True)
 
-        unit_columns = ("TestName", "Current Unit", "New Unit")
+        tk.Button(self.unit_frame, text="Accept Proposed Conversions",
+                  command=self.accept_proposed_conversions).pack(anchor="w", padx=5, pady=2)
+        unit_columns = ("TestName", "Current Unit", "New Unit", "Result", "Proposed Unit", "Proposed Result")
         self.unit_tree = ttk.Treeview(unit_inner_frame, columns=unit_columns, show="headings")
         self.unit_tree.heading("TestName", text="Test Name")
         self.unit_tree.heading("Current Unit", text="Current Unit")
         self.unit_tree.heading("New Unit", text="New Unit")
+        self.unit_tree.heading("Result", text="Result")
+        self.unit_tree.heading("Proposed Unit", text="Proposed Unit")
+        self.unit_tree.heading("Proposed Result", text="Proposed Result")
         self.unit_tree.column("TestName", width=200)
-        self.unit_tree.column("Current Unit", width=300)
-        self.unit_tree.column("New Unit", width=200)
+        self.unit_tree.column("Current Unit", width=250)
+        self.unit_tree.column("New Unit", width=120)
+        self.unit_tree.column("Result", width=80)
+        self.unit_tree.column("Proposed Unit", width=100)
+        self.unit_tree.column("Proposed Result", width=100)
         self.unit_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         unit_scrollbar = ttk.Scrollbar(unit_inner_frame, orient=tk.VERTICAL, command=self.unit_tree.yview)
@@ -104,12 +220,13 @@ class LabDataValidatorApp:
         self.unit_tree.configure(yscrollcommand=unit_scrollbar.set)
 
         self.unit_tree.bind("<Button-1>", self.show_unit_entry)
+        self.unit_model = TreeRowModel(self.root, self.unit_tree)
 
         # Date Updates Tab
         self.date_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.date_frame, text="Date Updates")
 
-        tk.Label(self.date_frame, text="Review and Update Test Dates").pack()
+        tk.Label(self.date_frame, text="Review and Update Dates That Are Missing, Invalid, Outliers or Not ISO").pack()
 
         # "One to Rule 'Em All" Section
         one_to_rule_frame = tk.Frame(self.date_frame)
@@ -121,14 +238,18 @@ class LabDataValidatorApp:
         date_inner_frame = tk.Frame(self.date_frame)
         date_inner_frame.pack(fill=tk.BOTH, expand=True)
 
-        date_columns = ("TestName", "Current Date", "New Date")
+        date_columns = ("TestName", "Current Date", "New Date", "Normalized Date", "Issue")
         self.date_tree = ttk.Treeview(date_inner_frame, columns=date_columns, show="headings")
         self.date_tree.heading("TestName", text="Test Name")
         self.date_tree.heading("Current Date", text="Current Date")
         self.date_tree.heading("New Date", text="New Date")
+        self.date_tree.heading("Normalized Date", text="Normalized Date")
+        self.date_tree.heading("Issue", text="Issue")
         self.date_tree.column("TestName", width=200)
         self.date_tree.column("Current Date", width=150)
         self.date_tree.column("New Date", width=150)
+        self.date_tree.column("Normalized Date", width=150)
+        self.date_tree.column("Issue", width=80)
         self.date_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         date_scrollbar = ttk.Scrollbar(date_inner_frame, orient=tk.VERTICAL, command=self.date_tree.yview)
@@ -136,8 +257,53 @@ class LabDataValidatorApp:
         self.date_tree.configure(yscrollcommand=date_scrollbar.set)
 
         self.date_tree.bind("<Button-1>", self.show_date_entry)
-
-        tk.Button(self.root, text="Save Updated JSON", command=self.save_updated_json).pack(pady=10)
+        self.date_model = TreeRowModel(self.root, self.date_tree)
+        for model in (self.status_model, self.unit_model, self.date_model):
+            model.on_drained = self.show_tree_insert_time
+
+        # Bulk Edit Tab
+        self.bulk_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.bulk_frame, text="Bulk Edit")
+
+        tk.Label(self.bulk_frame, text="Edit Every Matching Row with Rules").pack()
+        rule_frame = tk.Frame(self.bulk_frame)
+        rule_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        tk.Label(rule_frame, text="When status is unknown and").grid(row=0, column=0, sticky="w")
+        ttk.Combobox(rule_frame, textvariable=self.bulk_result_check, values=list(RESULT_CHECK_CHOICES),
+                     state="readonly", width=34).grid(row=0, column=1, columnspan=2, sticky="w", padx=5)
+        tk.Label(rule_frame, text="set status to").grid(row=0, column=3, sticky="w")
+        ttk.Combobox(rule_frame, textvariable=self.bulk_new_status, values=[SUGGESTED_STATUS_CHOICE, *STATUS_CHOICES],
+                     state="readonly", width=15).grid(row=0, column=4, sticky="w", padx=5)
+        tk.Button(rule_frame, text="Add Rule", command=self.add_status_rule).grid(row=0, column=5)
+
+        for row, (field, pattern, value, regex, command) in enumerate((
+                ("unit", self.bulk_unit_pattern, self.bulk_unit_value, self.bulk_unit_regex, self.add_unit_rule),
+                ("date", self.bulk_date_pattern, self.bulk_date_value, self.bulk_date_regex, self.add_date_rule)),
+                start=1):
+            tk.Label(rule_frame, text=f"When {field} matches").grid(row=row, column=0, sticky="w")
+            tk.Entry(rule_frame, textvariable=pattern, width=25).grid(row=row, column=1, sticky="w", padx=5)
+            tk.Checkbutton(rule_frame, text="Regex", variable=regex).grid(row=row, column=2, sticky="w")
+            tk.Label(rule_frame, text=f"set {field} to").grid(row=row, column=3, sticky="w")
+            tk.Entry(rule_frame, textvariable=value, width=15).grid(row=row, column=4, sticky="w", padx=5)
+            tk.Button(rule_frame, text="Add Rule", command=command).grid(row=row, column=5)
+
+        self.bulk_rule_list = tk.Listbox(self.bulk_frame, height=6)
+        self.bulk_rule_list.pack(fill=tk.BOTH, expand=True, padx=5)
+
+        bulk_button_frame = tk.Frame(self.bulk_frame)
+        bulk_button_frame.pack(fill=tk.X, padx=5, pady=5)
+        tk.Button(bulk_button_frame, text="Remove Rule", command=self.remove_bulk_rule).pack(side=tk.LEFT)
+        tk.Button(bulk_button_frame, text="Preview", command=self.preview_bulk_edits).pack(side=tk.LEFT, padx=5)
+        tk.Button(bulk_button_frame, text="Apply", command=self.apply_bulk_edits).pack(side=tk.LEFT)
+        tk.Label(bulk_button_frame, textvariable=self.bulk_preview_text, anchor="w").pack(side=tk.LEFT, padx=5)
+
+        save_frame = tk.Frame(self.root)
+        save_frame.pack(pady=10)
+        tk.Button(save_frame, text="Save Updated JSON", command=self.save_updated_json).pack(side=tk.LEFT)
+        compact_label = "Compact output (orjson)" if orjson is not None else "Compact output"
+        tk.Checkbutton(save_frame, text=compact_label, variable=self.compact_json).pack(side=tk.LEFT, padx=5)
+        tk.Checkbutton(save_frame, text="Normalize dates to ISO", variable=self.normalize_dates).pack(side=tk.LEFT)
 
     def browse_json(self):
         file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
@@ -152,109 +318,126 @@ class LabDataValidatorApp:
     def load_json_data(self, json_file_path):
         """Load JSON data from a file and return the enhancedSerScanObject."""
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_json_document(json_file_path)
             self.json_data = data
             logging.info("Successfully loaded JSON data")
-            return data.get('enhancedSerScanObject', [])
-        except FileNotFoundError as e:
-            logging.error(f"JSON file not found: {json_file_path}. Error: {e}")
-            self.results_text.insert(tk.END, f"JSON file not found: {json_file_path}. Error: {e}\n")
-            return []
-        except json.JSONDecodeError as e:
-            logging.error(f"Invalid JSON format in file: {json_file_path}. Error: {e}")
-            self.results_text.insert(tk.END, f"Invalid JSON format in file: {json_file_path}. Error: {e}\n")
-            return []
+            return scan_items(data)
         except Exception as e:
-            logging.error(f"Unexpected error loading JSON file {json_file_path}: {e}")
-            self.results_text.insert(tk.END, f"Unexpected error loading JSON: {e}\n")
+            message = json_load_error_message(json_file_path, e)
+            logging.error(message)
+            self.results_text.insert(tk.END, f"{message}\n")
             return []
 
     def load_csv_data(self, csv_file_path):
         """Load CSV data into a pandas DataFrame."""
         try:
-            df = pd.read_csv(csv_file_path, sep=',', encoding='utf-8')
-            logging.info(f"CSV columns: {df.columns.tolist()}")
-            logging.info(f"CSV head:\n{df.head().to_string()}")
+            validator = self.reference_cache.load_validator(csv_file_path)
+            df = validator.csv_df
 
-            if 'Search Names' not in df.columns or 'Test Name' not in df.columns or 'Calculated range' not in df.columns or 'Unit' not in df.columns:
-                logging.error(f"Required columns missing in CSV. Available columns: {df.columns.tolist()}")
+            if missing_csv_columns(df):
+                logging.error("Required columns missing in CSV. Available columns: %s", df.columns.tolist())
                 self.results_text.insert(tk.END, f"Error: Required columns missing in CSV: {df.columns.tolist()}\n")
 
             self.csv_df = df
+            self.validator = validator
             return df
-        except FileNotFoundError as e:
-            logging.error(f"CSV file not found: {csv_file_path}. Error: {e}")
-            self.results_text.insert(tk.END, f"CSV file not found: {csv_file_path}. Error: {e}\n")
-            return pd.DataFrame()
-        except pd.errors.EmptyDataError as e:
-            logging.error(f"CSV file is empty: {csv_file_path}. Error: {e}")
-            self.results_text.insert(tk.END, f"CSV file is empty: {csv_file_path}. Error: {e}\n")
-            return pd.DataFrame()
         except Exception as e:
-            logging.error(f"Unexpected error loading CSV file {csv_file_path}: {e}")
-            self.results_text.insert(tk.END, f"Unexpected error loading CSV: {e}\n")
+            message = csv_load_error_message(csv_file_path, e)
+            logging.error(message)
+            self.results_text.insert(tk.END, f"{message}\n")
             return pd.DataFrame()
 
     def validate_status_values(self, json_data):
         """Check that no status values are null or 'unknown'."""
-        issues = []
-        for item in json_data:
-            status = item.get('status')
-            test_name = item.get('TestName')
-            result = item.get('result', 'N/A')
-
-            if status is None:
-                issues.append(f"TestName: {test_name} - Status is null")
-            elif status == 'unknown':
-                issues.append(f"TestName: {test_name} - Status is 'unknown'")
-                calculated_range = self.get_calculated_range(test_name)
-                self.status_tree.insert("", tk.END,
-                                        values=(test_name, 'unknown', 'Click to select...', calculated_range, result),
-                                        tags=(test_name,))
+        issues, status_rows = self.get_validator(self.csv_df).validate_status_values(json_data)
+        self.insert_status_rows(status_rows)
         return issues
 
+    def insert_status_rows(self, status_rows):
+        """Add (TestName, status, calculated range, result, suggested status) rows to the Status Updates tab."""
+        self.status_model.extend((test_name, status, 'Click to select...', calculated_range, result, suggested or '')
+                                 for test_name, status, calculated_range, result, suggested in status_rows)
+
     def get_calculated_range(self, test_name):
         """Retrieve the calculated range for a test from the CSV."""
         if self.csv_df is None:
             return "N/A"
+        return self.get_validator(self.csv_df).get_calculated_range(test_name)
 
-        test_name_match = self.csv_df[self.csv_df['Test Name'].str.lower() == test_name.lower()]
-        if not test_name_match.empty:
-            return test_name_match['Calculated range'].iloc[0]
-
-        escaped_test_name = re.escape(test_name)
-        search_names_match = self.csv_df[
-            self.csv_df['Search Names'].str.contains(escaped_test_name, case=False, na=False)]
-        if not search_names_match.empty:
-            return search_names_match['Calculated range'].iloc[0]
-
-        return "Not found"
+    def get_validator(self, csv_df):
+        """Return the validator for csv_df, building it if the loaded one belongs to another frame."""
+        if self.validator is None or self.validator.csv_df is not csv_df:
+            self.validator = LabDataValidator(csv_df)
+        return self.validator
 
     def populate_unit_conversions(self, json_data):
         """Populate the Unit Conversions tab with tests requiring unit conversion from JSON."""
         if not json_data:
             return
 
-        for item in json_data:
-            unit = item.get('unit', '')
-            test_name = item.get('TestName')
-            if "CONVERSION REQUIRED!!!" in unit:
-                self.unit_tree.insert("", tk.END,
-                                      values=(test_name, unit, 'Click to update...'),
-                                      tags=(test_name,))
+        self.insert_unit_rows(self.get_validator(self.csv_df).unit_conversion_rows(json_data))
+
+    def insert_unit_rows(self, unit_rows):
+        """Add (TestName, unit, result, proposed unit, proposed result) rows to the Unit Conversions tab."""
+        self.unit_model.extend((test_name, unit, 'Click to update...', result, proposed_unit or '',
+                                '' if proposed_result is None else proposed_result)
+                               for test_name, unit, result, proposed_unit, proposed_result in unit_rows)
+
+    def accept_proposed_conversions(self):
+        """Convert every test whose units have a proposed conversion to its reference Unit on save.
+
+        A test is converted as a whole: each of its items is converted from its
+        own unit, and items whose unit or result cannot be converted are saved
+        unchanged.
+        """
+        if self.validation_result is None or self.validator is None:
+            self.results_text.insert(tk.END, "\nRun a validation before accepting conversions.\n")
+            return
+        proposed_names = {test_name for test_name, _, _, proposed_unit, _ in self.validation_result.unit_rows
+                          if proposed_unit is not None}
+        targets = {test_name: self.validator.conversion_target(test_name) for test_name in proposed_names}
+        for test_name, target in targets.items():
+            self.conversion_updates[test_name] = target
+            self.unit_updates.pop(test_name, None)
+        self.journal_edits('unit', 'conversion')
+        self.unit_model.set_column_for_keys(2, {test_name: unit for test_name, (_, unit) in targets.items()})
+        skipped = len({row[0] for row in self.validation_result.unit_rows} - proposed_names)
+        self.results_text.insert(tk.END, f"\nAccepted proposed conversions for {len(targets)} tests"
+                                         f"{f'; {skipped} tests have no known conversion' if skipped else ''}\n")
+        self.results_text.see(tk.END)
+        logging.info("Accepted unit conversions for %s tests", len(targets))
 
     def populate_date_updates(self, json_data):
-        """Populate the Date Updates tab with all tests and their dates from JSON."""
+        """Populate the Date Updates tab with the tests from JSON whose dates need attention."""
         if not json_data:
             return
 
-        for item in json_data:
-            date = item.get('date', 'N/A')
-            test_name = item.get('TestName')
-            self.date_tree.insert("", tk.END,
-                                  values=(test_name, date, 'Click to update...'),
-                                  tags=(test_name,))
+        self.insert_date_rows(self.get_validator(self.csv_df).date_rows(json_data))
+
+    def insert_date_rows(self, date_rows):
+        """Add (TestName, date, normalized date, issue) rows to the Date Updates tab."""
+        self.date_model.extend((test_name, date, 'Click to update...', normalized or '', issue)
+                               for test_name, date, normalized, issue in date_rows)
+
+    def parse_entered_date(self, text, report=True):
+        """Return the ISO form of a date typed into the Date Updates tab, or None if it is not a date.
+
+        Rejected dates are reported in the results pane; outliers are accepted with a warning.
+        With report False nothing is written to the results pane.
+        """
+        normalizer = self.validator.date_normalizer if self.validator is not None else DateNormalizer()
+        normalized, issue = normalizer.normalize_one(text)
+        if not report:
+            return None if issue in (MISSING, INVALID) else normalized
+        if issue in (MISSING, INVALID):
+            self.results_text.insert(tk.END, f"\n'{text}' is not a date this validator can read; try YYYY-MM-DD.\n")
+            self.results_text.see(tk.END)
+            return None
+        if issue == OUTLIER:
+            self.results_text.insert(tk.END, f"\nWarning: {normalized} is before {EARLIEST_DATE.date()} "
+                                             f"or in the future.\n")
+            self.results_text.see(tk.END)
+        return normalized
 
     def apply_date_to_all(self):
         """Apply the date from 'One to Rule 'Em All' to all test entries."""
@@ -262,164 +445,536 @@ class LabDataValidatorApp:
         if not new_date:
             self.results_text.insert(tk.END, "\nPlease enter a date in the 'One to Rule 'Em All' field.\n")
             return
+        new_date = self.parse_entered_date(new_date)
+        if new_date is None:
+            return
 
-        # Update all entries in the Treeview and date_updates dictionary
-        for item in self.date_tree.get_children():
-            test_name = self.date_tree.item(item)['values'][0]
-            current_date = self.date_tree.item(item)['values'][1]
-            self.date_tree.item(item, values=(test_name, current_date, new_date))
-            self.date_updates[test_name] = new_date
+        # The tab only lists dates needing attention, but the date applies to every test in the file
+        self.date_model.set_column_for_all(2, new_date)
+        self.date_updates.update(dict.fromkeys(self.item_indices, new_date))
+        self.journal_edits('date')
 
-        logging.info(f"Applied date {new_date} to all tests")
-        logging.info(f"Current date updates: {self.date_updates}")
+        logging.info("Applied date %s to all %s tests", new_date, len(self.item_indices))
 
     def find_closest_match(self, test_name, csv_df):
         """Find the closest matching test name in Test Name or Search Names using fuzzy matching."""
-        all_names = pd.concat([
-            csv_df['Test Name'].dropna(),
-            csv_df['Search Names'].str.split(',', expand=True).stack().str.strip().reset_index(drop=True)
-        ]).unique()
-
-        best_match = None
-        best_score = 0
-        for name in all_names:
-            score = fuzz.ratio(test_name.lower(), name.lower())
-            if score > best_score and score > 50:
-                best_score = score
-                best_match = name
-
-        return best_match, best_score
+        return self.get_validator(csv_df).find_closest_match(test_name)
 
     def validate_test_name_and_loinc(self, json_data, csv_df):
         """Validate TestName against Test Name and Search Names, and loincCode against Loinc."""
-        unmatched_tests = []
-        loinc_issues = []
-        csv_update_suggestions = []
-
-        for item in json_data:
-            test_name = item.get('TestName')
-            loinc_code = item.get('loincCode')
-
-            logging.info(f"Checking TestName: {test_name}")
-
-            if 'Test Name' not in csv_df.columns or 'Search Names' not in csv_df.columns:
-                unmatched_tests.append(f"TestName: {test_name} - Required columns missing in CSV")
-                continue
-
-            test_name_match = csv_df[csv_df['Test Name'].str.lower() == test_name.lower()]
-
-            if not test_name_match.empty:
-                expected_loinc = test_name_match['Loinc'].iloc[0]
-                if loinc_code != expected_loinc:
-                    loinc_issues.append(
-                        f"TestName: {test_name} - Incorrect loincCode. Expected: {expected_loinc}, Found: {loinc_code}")
-                continue
-
-            escaped_test_name = re.escape(test_name)
-            search_names_match = csv_df[csv_df['Search Names'].str.contains(escaped_test_name, case=False, na=False)]
-
-            if not search_names_match.empty:
-                expected_loinc = search_names_match['Loinc'].iloc[0]
-                if loinc_code != expected_loinc:
-                    loinc_issues.append(
-                        f"TestName: {test_name} - Incorrect loincCode. Expected: {expected_loinc}, Found: {loinc_code}")
-                continue
-
-            closest_match, similarity_score = self.find_closest_match(test_name, csv_df)
-            unmatched_tests.append(f"TestName: {test_name} - Not found in CSV Test Name or Search Names")
-            if closest_match:
-                matching_row = csv_df[csv_df['Test Name'].str.contains(closest_match, case=False, na=False) |
-                                      csv_df['Search Names'].str.contains(closest_match, case=False, na=False)]
-                if not matching_row.empty:
-                    test_name_ref = matching_row['Test Name'].iloc[0]
-                    csv_update_suggestions.append(
-                        f"Suggest adding '{test_name}' to Search Names for Test Name: {test_name_ref} (Similarity: {similarity_score}%)"
-                    )
-                else:
-                    csv_update_suggestions.append(
-                        f"No clear Test Name found for closest match '{closest_match}'. Suggest adding '{test_name}' to a new or related test (Similarity: {similarity_score}%)"
-                    )
-            else:
-                csv_update_suggestions.append(
-                    f"No similar test found for '{test_name}'. Suggest adding '{test_name}' to a new or related test in CSV."
-                )
+        return self.get_validator(csv_df).validate_test_name_and_loinc(json_data)
 
-        return unmatched_tests, loinc_issues, csv_update_suggestions
+    def keeps_pending_edits(self, json_path, csv_path, incremental):
+        """Tell whether a run of a JSON/CSV pair keeps the pending edits: only incremental re-runs of that pair do."""
+        return incremental and self.edits_paths == (os.path.abspath(json_path), os.path.abspath(csv_path))
 
-    def run_validation(self):
-        """Run the validation process and display results."""
+    def reset_results(self, keep_edits):
+        """Clear the report, the result tabs and the loaded data; pending edits survive if keep_edits."""
         self.results_text.delete(1.0, tk.END)
-        self.status_tree.delete(*self.status_tree.get_children())
-        self.unit_tree.delete(*self.unit_tree.get_children())
-        self.date_tree.delete(*self.date_tree.get_children())
-        self.status_updates.clear()
-        self.unit_updates.clear()
-        self.date_updates.clear()
+        self.status_model.clear()
+        self.unit_model.clear()
+        self.date_model.clear()
+        if not keep_edits:
+            self.status_updates.clear()
+            self.unit_updates.clear()
+            self.conversion_updates.clear()
+            self.date_updates.clear()
+            self.one_to_rule_em_all_date.set("")  # Clear the "One to Rule 'Em All" field
+            self.edits_paths = None
         self.csv_df = None
-        self.one_to_rule_em_all_date.set("")  # Clear the "One to Rule 'Em All" field
-
+        self.validator = None
+        self.validation_result = None
+        self.report_model = None
+        self.report_positions = {}
+        self.profile_paths = None
+        self.tree_timing_pending = False
+        self.bulk_plans = None
+        self.json_data = None
+        self.streamed_json_path = None
+        self.item_indices = {}
+        self.session_id = None
+        self.journaled_edits = None
+        self.resumed_edits = 0
+
+    def run_validation(self, keep_results=False):
+        """Start validating in a background thread; results are shown when it finishes.
+
+        Running again while a validation is in progress cancels it and starts over;
+        the new run waits for the cancelled one to stop before it starts. With
+        keep_results the current results stay on screen until the new ones
+        replace them in one step, and are kept if the run fails.
+        """
+        previous_thread = None
+        if self.validation_thread is not None and self.validation_thread.is_alive():
+            logging.info("Cancelling the running validation to start a new one")
+            self.cancel_event.set()
+            previous_thread = self.validation_thread
+
+        incremental = self.incremental_validation.get()
         json_path = self.json_path.get()
         csv_path = self.csv_path.get()
+        self.reset_on_finish = keep_results
+        if not keep_results:
+            self.reset_results(self.keeps_pending_edits(json_path, csv_path, incremental))
 
         if not json_path or not csv_path:
-            self.results_text.insert(tk.END, "Please select both JSON and CSV files.\n")
-            return
-
-        json_data = self.load_json_data(json_path)
-        csv_df = self.load_csv_data(csv_path)
-
-        if not json_data or csv_df.empty:
-            self.results_text.insert(tk.END, "Failed to load data. Check logs for details.\n")
+            if not keep_results:
+                self.results_text.insert(tk.END, "Please select both JSON and CSV files.\n")
             return
 
-        status_issues = self.validate_status_values(json_data)
-        self.populate_unit_conversions(json_data)
-        self.populate_date_updates(json_data)
-
-        unmatched_tests, loinc_issues, csv_update_suggestions = self.validate_test_name_and_loinc(json_data, csv_df)
+        self.validation_run_id += 1
+        self.cancel_event = threading.Event()
+        self.validation_thread = threading.Thread(
+            target=self.validation_worker,
+            args=(self.validation_run_id, json_path, csv_path, self.cancel_event, incremental,
+                  self.profile_runs.get(), previous_thread),
+            daemon=True)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_bar.config(value=0, maximum=1)
+        self.progress_text.set("Loading files...")
+        self.validation_thread.start()
+        self.root.after(VALIDATION_POLL_MS, self.poll_validation_queue, self.validation_run_id)
+
+    def toggle_watch(self):
+        """Start or stop watching the selected JSON and CSV files."""
+        if self.watch_files.get():
+            self.file_watcher.start()
+        else:
+            self.file_watcher.stop()
+
+    def on_watched_files_changed(self, changed_paths):
+        """Re-validate in the background after a watched file changed and settled."""
+        logging.info("Re-validating after changes to %s", ', '.join(changed_paths))
+        self.run_validation(keep_results=True)
+
+    def cancel_validation(self):
+        """Ask the running validation to stop at its next checkpoint."""
+        if self.cancel_event is not None and self.validation_thread is not None and self.validation_thread.is_alive():
+            self.cancel_event.set()
+            self.progress_text.set("Cancelling...")
+
+    def validation_worker(self, run_id, json_path, csv_path, cancel_event, incremental=True, profile=False,
+                          previous_thread=None):
+        """Load and validate off the Tk thread, posting every outcome to validation_queue.
+
+        Widgets must only be touched from the main loop, so this never does.
+        Incremental runs reuse the outcomes of items unchanged since the last run.
+        With profile, the run is profiled into PROFILE_DIR. Everything the run
+        logs carries a fresh run id. previous_thread is a cancelled run still
+        winding down; it is waited for first.
+        """
+        if previous_thread is not None:
+            # Until its next checkpoint it still uses the match cache, the reference index and incremental state
+            previous_thread.join()
+        with log_run() as log_run_id:
+            logging.info("Validation run %s started with log run id %s", run_id, log_run_id)
+            if profile:
+                with profile_capture(PROFILE_DIR) as profile_paths:
+                    self._validate_in_background(run_id, json_path, csv_path, cancel_event, incremental,
+                                                 profile_paths)
+                return
+            self._validate_in_background(run_id, json_path, csv_path, cancel_event, incremental)
+
+    def _validate_in_background(self, run_id, json_path, csv_path, cancel_event, incremental, profile_paths=None):
+        post = self.validation_queue.put
+        metrics = RunMetrics()
+
+        def progress(stage, done, total):
+            post(('progress', run_id, (stage, done, total)))
 
-        self.display_results(json_data, status_issues, unmatched_tests, loinc_issues, csv_update_suggestions)
+        try:
+            errors = []
+            document = None
+            json_data = None
+            session_id = None
+            result = None
+            # An incremental run of a JSON/CSV pair validated before reads its stored run back without loading the JSON
+            resuming = incremental and os.path.isfile(json_path) and os.path.isfile(csv_path)
+            if resuming:
+                with metrics.stage("Session lookup"):
+                    session_id = self.session_store.open_session(json_path, csv_path)
+                with metrics.stage("Session restore"):
+                    result = self.session_store.restore_result(session_id)
+            if result is None:
+                try:
+                    with metrics.stage("Load JSON"):
+                        document, json_data = load_scan_export(json_path)
+                    logging.info("Successfully loaded JSON data")
+                except Exception as e:
+                    errors.append(json_load_error_message(json_path, e))
+                    json_data = []
+            validator = None
+            try:
+                with metrics.stage("Load CSV"):
+                    validator = self.reference_cache.load_validator(csv_path)
+                csv_df = validator.csv_df
+                missing = missing_csv_columns(csv_df)
+                if missing:
+                    logging.error("Required columns missing in CSV. Available columns: %s", csv_df.columns.tolist())
+                    errors.append(f"Error: Required columns missing in CSV: {csv_df.columns.tolist()}")
+            except Exception as e:
+                errors.append(csv_load_error_message(csv_path, e))
+                csv_df = pd.DataFrame()
+            for message in errors:
+                logging.error(message)
+
+            if (result is None and not json_data) or csv_df.empty:
+                post(('failed', run_id, errors))
+                return
+
+            if cancel_event.is_set():
+                raise ValidationCancelled()
+            if not resuming:
+                with metrics.stage("Session lookup"):
+                    session_id = self.session_store.open_session(json_path, csv_path)
+            if result is None and incremental and session_id is not None:
+                # A run stored without its items can still be restored against the loaded ones
+                with metrics.stage("Session restore"):
+                    result = self.session_store.restore_result(session_id, json_data)
+            if result is not None:
+                result.metrics = metrics
+            else:
+                result = self.incremental_validator.validate(validator, json_data, progress=progress,
+                                                             cancel_event=cancel_event, full=not incremental,
+                                                             metrics=metrics, source=os.path.abspath(json_path),
+                                                             strict_names=True)
+            with metrics.stage("Edit index"):
+                if json_data is None:
+                    item_indices = index_names(result.item_names.tolist())
+                else:
+                    item_indices = index_items_by_name(json_data)
+            with metrics.stage("Edit journal"):
+                journal = self.session_store.replay(session_id)
+            post(('done', run_id, (errors, json_path, csv_path, document, item_indices, validator, result,
+                                   profile_paths, session_id, journal, incremental)))
+            if result.session is None:
+                # Stored after the results are posted, so writing them does not delay showing them
+                self.session_store.record_run(session_id, result, log_run_id=current_run_id(), json_data=json_data)
+        except ValidationCancelled:
+            logging.info("Validation run %s cancelled", run_id)
+            post(('cancelled', run_id, None))
+        except Exception as e:
+            logging.exception("Validation run %s failed", run_id)
+            post(('failed', run_id, [f"Unexpected error during validation: {e}"]))
 
-    def display_results(self, json_data, status_issues, unmatched_tests, loinc_issues, csv_update_suggestions):
-        """Display validation results in the text area."""
-        self.results_text.insert(tk.END, "Lab Data Validation Report\n\n")
-        self.results_text.insert(tk.END, "Summary\n")
-        self.results_text.insert(tk.END, f"Total Tests Processed: {len(json_data)}\n")
-        self.results_text.insert(tk.END, f"Status Issues: {len(status_issues)}\n")
-        self.results_text.insert(tk.END, f"Unmatched Test Names: {len(unmatched_tests)}\n")
-        self.results_text.insert(tk.END, f"Loinc Validation Issues: {len(loinc_issues)}\n")
-        self.results_text.insert(tk.END, f"CSV Update Suggestions: {len(csv_update_suggestions)}\n\n")
+    def poll_validation_queue(self, run_id):
+        """Apply queued worker messages for run_id and keep polling until it finishes.
 
-        self.results_text.insert(tk.END, "Status Issues\n")
-        if status_issues:
-            for issue in status_issues:
-                self.results_text.insert(tk.END, f"{issue}\n")
-        else:
-            self.results_text.insert(tk.END, "No issues found\n")
-        self.results_text.insert(tk.END, "\n")
-
-        self.results_text.insert(tk.END, "Unmatched Test Names\n")
-        if unmatched_tests:
-            for test in unmatched_tests:
-                self.results_text.insert(tk.END, f"{test}\n")
+        A poller whose run has been superseded stops without reading the queue;
+        late messages from superseded runs are dropped unread by the current one.
+        """
+        if run_id != self.validation_run_id:
+            return
+        finished = False
+        try:
+            while True:
+                kind, message_run_id, payload = self.validation_queue.get_nowait()
+                if message_run_id != self.validation_run_id:
+                    continue
+                if kind == 'progress':
+                    self.show_progress(*payload)
+                    continue
+                finished = True
+                self.finish_validation(kind, payload)
+                break
+        except queue.Empty:
+            pass
+
+        if not finished:
+            self.root.after(VALIDATION_POLL_MS, self.poll_validation_queue, run_id)
+
+    def show_progress(self, stage, done, total):
+        """Update the progress bar and label from a worker progress message."""
+        self.progress_bar.config(maximum=max(total, 1), value=done)
+        if stage == "Fuzzy matching":
+            self.progress_text.set(f"{stage}: {total - done} distinct names pending")
         else:
-            self.results_text.insert(tk.END, "No unmatched Test Names found\n")
-        self.results_text.insert(tk.END, "\n")
+            self.progress_text.set(f"{stage}: {done}/{total} items processed")
+
+    def finish_validation(self, kind, payload):
+        """Show the outcome of a finished validation run."""
+        self.cancel_button.config(state=tk.DISABLED)
+        if self.reset_on_finish and kind != 'done':
+            # A watch-triggered run that did not finish leaves the previous results in place
+            self.progress_text.set(f"Re-validation {kind}; showing previous results")
+            if kind == 'failed':
+                for message in payload:
+                    logging.warning("Re-validation failed: %s", message)
+            return
+        if kind == 'cancelled':
+            self.progress_text.set("Cancelled")
+            self.results_text.insert(tk.END, "Validation cancelled.\n")
+            return
+        if kind == 'failed':
+            self.progress_text.set("Failed")
+            for message in payload:
+                self.results_text.insert(tk.END, f"{message}\n")
+            self.results_text.insert(tk.END, "Failed to load data. Check logs for details.\n")
+            return
 
-        self.results_text.insert(tk.END, "Loinc Validation Issues\n")
-        if loinc_issues:
-            for issue in loinc_issues:
-                self.results_text.insert(tk.END, f"{issue}\n")
-        else:
-            self.results_text.insert(tk.END, "No Loinc issues found\n")
-        self.results_text.insert(tk.END, "\n")
+        (errors, json_path, csv_path, document, item_indices, validator, result, profile_paths, session_id, journal,
+         incremental) = payload
+        if self.reset_on_finish:
+            self.reset_results(self.keeps_pending_edits(json_path, csv_path, self.incremental_validation.get()))
+            self.reset_on_finish = False
+        self.edits_paths = (os.path.abspath(json_path), os.path.abspath(csv_path))
+        for message in errors:
+            self.results_text.insert(tk.END, f"{message}\n")
+        self.json_data = document
+        self.streamed_json_path = json_path if document is None else None
+        self.item_indices = item_indices
+        self.csv_df = validator.csv_df
+        self.validator = validator
+        self.validation_result = result
+        self.profile_paths = profile_paths
+        self.resume_session(session_id, journal, incremental)
+        with result.metrics.stage("Result rows"):
+            self.insert_status_rows(result.status_rows)
+            self.insert_unit_rows(result.unit_rows)
+            self.insert_date_rows(result.date_rows)
+            self.reapply_pending_edits()
+        self.progress_text.set(f"Done: {result.total_tests} items validated")
+        self.display_results(result.total_tests, result.status_issues, result.unmatched_tests, result.loinc_issues,
+                             result.csv_update_suggestions)
+        self.tree_timing_pending = True
+        self.show_tree_insert_time()
+
+    def pending_edits(self):
+        """Return the pending edit dicts by EDIT_FIELDS name."""
+        return {'status': self.status_updates, 'unit': self.unit_updates, 'date': self.date_updates,
+                'conversion': self.conversion_updates}
+
+    def resume_session(self, session_id, journal, incremental):
+        """Tie the pending edits to the finished run's stored session.
+
+        An incremental run that starts without pending edits, such as the first
+        run after a restart, picks up the edits the session's journal left off
+        with. Otherwise the pending edits win, and whatever they change is
+        appended to the journal.
+        """
+        self.session_id = session_id
+        self.resumed_edits = 0
+        if session_id is None:
+            self.journaled_edits = None
+            return
+        edits = self.pending_edits()
+        if incremental and not any(edits.values()):
+            for field in EDIT_FIELDS:
+                edits[field].update(journal[field])
+            self.resumed_edits = sum(len(journal[field]) for field in EDIT_FIELDS)
+            logging.info("Resumed %s pending edits from session %s", self.resumed_edits, session_id)
+        self.journaled_edits = journal
+        self.journal_edits()
+
+    def journal_edits(self, *fields):
+        """Append what changed in the given pending edit dicts (all of them by default) to the session's journal.
+
+        If the journal cannot be written, the session is dropped and edits are
+        kept in memory only, as they are without a session.
+        """
+        if self.session_id is None:
+            return
+        edits = self.pending_edits()
+        for field in fields or EDIT_FIELDS:
+            changes = edit_changes(self.journaled_edits[field], edits[field])
+            if self.session_store.append_edits(self.session_id, field, changes) is None:
+                self.session_id = None
+                self.journaled_edits = None
+                self.results_text.insert(tk.END, "\nCould not write the edit journal; edits are kept in memory only.\n")
+                return
+            self.journaled_edits[field] = dict(edits[field])
+
+    def reapply_pending_edits(self):
+        """Show edits kept from before a re-validation on the rows that still carry their TestName."""
+        for model, updates in ((self.status_model, self.status_updates), (self.unit_model, self.unit_updates),
+                               (self.date_model, self.date_updates)):
+            for test_name, value in updates.items():
+                for item in model.item_ids(test_name):
+                    model.set_column(item, 2, value)
+        self.unit_model.set_column_for_keys(2, {test_name: unit for test_name, (_, unit)
+                                                in self.conversion_updates.items()})
+
+    def display_results(self, total_tests, status_issues, unmatched_tests, loinc_issues, csv_update_suggestions):
+        """Build the report model for the validation results and render its first page."""
+        summary = [
+            f"Total Tests Processed: {total_tests}",
+            f"Status Issues: {len(status_issues)}",
+            f"Unmatched Test Names: {len(unmatched_tests)}",
+            f"Loinc Validation Issues: {len(loinc_issues)}",
+            f"CSV Update Suggestions: {len(csv_update_suggestions)}",
+        ]
+        if self.validator is not None:
+            build_ms = self.validator.reference_index.build_seconds * 1000
+            summary.append(f"Reference Index Build Time: {build_ms:.1f} ms")
+            unparsed = len(self.validator.reference_index.ranges.failures)
+            if unparsed:
+                summary.append(f"Unparsed Calculated Ranges: {unparsed} CSV rows")
+        footer_sections = []
+        if self.validation_result is not None:
+            date_issues = Counter(row[3] for row in self.validation_result.date_rows)
+            details = ', '.join(f"{count} {issue}" for issue, count in date_issues.most_common())
+            summary.append(f"Date Issues: {sum(date_issues.values())}{f' ({details})' if details else ''}")
+            status_rows = self.validation_result.status_rows
+            suggested = sum(row[4] is not None for row in status_rows)
+            summary.append(f"Suggested Statuses: {suggested} of {len(status_rows)} 'unknown'")
+            match_cache = self.validation_result.match_cache
+            summary.append(f"Match Cache: {match_cache['hits']} hits, {match_cache['misses']} misses")
+            session = self.validation_result.session
+            if session is not None:
+                restored_at = pd.Timestamp.fromtimestamp(session['created'])
+                summary.append(f"Session: results restored from the run of {restored_at:%Y-%m-%d %H:%M}")
+            if self.resumed_edits:
+                summary.append(f"Resumed Edits: {self.resumed_edits} pending edits from the last session")
+            incremental = self.validation_result.incremental
+            if incremental is not None:
+                summary.append(f"Items Re-checked: {incremental['items_rechecked']}, "
+                               f"Reused: {incremental['items_reused']}")
+                if incremental['names_carried'] is not None:
+                    summary.append(f"CSV Changed: {incremental['names_carried']} resolved names "
+                                   f"reused, {incremental['names_resolved']} re-matched")
+            if self.validation_result.metrics is not None:
+                performance = self.validation_result.metrics.report_lines()
+                if self.profile_paths:
+                    performance += [f"Profile: {self.profile_paths['profile']}",
+                                    f"Profile Summary: {self.profile_paths['summary']}"]
+                footer_sections.append(ReportSection('performance', "Performance", performance))
+
+        issues = {'status_issues': status_issues, 'unmatched_tests': unmatched_tests, 'loinc_issues': loinc_issues,
+                  'csv_update_suggestions': csv_update_suggestions}
+        self.report_model = ReportModel.from_issues("Lab Data Validation Report", summary, issues,
+                                                    self.validation_result, footer_sections)
+        self.report_pages = {}
+        # The report lives between two marks, so notes added below it survive re-rendering
+        self.results_text.mark_set('report_start', 'end-1c')
+        self.results_text.mark_gravity('report_start', tk.LEFT)
+        self.results_text.mark_set('report_end', 'end-1c')
+        self.results_text.mark_gravity('report_end', tk.LEFT)
+        self.render_report()
+
+    def insert_at_mark(self, mark, chunks):
+        """Insert (text, tags) chunks at mark in one Text call, leaving the mark after them."""
+        self.results_text.mark_gravity(mark, tk.RIGHT)
+        self.results_text.insert(mark, *(part for text, tags in chunks for part in (text, tags)))
+        self.results_text.mark_gravity(mark, tk.LEFT)
+
+    def report_filter_keys(self):
+        """Return the issue section keys the report filter shows, or None for all of them."""
+        choice = self.report_section_choice.get()
+        if choice == ALL_SECTIONS_CHOICE:
+            return None
+        return {section.key for section in self.report_model.sections if section.title == choice}
+
+    def render_report(self):
+        """Redraw the whole report: the summary, then a page of each section passing the filter."""
+        model = self.report_model
+        if model is None:
+            return
+        self.results_text.delete('report_start', 'report_end')
+        heading = f"{model.title}\n\nSummary\n" + ''.join(f"{line}\n" for line in model.summary) + "\n"
+        keys = self.report_filter_keys()
+        name_filter = self.report_filter_text.get().strip()
+        if keys is not None or name_filter:
+            shown = self.report_section_choice.get() if keys is not None else "all issues"
+            heading += f"Showing {shown}{f' for test names containing {name_filter!r}' if name_filter else ''}\n\n"
+        self.insert_at_mark('report_end', [(heading, ())])
+        for section in model.sections:
+            if keys is None or section.key in keys:
+                self.render_section(section, section.matching(name_filter), name_filter)
+        for section in model.footer_sections:
+            self.render_section(section, section.matching())
+
+    def render_section(self, section, positions, name_filter=''):
+        """Append one section at the end of the report, between its own marks, in one insert."""
+        start, end = f'report_{section.key}_start', f'report_{section.key}_end'
+        self.results_text.mark_set(start, 'report_end')
+        self.results_text.mark_gravity(start, tk.LEFT)
+        self.insert_at_mark('report_end', self.section_chunks(section, positions, name_filter) + [("\n", ())])
+        # The blank line after the section stays outside its marks
+        self.results_text.mark_set(end, 'report_end -1c')
+        self.results_text.mark_gravity(end, tk.LEFT)
+        self.report_positions[section.key] = (positions, name_filter)
+
+    def section_chunks(self, section, positions, name_filter):
+        """Return the (text, tags) chunks of a section: heading, its shown page of lines and paging links."""
+        heading = section.title
+        if name_filter:
+            heading += f" ({len(positions)} of {len(section)} match)"
+        if not len(section):
+            return [(f"{heading}\n{section.empty_message}\n", ())]
+        if not len(positions):
+            return [(f"{heading}\nNo matching lines\n", ())]
+        shown = min(len(positions), self.report_pages.get(section.key, REPORT_PAGE_LINES))
+        lines = section.lines
+        chunks = [(f"{heading}\n" + ''.join(f"{lines[position]}\n" for position in positions[:shown].tolist()), ())]
+        remaining = len(positions) - shown
+        if remaining:
+            more_tag, all_tag = f'report_more_{section.key}', f'report_all_{section.key}'
+            chunks += [(f"{remaining} more lines: ", ()),
+                       (f"show {min(REPORT_PAGE_LINES, remaining)} more", (REPORT_LINK_TAG, more_tag)),
+                       (" | ", ()),
+                       ("show all", (REPORT_LINK_TAG, all_tag)),
+                       ("\n", ())]
+        return chunks
+
+    def on_report_link(self, event):
+        """Page in more lines of the section whose "show more" or "show all" link was clicked."""
+        for tag in self.results_text.tag_names(f"@{event.x},{event.y}"):
+            if tag.startswith('report_more_'):
+                self.show_more_report_lines(tag[len('report_more_'):])
+            elif tag.startswith('report_all_'):
+                self.show_more_report_lines(tag[len('report_all_'):], everything=True)
+
+    def show_more_report_lines(self, key, everything=False):
+        """Show the next page of a report section, or all of it, re-rendering only that section."""
+        section = self.report_model.section(key)
+        positions, name_filter = self.report_positions[key]
+        shown = self.report_pages.get(key, REPORT_PAGE_LINES)
+        self.report_pages[key] = len(positions) if everything else shown + REPORT_PAGE_LINES
+        start, end = f'report_{key}_start', f'report_{key}_end'
+        self.results_text.delete(start, end)
+        self.insert_at_mark(end, self.section_chunks(section, positions, name_filter))
+
+    def apply_report_filter(self, event=None):
+        """Re-render the report showing only the chosen section and test names."""
+        if self.report_model is None:
+            return
+        self.report_pages = {}
+        self.render_report()
 
-        self.results_text.insert(tk.END, "CSV Update Suggestions\n")
-        if csv_update_suggestions:
-            for suggestion in csv_update_suggestions:
-                self.results_text.insert(tk.END, f"{suggestion}\n")
-        else:
-            self.results_text.insert(tk.END, "No CSV update suggestions\n")
+    def export_report(self):
+        """Write the issue lines passing the report filter to a CSV or JSON Lines file."""
+        if self.report_model is None:
+            self.results_text.insert(tk.END, "\nRun a validation before exporting the report.\n")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                            filetypes=[("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl")])
+        if not path:
+            return
+        keys = self.report_filter_keys()
+        name_filter = self.report_filter_text.get().strip()
+        try:
+            if path.endswith('.jsonl'):
+                count = self.report_model.export_jsonl(path, keys, name_filter)
+            else:
+                count = self.report_model.export_csv(path, keys, name_filter)
+        except OSError as e:
+            self.results_text.insert(tk.END, f"\nError exporting report: {e}\n")
+            logging.error("Error exporting report: %s", e)
+            return
+        self.results_text.insert(tk.END, f"\nExported {count} report lines to: {path}\n")
+        self.results_text.see(tk.END)
+        logging.info("Exported %s report lines to %s", count, path)
+
+    def show_tree_insert_time(self):
+        """Add the Treeview insert time to the report once the finished run's rows are all inserted."""
+        models = (self.status_model, self.unit_model, self.date_model)
+        if not self.tree_timing_pending or any(model.pending for model in models):
+            return
+        self.tree_timing_pending = False
+        rows = sum(len(model) for model in models)
+        insert_ms = sum(model.insert_seconds for model in models) * 1000
+        self.results_text.insert(tk.END, f"Treeview Inserts: {insert_ms:.1f} ms ({rows} rows)\n")
+        logging.info("Inserted %s result rows into the Treeviews in %.1f ms", rows, insert_ms)
 
     def show_status_combobox(self, event):
         """Show a Combobox when clicking on the 'New Status' column."""
@@ -438,10 +993,9 @@ class LabDataValidatorApp:
             return
 
         x, y, width, height = bbox
-        test_name = self.status_tree.item(row_id)['values'][0]
+        test_name = self.status_model.values(row_id)[0]
 
-        combobox = ttk.Combobox(self.status_tree, values=["Select...", "inRange", "warning", "outOfRange", "optimal"],
-                                state="readonly", width=15)
+        combobox = ttk.Combobox(self.status_tree, values=["Select...", *STATUS_CHOICES], state="readonly", width=15)
         combobox.place(x=x, y=y, width=width, height=height)
         combobox.current(0)
         combobox.bind("<<ComboboxSelected>>", lambda e, tn=test_name: self.update_status(tn, combobox.get()))
@@ -455,7 +1009,7 @@ class LabDataValidatorApp:
 
         destroy_id = self.root.bind("<Button-1>", destroy_combobox)
         self.current_combobox = combobox
-        logging.info(f"Created Combobox for TestName: {test_name} (Status Update)")
+        logging.info("Created Combobox for TestName: %s (Status Update)", test_name)
 
     def show_unit_entry(self, event):
         """Show an Entry widget when clicking on the 'New Unit' column."""
@@ -474,7 +1028,7 @@ class LabDataValidatorApp:
             return
 
         x, y, width, height = bbox
-        test_name = self.unit_tree.item(row_id)['values'][0]
+        test_name = self.unit_model.values(row_id)[0]
 
         entry = tk.Entry(self.unit_tree, width=20)
         entry.place(x=x, y=y, width=width, height=height)
@@ -484,13 +1038,12 @@ class LabDataValidatorApp:
             new_unit = entry.get().strip()
             if new_unit:
                 self.unit_updates[test_name] = new_unit
-                logging.info(f"Updated unit for {test_name} to {new_unit}")
-                logging.info(f"Current unit updates: {self.unit_updates}")
-                for item in self.unit_tree.get_children():
-                    if self.unit_tree.item(item)['values'][0] == test_name:
-                        current_values = self.unit_tree.item(item)['values']
-                        self.unit_tree.item(item, values=(test_name, current_values[1], new_unit))
-                        break
+                self.conversion_updates.pop(test_name, None)
+                self.journal_edits('unit', 'conversion')
+                logging.info("Updated unit for %s to %s (%s unit edits pending)", test_name, new_unit,
+                             len(self.unit_updates))
+                for item in self.unit_model.item_ids(test_name):
+                    self.unit_model.set_column(item, 2, new_unit)
             entry.destroy()
             self.current_combobox = None
             self.root.unbind("<Return>", save_id)
@@ -505,7 +1058,7 @@ class LabDataValidatorApp:
         save_id = self.root.bind("<Return>", save_unit)
         destroy_id = self.root.bind("<FocusOut>", destroy_entry)
         self.current_combobox = entry
-        logging.info(f"Created Entry for TestName: {test_name} (Unit Update)")
+        logging.info("Created Entry for TestName: %s (Unit Update)", test_name)
 
     def show_date_entry(self, event):
         """Show an Entry widget when clicking on the 'New Date' column."""
@@ -524,7 +1077,7 @@ class LabDataValidatorApp:
             return
 
         x, y, width, height = bbox
-        test_name = self.date_tree.item(row_id)['values'][0]
+        test_name = self.date_model.values(row_id)[0]
 
         entry = tk.Entry(self.date_tree, width=20)
         entry.place(x=x, y=y, width=width, height=height)
@@ -532,15 +1085,15 @@ class LabDataValidatorApp:
 
         def save_date(e):
             new_date = entry.get().strip()
+            if new_date:
+                new_date = self.parse_entered_date(new_date)
             if new_date:
                 self.date_updates[test_name] = new_date
-                logging.info(f"Updated date for {test_name} to {new_date}")
-                logging.info(f"Current date updates: {self.date_updates}")
-                for item in self.date_tree.get_children():
-                    if self.date_tree.item(item)['values'][0] == test_name:
-                        current_values = self.date_tree.item(item)['values']
-                        self.date_tree.item(item, values=(test_name, current_values[1], new_date))
-                        break
+                self.journal_edits('date')
+                logging.info("Updated date for %s to %s (%s date edits pending)", test_name, new_date,
+                             len(self.date_updates))
+                for item in self.date_model.item_ids(test_name):
+                    self.date_model.set_column(item, 2, new_date)
             entry.destroy()
             self.current_combobox = None
             self.root.unbind("<Return>", save_id)
@@ -555,74 +1108,169 @@ class LabDataValidatorApp:
         save_id = self.root.bind("<Return>", save_date)
         destroy_id = self.root.bind("<FocusOut>", destroy_entry)
         self.current_combobox = entry
-        logging.info(f"Created Entry for TestName: {test_name} (Date Update)")
+        logging.info("Created Entry for TestName: %s (Date Update)", test_name)
 
     def update_status(self, test_name, new_status):
         """Store the new status for a test."""
         if new_status != "Select...":
             self.status_updates[test_name] = new_status
-            logging.info(f"Updated status for {test_name} to {new_status}")
-            logging.info(f"Current status updates: {self.status_updates}")
-            for item in self.status_tree.get_children():
-                if self.status_tree.item(item)['values'][0] == test_name:
-                    current_values = self.status_tree.item(item)['values']
-                    self.status_tree.item(item, values=(test_name, current_values[1], new_status, current_values[3],
-                                                        current_values[4]))
-                    break
+            self.journal_edits('status')
+            logging.info("Updated status for %s to %s (%s status edits pending)", test_name, new_status,
+                         len(self.status_updates))
+            for item in self.status_model.item_ids(test_name):
+                self.status_model.set_column(item, 2, new_status)
+
+    def add_bulk_rule(self, rule):
+        """Add a rule to the end of the Bulk Edit list; earlier rules take precedence."""
+        self.bulk_rules.append(rule)
+        self.bulk_rule_list.insert(tk.END, rule.describe())
+        self.bulk_plans = None
+        self.bulk_preview_text.set(f"{len(self.bulk_rules)} rules; preview them before applying")
+
+    def add_status_rule(self):
+        new_status = self.bulk_new_status.get()
+        self.add_bulk_rule(StatusRule(None if new_status == SUGGESTED_STATUS_CHOICE else new_status,
+                                      result_check=RESULT_CHECK_CHOICES[self.bulk_result_check.get()]))
+
+    def add_unit_rule(self):
+        self.add_pattern_rule('unit', self.bulk_unit_pattern, self.bulk_unit_value, self.bulk_unit_regex)
+
+    def add_date_rule(self):
+        self.add_pattern_rule('date', self.bulk_date_pattern, self.bulk_date_value, self.bulk_date_regex)
+
+    def add_pattern_rule(self, field, pattern, value, regex):
+        """Add a unit or date rule from its entries, rejecting an empty or invalid pattern."""
+        if not pattern.get() or not value.get().strip():
+            self.bulk_preview_text.set(f"Enter both a pattern and a new {field}")
+            return
+        try:
+            rule = PatternRule(field, pattern.get(), value.get().strip(), regex=regex.get())
+        except re.error as e:
+            self.bulk_preview_text.set(f"Invalid pattern: {e}")
+            return
+        self.add_bulk_rule(rule)
+
+    def remove_bulk_rule(self):
+        """Remove the rules selected in the Bulk Edit list."""
+        for position in reversed(self.bulk_rule_list.curselection()):
+            self.bulk_rule_list.delete(position)
+            del self.bulk_rules[position]
+        self.bulk_plans = None
+        self.bulk_preview_text.set(f"{len(self.bulk_rules)} rules")
+
+    def preview_bulk_edits(self):
+        """Evaluate the bulk rules over every result row and show how many edits they would make."""
+        if self.validation_result is None:
+            self.bulk_preview_text.set("Run a validation first")
+            return
+        if not self.bulk_rules:
+            self.bulk_preview_text.set("Add at least one rule")
+            return
+        result = self.validation_result
+        self.bulk_plans = plan_bulk_edits(
+            self.bulk_rules,
+            {'status': result.status_rows, 'unit': result.unit_rows, 'date': result.date_rows},
+            {'status': self.status_updates, 'unit': self.unit_updates, 'date': self.date_updates},
+            # Bulk dates must parse like dates typed into the tab, and are stored in ISO form too
+            {'date': lambda text: self.parse_entered_date(text, report=False)})
+        self.results_text.insert(tk.END, "\nBulk Edit Preview:\n")
+        for plan in self.bulk_plans.values():
+            self.results_text.insert(tk.END, f"{plan.summary()}\n")
+        self.results_text.see(tk.END)
+        total = sum(len(plan) for plan in self.bulk_plans.values())
+        self.bulk_preview_text.set(f"{total} tests will be updated; press Apply to commit")
+
+    def apply_bulk_edits(self):
+        """Apply the previewed bulk edits to the pending edits and the result tabs in one batch."""
+        if self.bulk_plans is None:
+            self.bulk_preview_text.set("Preview the rules before applying them")
+            return
+        fields = {'status': (self.status_model, self.status_updates),
+                  'unit': (self.unit_model, self.unit_updates),
+                  'date': (self.date_model, self.date_updates)}
+        changed = 0
+        for field, plan in self.bulk_plans.items():
+            model, updates = fields[field]
+            changed += apply_plan(plan, updates)
+            if field == 'unit':
+                for test_name in plan.updates:
+                    self.conversion_updates.pop(test_name, None)
+            model.set_column_for_keys(2, plan.updates)
+            logging.info("Bulk edit set %s for %s tests", field, len(plan))
+        self.journal_edits()
+        self.bulk_plans = None
+        self.bulk_preview_text.set(f"Applied: {changed} pending edits added or changed")
+        self.results_text.insert(tk.END, f"Bulk edit applied: {changed} pending edits added or changed\n")
+        self.results_text.see(tk.END)
 
     def save_updated_json(self):
-        """Save only the enhancedSerScanObject with updated status, unit, and date values as the root of the new JSON file."""
-        if not self.json_data:
+        """Save only the enhancedSerScanObject with updated status, unit, and date values as the root of the new JSON file.
+
+        With a stored session the edits are replayed from its journal, so the
+        file holds exactly the edits a restart would resume.
+        """
+        if not self.json_data and not self.streamed_json_path:
             self.results_text.insert(tk.END, "\nNo JSON data loaded to save.\n")
             logging.error("No JSON data loaded to save.")
             return
 
-        if not self.status_updates and not self.unit_updates and not self.date_updates:
+        edits = self.session_store.replay(self.session_id) if self.session_id is not None else self.pending_edits()
+        normalize_dates = self.normalize_dates.get() and self.validation_result is not None
+        if not any(edits.values()) and not normalize_dates:
             self.results_text.insert(tk.END, "\nNo status, unit, or date updates to save.\n")
             logging.info("No status, unit, or date updates to save.")
             return
 
-        logging.info(f"Applying status updates: {self.status_updates}")
-        logging.info(f"Applying unit updates: {self.unit_updates}")
-        logging.info(f"Applying date updates: {self.date_updates}")
-
-        # Get the enhancedSerScanObject and apply updates
-        enhanced_data = self.json_data.get('enhancedSerScanObject', [])
-        updated_count = 0
-        for item in enhanced_data:
-            test_name = item.get('TestName')
-            if test_name in self.status_updates:
-                item['status'] = self.status_updates[test_name]
-                updated_count += 1
-                logging.info(f"Updated {test_name} status to {item['status']}")
-            if test_name in self.unit_updates:
-                item['unit'] = self.unit_updates[test_name]
-                updated_count += 1
-                logging.info(f"Updated {test_name} unit to {item['unit']}")
-            if test_name in self.date_updates:
-                item['date'] = self.date_updates[test_name]
-                updated_count += 1
-                logging.info(f"Updated {test_name} date to {item['date']}")
+        logging.info("Applying %s status, %s unit, %s date updates and %s unit conversions",
+                     len(edits['status']), len(edits['unit']), len(edits['date']), len(edits['conversion']))
+
+        # Work out which items change from the TestName -> positions index, then
+        # stream every item to disk with its patch applied
+        converter = self.get_validator(self.csv_df).unit_converter if edits['conversion'] else None
+        conversions = {test_name: converter.item_converter(analyte, unit)
+                       for test_name, (analyte, unit) in edits['conversion'].items()}
+        patches = build_item_patches(self.item_indices, edits['status'], edits['unit'], edits['date'], conversions)
+        if normalize_dates:
+            # Every flagged date that parsed is written in ISO form, unless its test's date was edited
+            outcomes = self.validation_result.item_outcomes
+            normalized = outcomes['normalized_date'].to_numpy()
+            positions = np.flatnonzero((normalized != None) & (outcomes['date_issue'].to_numpy() != None))  # noqa: E711
+            normalized_count = fill_item_patches(patches, 'date', positions.tolist(), normalized[positions].tolist())
+            logging.info("Normalizing %s dates to ISO", normalized_count)
+        updated_count = sum(len(patch) for patch in patches.values())
 
         if updated_count == 0:
             self.results_text.insert(tk.END, "\nNo matching TestNames found in enhancedSerScanObject to update.\n")
             logging.warning("No matching TestNames found in enhancedSerScanObject to update.")
             return
 
-        logging.info(f"Updated enhancedSerScanObject to be saved: {json.dumps(enhanced_data, indent=4)}")
+        logging.info("Applying %s field updates to %s items", updated_count, len(patches))
 
+        # Streamed files only kept the checked fields, so their full items are read again
+        if self.json_data:
+            enhanced_data = scan_items(self.json_data)
+        else:
+            enhanced_data = iter_scan_items(self.streamed_json_path, fields=None)
+
+        compact = self.compact_json.get()
         output_path = Path(self.json_path.get()).with_name("updated_" + Path(self.json_path.get()).name)
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(enhanced_data, f, indent=4, ensure_ascii=False)
+            write_json_array(output_path, apply_item_patches(enhanced_data, patches),
+                             compact=compact, use_orjson=compact and orjson is not None)
             self.results_text.insert(tk.END, f"\nUpdated enhancedSerScanObject saved to: {output_path}\n")
-            logging.info(f"Successfully saved updated enhancedSerScanObject to: {output_path}")
+            logging.info("Successfully saved updated enhancedSerScanObject to: %s", output_path)
         except Exception as e:
             self.results_text.insert(tk.END, f"\nError saving JSON: {str(e)}\n")
-            logging.error(f"Error saving JSON: {str(e)}")
+            logging.error("Error saving JSON: %s", str(e))
 
 
 def main():
+    if len(sys.argv) > 1:
+        # Any arguments select the headless command line instead of the GUI
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
+
+    configure_logging(level=LOG_LEVEL, json_format=LOG_FORMAT == 'json')
     root = tk.Tk()
     app = LabDataValidatorApp(root)
     root.mainloop()
@@ -0,0 +1,616 @@
+import json
+import logging
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from date_normalization import DateNormalizer
+from instrumentation import RunMetrics
+from json_stream import iter_scan_items, should_stream
+from match_resolver import MatchResolver
+from structured_logging import ItemTrace, log_counters
+from reference_index import ReferenceIndex
+from unit_conversion import UNIT_CONVERSION_MARKER, UnitConverter
+
+REQUIRED_CSV_COLUMNS = ('Search Names', 'Test Name', 'Calculated range', 'Unit')
+# Per-item columns of the frame LabDataValidator.check_frame returns. Message
+# columns hold None for items without that issue.
+OUTCOME_COLUMNS = ('status_issue', 'status_unknown', 'calculated_range', 'suggested_status', 'needs_conversion',
+                   'proposed_unit', 'proposed_result', 'normalized_date', 'date_issue', 'matched', 'unmatched_test',
+                   'loinc_issue', 'csv_update_suggestion')
+# Columns of the frame items_frame builds: the scan item fields the checks read,
+# with the default each check uses when an item lacks the field.
+ITEM_COLUMN_DEFAULTS = (('TestName', None), ('loincCode', None), ('status', None),
+                        ('unit', ''), ('date', 'N/A'), ('result', 'N/A'))
+
+# Items checked between progress reports and cancellation checks.
+PROGRESS_INTERVAL = 500
+# Distinct unmatched names fuzzy-matched between progress reports.
+FUZZY_PROGRESS_INTERVAL = 25
+
+
+def _by_code(values, codes, fill):
+    """Return values[codes] item by item, with fill for items of code -1, whose TestName is not text."""
+    by_item = np.full(len(codes), fill, dtype=values.dtype)
+    named = codes >= 0
+    by_item[named] = values[codes[named]]
+    return by_item
+
+
+class ValidationCancelled(Exception):
+    """Raised inside a validation run once its cancel event is set."""
+
+
+def _checkpoint(progress, cancel_event, stage, done, total):
+    """Stop the run if it was cancelled, otherwise report how far the stage has got."""
+    if cancel_event is not None and cancel_event.is_set():
+        raise ValidationCancelled()
+    if progress is not None:
+        progress(stage, done, total)
+
+
+def load_json_document(json_file_path):
+    """Read a scan export and return the parsed JSON document."""
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def json_load_error_message(json_file_path, error):
+    """Describe a failure to load a scan export the way the report shows it."""
+    if isinstance(error, FileNotFoundError):
+        return f"JSON file not found: {json_file_path}. Error: {error}"
+    if isinstance(error, json.JSONDecodeError):
+        return f"Invalid JSON format in file: {json_file_path}. Error: {error}"
+    return f"Unexpected error loading JSON: {error}"
+
+
+def csv_load_error_message(csv_file_path, error):
+    """Describe a failure to load the reference CSV the way the report shows it."""
+    if isinstance(error, FileNotFoundError):
+        return f"CSV file not found: {csv_file_path}. Error: {error}"
+    if isinstance(error, pd.errors.EmptyDataError):
+        return f"CSV file is empty: {csv_file_path}. Error: {error}"
+    return f"Unexpected error loading CSV: {error}"
+
+
+def scan_items(document):
+    """Return the enhancedSerScanObject items of a parsed scan export."""
+    return document.get('enhancedSerScanObject', [])
+
+
+def items_frame(json_data):
+    """Normalize scan items into a DataFrame with one object column per field in ITEM_COLUMN_DEFAULTS.
+
+    Values stay the original Python objects (None is not turned into NaN) and
+    missing fields get the defaults the checks have always used: '' for unit,
+    'N/A' for date and result, None otherwise.
+    """
+    columns = {}
+    for field, default in ITEM_COLUMN_DEFAULTS:
+        # Assigning into an object array keeps list values whole instead of adding a dimension
+        column = np.empty(len(json_data), dtype=object)
+        column[:] = [item.get(field, default) for item in json_data]
+        columns[field] = column
+    return pd.DataFrame(columns)
+
+
+def load_scan_export(json_file_path, stream=None):
+    """Load the items of a scan export, streaming it when it is large.
+
+    Returns (document, items). Small files are parsed whole and the document is
+    kept for saving; streamed files return document None and items holding only
+    the fields the checks read. stream=None decides from the file size.
+    """
+    if stream is None:
+        stream = should_stream(json_file_path)
+    if stream:
+        logging.info("Streaming scan items from %s", json_file_path)
+        return None, list(iter_scan_items(json_file_path))
+    document = load_json_document(json_file_path)
+    return document, scan_items(document)
+
+
+def read_reference_csv(csv_file_path):
+    """Read the reference CSV into a pandas DataFrame."""
+    df = pd.read_csv(csv_file_path, sep=',', encoding='utf-8')
+    logging.info("CSV columns: %s", df.columns.tolist())
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("CSV head:\n%s", df.head().to_string())
+    return df
+
+
+def missing_csv_columns(csv_df):
+    """Return the required reference columns that csv_df lacks."""
+    return [column for column in REQUIRED_CSV_COLUMNS if column not in csv_df.columns]
+
+
+class ValidationResult:
+    """Issues and review rows produced by validating one scan export."""
+
+    def __init__(self, total_tests, status_issues, unmatched_tests, loinc_issues, csv_update_suggestions,
+                 status_rows, unit_rows, date_rows, match_cache=None, item_outcomes=None, item_names=None):
+        self.total_tests = total_tests
+        self.status_issues = status_issues
+        self.unmatched_tests = unmatched_tests
+        self.loinc_issues = loinc_issues
+        self.csv_update_suggestions = csv_update_suggestions
+        self.status_rows = status_rows
+        self.unit_rows = unit_rows
+        self.date_rows = date_rows
+        self.match_cache = match_cache or {'hits': 0, 'misses': 0}
+        # One row of OUTCOME_COLUMNS per item when the run was columnar, else None
+        self.item_outcomes = item_outcomes
+        # The TestName of each item, lined up with item_outcomes
+        self.item_names = item_names
+        # Set by IncrementalValidator: how much of the run was recomputed versus reused
+        self.incremental = None
+        # RunMetrics of the run; callers may add the stages they timed around it
+        self.metrics = None
+        # Set by SessionStore when the result was restored from a stored run instead of checked
+        self.session = None
+
+    def summary(self):
+        """Return the counts shown in the report summary."""
+        return {
+            'total_tests': self.total_tests,
+            'status_issues': len(self.status_issues),
+            'unmatched_tests': len(self.unmatched_tests),
+            'loinc_issues': len(self.loinc_issues),
+            'csv_update_suggestions': len(self.csv_update_suggestions),
+            'date_issues': len(self.date_rows),
+        }
+
+    def unmatched_name_counts(self):
+        """Return a Counter of the TestNames that matched no reference row, by how many items carry each.
+
+        Items whose TestName is missing or not text are left out.
+        """
+        if self.item_outcomes is None or self.item_names is None:
+            return Counter()
+        names = self.item_names[~self.item_outcomes['matched'].to_numpy(dtype=bool)].tolist()
+        return Counter(name for name in names if isinstance(name, str))
+
+    def to_dict(self):
+        """Return the result as JSON-serializable data."""
+        return {
+            'summary': self.summary(),
+            'status_issues': self.status_issues,
+            'unmatched_tests': self.unmatched_tests,
+            'loinc_issues': self.loinc_issues,
+            'csv_update_suggestions': self.csv_update_suggestions,
+            'unit_conversions': [{'TestName': test_name, 'unit': unit, 'result': result, 'proposed_unit': proposed_unit,
+                                  'proposed_result': proposed_result}
+                                 for test_name, unit, result, proposed_unit, proposed_result in self.unit_rows],
+            'status_suggestions': [{'TestName': test_name, 'calculated_range': calculated_range, 'result': result,
+                                    'suggested_status': suggested}
+                                   for test_name, _, calculated_range, result, suggested in self.status_rows],
+            'date_issues': [{'TestName': test_name, 'date': date, 'normalized_date': normalized, 'issue': issue}
+                            for test_name, date, normalized, issue in self.date_rows],
+            'match_cache': self.match_cache,
+            'performance': self.metrics.to_dict() if self.metrics is not None else None,
+        }
+
+
+class LabDataValidator:
+    """Validates enhancedSerScanObject items against one loaded reference CSV.
+
+    This holds no widgets, so the GUI, the batch CLI and any other caller share
+    the same checks and the same reference index.
+    """
+
+    def __init__(self, csv_df):
+        self.csv_df = csv_df
+        self.reference_index = ReferenceIndex(csv_df)
+        self.match_resolver = MatchResolver(self.reference_index)
+        self.unit_converter = UnitConverter()
+        self.date_normalizer = DateNormalizer()
+
+    @classmethod
+    def from_csv(cls, csv_file_path):
+        """Read a reference CSV and build a validator over it."""
+        return cls(read_reference_csv(csv_file_path))
+
+    def get_calculated_range(self, test_name):
+        """Retrieve the calculated range for a test from the CSV."""
+        return self.match_resolver.calculated_range(self.match_resolver.resolve(test_name))
+
+    def validate_status_values(self, json_data, progress=None, cancel_event=None):
+        """Check that no status values are null or 'unknown'.
+
+        Returns the issues and one (TestName, status, calculated range, result,
+        suggested status) row for each 'unknown' status awaiting review.
+        """
+        issues = []
+        unknown_items = []
+        resolver = self.match_resolver
+        for position, item in enumerate(json_data):
+            if position % PROGRESS_INTERVAL == 0:
+                _checkpoint(progress, cancel_event, "Checking statuses", position, len(json_data))
+            status = item.get('status')
+            test_name = item.get('TestName')
+            result = item.get('result', 'N/A')
+
+            if status is None:
+                issues.append(f"TestName: {test_name} - Status is null")
+            elif status == 'unknown':
+                issues.append(f"TestName: {test_name} - Status is 'unknown'")
+                unknown_items.append((test_name, resolver.range_row(resolver.resolve(test_name)), result))
+        _checkpoint(progress, cancel_event, "Checking statuses", len(json_data), len(json_data))
+        # The ranges of every unknown item are looked up and compared in one pass
+        names, rows, results = zip(*unknown_items) if unknown_items else ((), (), ())
+        ranges = self.reference_index.ranges
+        status_rows = list(zip(names, ['unknown'] * len(names), ranges.texts(rows).tolist(), results,
+                               ranges.classify(rows, results).tolist()))
+        return issues, status_rows
+
+    def unit_conversion_rows(self, json_data):
+        """Return (TestName, unit, result, proposed unit, proposed result) for every item whose unit requires conversion.
+
+        The proposals convert each result to the Unit of the item's matched
+        reference row; see UnitConverter.propose.
+        """
+        items = []
+        resolver = self.match_resolver
+        columns_present = 'Test Name' in self.csv_df.columns and 'Search Names' in self.csv_df.columns
+        for item in json_data:
+            unit = item.get('unit', '')
+            if UNIT_CONVERSION_MARKER in unit:
+                test_name = item.get('TestName')
+                row = resolver.range_row(resolver.resolve(test_name)) if columns_present else -1
+                items.append((test_name, unit, item.get('result', 'N/A'), row))
+        names, units, results, rows = zip(*items) if items else ((), (), (), ())
+        proposed_units, proposed_results, _ = self.unit_converter.propose(self.reference_index.units, rows, units,
+                                                                          results)
+        return list(zip(names, units, results, proposed_units.tolist(), proposed_results.tolist()))
+
+    def conversion_target(self, test_name):
+        """Return (analyte, unit) that conversions of test_name's items go to, or None if it is unmatched."""
+        record = self.match_resolver.resolve(test_name)
+        if record.match_kind is None:
+            return None
+        units = self.reference_index.units
+        return units.analyte[record.row], units.unit[record.row]
+
+    def date_rows(self, json_data):
+        """Return (TestName, date, normalized date, issue) for every item whose date needs attention.
+
+        See DateNormalizer.normalize for the issues a date can have.
+        """
+        names = [item.get('TestName') for item in json_data]
+        dates = [item.get('date', 'N/A') for item in json_data]
+        normalized, issues = self.date_normalizer.normalize(dates)
+        return [row for row in zip(names, dates, normalized.tolist(), issues.tolist()) if row[3] is not None]
+
+    def find_closest_match(self, test_name):
+        """Find the closest matching test name in Test Name or Search Names using fuzzy matching."""
+        return self.reference_index.fuzzy_matcher.best_match(test_name)
+
+    @staticmethod
+    def _suggestion_message(test_name, record):
+        """Word the CSV update suggestion for an unmatched name whose record has been fuzzy-matched."""
+        if not record.closest_match:
+            return f"No similar test found for '{test_name}'. Suggest adding '{test_name}' to a new or related test in CSV."
+        if record.suggestion_row is not None:
+            return (f"Suggest adding '{test_name}' to Search Names for Test Name: {record.suggested_test_name} "
+                    f"(Similarity: {record.similarity}%)")
+        return (f"No clear Test Name found for closest match '{record.closest_match}'. "
+                f"Suggest adding '{test_name}' to a new or related test (Similarity: {record.similarity}%)")
+
+    def validate_test_name_and_loinc(self, json_data, progress=None, cancel_event=None):
+        """Validate TestName against Test Name and Search Names, and loincCode against Loinc."""
+        unmatched_tests = []
+        loinc_issues = []
+        csv_update_suggestions = []
+        not_found = []
+        resolver = self.match_resolver
+        columns_present = 'Test Name' in self.csv_df.columns and 'Search Names' in self.csv_df.columns
+        trace = ItemTrace()
+
+        for position, item in enumerate(json_data):
+            if position % PROGRESS_INTERVAL == 0:
+                _checkpoint(progress, cancel_event, "Checking test names", position, len(json_data))
+            test_name = item.get('TestName')
+            loinc_code = item.get('loincCode')
+
+            if trace.enabled:
+                trace(position, "Checking TestName: %s", test_name)
+
+            if not columns_present:
+                unmatched_tests.append(f"TestName: {test_name} - Required columns missing in CSV")
+                continue
+
+            record = resolver.resolve(test_name)
+
+            if record.match_kind is not None:
+                expected_loinc = resolver.expected_loinc(record)
+                if loinc_code != expected_loinc:
+                    loinc_issues.append(
+                        f"TestName: {test_name} - Incorrect loincCode. Expected: {expected_loinc}, Found: {loinc_code}")
+                continue
+
+            unmatched_tests.append(f"TestName: {test_name} - Not found in CSV Test Name or Search Names")
+            not_found.append((test_name, record))
+
+        # Score unmatched names in batches; names resolved by an earlier item or
+        # an earlier run are already in the match cache and are not scored again
+        unscored = {}
+        for test_name, record in not_found:
+            if not record.fuzzy_resolved:
+                unscored.setdefault(id(record), (test_name, record))
+        unscored = list(unscored.values())
+        for start in range(0, len(unscored), FUZZY_PROGRESS_INTERVAL):
+            _checkpoint(progress, cancel_event, "Fuzzy matching", start, len(unscored))
+            resolver.resolve_fuzzy(unscored[start:start + FUZZY_PROGRESS_INTERVAL])
+        _checkpoint(progress, cancel_event, "Fuzzy matching", len(unscored), len(unscored))
+        for test_name, record in not_found:
+            csv_update_suggestions.append(self._suggestion_message(test_name, record))
+
+        return unmatched_tests, loinc_issues, csv_update_suggestions
+
+    def validate(self, json_data, progress=None, cancel_event=None, metrics=None):
+        """Run every check over the items of one scan export.
+
+        progress, if given, is called as progress(stage, done, total) while the
+        checks run. Setting cancel_event (a threading.Event) makes the run raise
+        ValidationCancelled at its next checkpoint. Stage times are added to
+        metrics, or to a new RunMetrics, which the result keeps.
+        """
+        metrics = metrics if metrics is not None else RunMetrics()
+        with metrics.stage("Item frame"):
+            frame = items_frame(json_data)
+        return self.validate_frame(frame, progress, cancel_event, metrics)
+
+    @staticmethod
+    def unit_conversion_mask(units):
+        """Return a boolean array marking the units that require conversion."""
+        try:
+            return units.str.contains(UNIT_CONVERSION_MARKER, regex=False, na=False).to_numpy(dtype=bool)
+        except AttributeError:  # the column holds no strings at all
+            return np.zeros(len(units), dtype=bool)
+
+    def _resolve_distinct(self, distinct, needed, progress, cancel_event):
+        """Resolve the needed distinct TestNames through the match cache."""
+        records = [None] * len(distinct)
+        needed_codes = np.flatnonzero(needed)
+        trace = ItemTrace()
+        for done, code in enumerate(needed_codes):
+            if done % PROGRESS_INTERVAL == 0:
+                _checkpoint(progress, cancel_event, "Resolving test names", done, len(needed_codes))
+            if trace.enabled:
+                trace(done, "Resolving TestName: %s", distinct[code])
+            records[code] = self.match_resolver.resolve(distinct[code])
+        _checkpoint(progress, cancel_event, "Resolving test names", len(needed_codes), len(needed_codes))
+        return records
+
+    def validate_frame(self, frame, progress=None, cancel_event=None, metrics=None):
+        """Run every check over an items_frame in one columnar pass and return a ValidationResult.
+
+        The issue lists are identical, in content and order, to the item-by-item
+        checks above.
+        """
+        metrics = metrics if metrics is not None else RunMetrics()
+        hits, misses = self.match_resolver.hits, self.match_resolver.misses
+        outcomes = self.check_frame(frame, progress, cancel_event, metrics)
+        match_cache = {'hits': self.match_resolver.hits - hits, 'misses': self.match_resolver.misses - misses}
+        logging.info("Match cache: %s hits, %s misses", match_cache['hits'], match_cache['misses'])
+        with metrics.stage("Result assembly"):
+            result = self.result_from_outcomes(frame, outcomes, match_cache)
+        result.metrics = metrics
+        return result
+
+    def validate_many(self, payloads):
+        """Validate several scan exports' items in one columnar pass, returning one ValidationResult each.
+
+        The items are checked as one frame, so names shared between payloads are
+        resolved and fuzzy-matched once. match_cache counts and metrics are for
+        the whole pass.
+        """
+        metrics = RunMetrics()
+        with metrics.stage("Item frame"):
+            frames = [items_frame(json_data) for json_data in payloads]
+            if not frames:
+                return []
+            frame = pd.concat(frames, ignore_index=True)
+        hits, misses = self.match_resolver.hits, self.match_resolver.misses
+        outcomes = self.check_frame(frame, metrics=metrics)
+        match_cache = {'hits': self.match_resolver.hits - hits, 'misses': self.match_resolver.misses - misses}
+        results = []
+        start = 0
+        with metrics.stage("Result assembly"):
+            for part in frames:
+                end = start + len(part)
+                result = self.result_from_outcomes(frame.iloc[start:end], outcomes.iloc[start:end], match_cache)
+                result.metrics = metrics
+                results.append(result)
+                start = end
+        return results
+
+    def check_frame(self, frame, progress=None, cancel_event=None, metrics=None, strict_names=False):
+        """Check every item of an items_frame, returning one row of OUTCOME_COLUMNS per item.
+
+        Status and unit checks are NumPy masks over the frame. TestNames are
+        factorized so each distinct name is resolved once through the match
+        cache; its reference row, Loinc and messages are then broadcast back to
+        the items by code, and only names left unmatched reach the fuzzy matcher.
+        Stage times and lookup counts are added to metrics, a RunMetrics.
+
+        An item whose TestName is missing or not a string is reported as
+        unmatched. With strict_names it instead raises the AttributeError the
+        item-by-item checks raise, as the GUI always has.
+        """
+        metrics = metrics if metrics is not None else RunMetrics()
+        resolver = self.match_resolver
+        index = self.reference_index
+        counters_before = index.counters()
+        log_counters_before = log_counters()
+        total = len(frame)
+        names = frame['TestName'].to_numpy()
+        statuses = frame['status'].to_numpy()
+        columns_present = 'Test Name' in self.csv_df.columns and 'Search Names' in self.csv_df.columns
+
+        with metrics.stage("Status and unit checks"):
+            _checkpoint(progress, cancel_event, "Checking statuses", 0, total)
+            status_null = statuses == None  # noqa: E711 - elementwise over the object column
+            status_unknown = statuses == 'unknown'
+            status_issue = np.full(total, None, dtype=object)
+            flagged = np.flatnonzero(status_null | status_unknown)
+            status_issue[flagged] = [
+                f"TestName: {name} - Status is null" if null else f"TestName: {name} - Status is 'unknown'"
+                for name, null in zip(names[flagged].tolist(), status_null[flagged].tolist())]
+            needs_conversion = self.unit_conversion_mask(frame['unit'])
+            _checkpoint(progress, cancel_event, "Checking statuses", total, total)
+
+        # Exact and Search Names lookups happen inside resolution; the rest is match cache overhead
+        resolution_start = time.perf_counter()
+        exact_seconds, search_seconds = index.exact_seconds, index.search_seconds
+        # Missing or non-text names get code -1 and match no row
+        is_text = np.fromiter((isinstance(name, str) for name in names), dtype=bool, count=total)
+        codes, distinct = pd.factorize(np.where(is_text, names, None))
+        named = codes >= 0
+        needs_name = np.ones(total, dtype=bool) if columns_present else status_unknown
+        unresolvable = np.flatnonzero(needs_name & ~named)
+        if strict_names and len(unresolvable):
+            # Resolving one fails the way the item checks do
+            resolver.resolve(names[unresolvable[0]])
+        needed = np.zeros(len(distinct), dtype=bool)
+        needed[codes[needs_name & named]] = True
+        records = self._resolve_distinct(distinct, needed, progress, cancel_event)
+        exact_seconds = index.exact_seconds - exact_seconds
+        search_seconds = index.search_seconds - search_seconds
+        metrics.add_time("Exact matching", exact_seconds)
+        metrics.add_time("Search Names matching", search_seconds)
+        metrics.add_time("Match cache", time.perf_counter() - resolution_start - exact_seconds - search_seconds)
+
+        with metrics.stage("Range classification"):
+            # Unknown statuses get their row's range and a suggested status from the parsed bounds
+            unknown = np.flatnonzero(status_unknown)
+            range_rows = np.full(len(distinct), -1, dtype=np.int64)
+            for code in np.unique(codes[unknown][named[unknown]]):
+                range_rows[code] = resolver.range_row(records[code])
+            item_rows = _by_code(range_rows, codes[unknown], -1)
+            calculated_range = np.full(total, None, dtype=object)
+            calculated_range[unknown] = index.ranges.texts(item_rows)
+            suggested_status = np.full(total, None, dtype=object)
+            suggested_status[unknown] = index.ranges.classify(item_rows, frame['result'].to_numpy()[unknown])
+
+        with metrics.stage("Unit conversion"):
+            # Units awaiting conversion get the Unit of their matched row, and their result converted to it
+            conversion = np.flatnonzero(needs_conversion)
+            conversion_codes = np.unique(codes[conversion][named[conversion]])
+            for code in conversion_codes[range_rows[conversion_codes] < 0]:
+                if records[code] is not None:
+                    range_rows[code] = resolver.range_row(records[code])
+            proposed_unit = np.full(total, None, dtype=object)
+            proposed_result = np.full(total, None, dtype=object)
+            proposed_unit[conversion], proposed_result[conversion], _ = self.unit_converter.propose(
+                index.units, _by_code(range_rows, codes[conversion], -1),
+                frame['unit'].to_numpy()[conversion], frame['result'].to_numpy()[conversion])
+
+        with metrics.stage("Date checks"):
+            normalized_date, date_issue = self.date_normalizer.normalize(frame['date'].to_numpy())
+
+        with metrics.stage("Reference lookups"):
+            unmatched_test = np.full(total, None, dtype=object)
+            loinc_issue = np.full(total, None, dtype=object)
+            csv_update_suggestion = np.full(total, None, dtype=object)
+            if columns_present:
+                matched = np.fromiter((record.match_kind is not None for record in records), dtype=bool,
+                                      count=len(records))
+                expected_loinc = np.full(len(distinct), None, dtype=object)
+                for code in np.flatnonzero(matched):
+                    expected_loinc[code] = resolver.expected_loinc(records[code])
+                item_matched = _by_code(matched, codes, False)
+                loinc_codes = frame['loincCode'].to_numpy()
+                item_expected = _by_code(expected_loinc, codes, None)
+                mismatched = np.flatnonzero(item_matched & (loinc_codes != item_expected))
+                loinc_issue[mismatched] = [
+                    f"TestName: {name} - Incorrect loincCode. Expected: {expected}, Found: {found}"
+                    for name, expected, found in zip(names[mismatched].tolist(), item_expected[mismatched].tolist(),
+                                                     loinc_codes[mismatched].tolist())]
+
+        if columns_present:
+            with metrics.stage("Fuzzy matching"):
+                unmatched_codes = np.flatnonzero(~matched)
+                unscored = {}
+                for code in unmatched_codes:
+                    if not records[code].fuzzy_resolved:
+                        unscored.setdefault(id(records[code]), (distinct[code], records[code]))
+                unscored = list(unscored.values())
+                for start in range(0, len(unscored), FUZZY_PROGRESS_INTERVAL):
+                    _checkpoint(progress, cancel_event, "Fuzzy matching", start, len(unscored))
+                    resolver.resolve_fuzzy(unscored[start:start + FUZZY_PROGRESS_INTERVAL])
+                _checkpoint(progress, cancel_event, "Fuzzy matching", len(unscored), len(unscored))
+
+            with metrics.stage("Report messages"):
+                unmatched_messages = np.full(len(distinct), None, dtype=object)
+                suggestion_messages = np.full(len(distinct), None, dtype=object)
+                names_fuzzy = 0
+                for code in unmatched_codes:
+                    unmatched_messages[code] = (f"TestName: {distinct[code]} - "
+                                                f"Not found in CSV Test Name or Search Names")
+                    suggestion_messages[code] = self._suggestion_message(distinct[code], records[code])
+                    names_fuzzy += bool(records[code].closest_match)
+                unmatched_items = np.flatnonzero(~item_matched)
+                unmatched_test[unmatched_items] = _by_code(unmatched_messages, codes[unmatched_items], None)
+                csv_update_suggestion[unmatched_items] = _by_code(suggestion_messages, codes[unmatched_items], None)
+                unnamed = np.flatnonzero(~named)
+                unmatched_test[unnamed] = [f"TestName: {name} - Not a text value; cannot be looked up in CSV"
+                                           for name in names[unnamed].tolist()]
+
+            names_exact = sum(record.match_kind == 'exact' for record in records)
+            metrics.count('names_exact', names_exact)
+            metrics.count('names_search', int(matched.sum()) - names_exact)
+            metrics.count('names_fuzzy', names_fuzzy)
+            metrics.count('names_unmatched', len(unmatched_codes) - names_fuzzy)
+        else:
+            with metrics.stage("Report messages"):
+                item_matched = np.zeros(total, dtype=bool)
+                unmatched_test[:] = [f"TestName: {name} - Required columns missing in CSV" for name in names.tolist()]
+        metrics.count_since(counters_before, index.counters())
+        metrics.count_since(log_counters_before, log_counters())
+
+        return pd.DataFrame({
+            'status_issue': status_issue,
+            'status_unknown': status_unknown,
+            'calculated_range': calculated_range,
+            'suggested_status': suggested_status,
+            'needs_conversion': needs_conversion,
+            'proposed_unit': proposed_unit,
+            'proposed_result': proposed_result,
+            'normalized_date': normalized_date,
+            'date_issue': date_issue,
+            'matched': item_matched,
+            'unmatched_test': unmatched_test,
+            'loinc_issue': loinc_issue,
+            'csv_update_suggestion': csv_update_suggestion,
+        }, index=frame.index)
+
+    @staticmethod
+    def result_from_outcomes(frame, outcomes, match_cache=None):
+        """Assemble the ValidationResult of an items_frame from its check_frame outcomes."""
+        def present(column):
+            values = outcomes[column].to_numpy()
+            return values[values != None].tolist()  # noqa: E711
+
+        names = frame['TestName'].to_numpy()
+        unknown = np.flatnonzero(outcomes['status_unknown'].to_numpy())
+        status_rows = list(zip(names[unknown].tolist(), ['unknown'] * len(unknown),
+                               outcomes['calculated_range'].to_numpy()[unknown].tolist(),
+                               frame['result'].to_numpy()[unknown].tolist(),
+                               outcomes['suggested_status'].to_numpy()[unknown].tolist()))
+        conversion = np.flatnonzero(outcomes['needs_conversion'].to_numpy())
+        unit_rows = list(zip(names[conversion].tolist(), frame['unit'].to_numpy()[conversion].tolist(),
+                             frame['result'].to_numpy()[conversion].tolist(),
+                             outcomes['proposed_unit'].to_numpy()[conversion].tolist(),
+                             outcomes['proposed_result'].to_numpy()[conversion].tolist()))
+        # Only dates that are missing, invalid, outliers or not yet ISO are listed for review
+        date_issue = outcomes['date_issue'].to_numpy()
+        flagged_dates = np.flatnonzero(date_issue != None)  # noqa: E711
+        date_rows = list(zip(names[flagged_dates].tolist(), frame['date'].to_numpy()[flagged_dates].tolist(),
+                             outcomes['normalized_date'].to_numpy()[flagged_dates].tolist(),
+                             date_issue[flagged_dates].tolist()))
+        return ValidationResult(len(frame), present('status_issue'), present('unmatched_test'),
+                                present('loinc_issue'), present('csv_update_suggestion'),
+                                status_rows, unit_rows, date_rows, match_cache, outcomes, names)